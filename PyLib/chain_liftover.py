@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+
+"""
+Offline liftover of genome coordinates from a local UCSC chain file.
+
+Replaces liftover.get_lifter(), which may download the chain file and is
+loaded in full on creation, and whose converter[chrom][pos] lookups are made
+one coordinate at a time.
+
+The chain file is only read on the first lookup. Its aligned blocks are indexed
+into arrays sorted by target (source build) chromosome and start, and whole
+coordinate columns are lifted with one searchsorted per chromosome. The block
+index is cached as .npz keyed on the chain file hash, so later runs skip
+parsing the chain file.
+
+Coordinates are 0-based by default, as with liftover.get_lifter().
+"""
+
+import os
+import gzip
+import hashlib
+import tempfile
+import warnings
+import numpy as np
+import pandas as pd
+
+# local chain files, ie. hg19ToHg38.over.chain.gz, as also used by the liftover package
+CHAIN_DIR = os.environ.get("LIFTOVER_CHAIN_DIR", os.path.expanduser("~/.liftover"))
+
+CACHE_DIR = os.environ.get(
+    "LIFTOVER_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "LR-FusionBenchmarking"),
+)
+
+# lifters already created in this process
+_lifters = dict()
+
+
+def get_lifter(target, query, chain_dir=None, one_based=False):
+    """
+    ChainLiftover from the target (ie. hg19) to the query (ie. hg38) build,
+    using the local {target}To{Query}.over.chain.gz. Nothing is read until the first lookup.
+    """
+
+    if chain_dir is None:
+        chain_dir = CHAIN_DIR
+
+    chain_file = os.path.join(
+        chain_dir,
+        "{}To{}.over.chain.gz".format(
+            target[0].lower() + target[1:], query[0].upper() + query[1:]
+        ),
+    )
+
+    lifter_key = (os.path.realpath(chain_file), one_based)
+    if lifter_key not in _lifters:
+        _lifters[lifter_key] = ChainLiftover(chain_file, one_based=one_based)
+
+    return _lifters[lifter_key]
+
+
+class ChainLiftover(object):
+    """liftover by the aligned blocks of a chain file, indexed by target chromosome and start"""
+
+    def __init__(self, chain_file, one_based=False, cache_dir=None):
+        self.chain_file = chain_file
+        self.one_based = one_based
+        self.cache_dir = cache_dir if cache_dir is not None else CACHE_DIR
+        self._index = None
+
+    def __getitem__(self, chrom):
+        """converter[chrom][pos] -> [(chrom, pos, strand)], as with liftover.get_lifter()"""
+        return _ChromLiftover(self, chrom)
+
+    def lift(self, chroms, positions):
+        """
+        Lift the positions on the chroms.
+
+        returns (chroms, positions, strands) arrays, with None, -1, and None for positions
+        not in any aligned block. Where aligned blocks overlap, the block starting first is used,
+        as for converter[chrom][pos][0] with liftover.get_lifter().
+        """
+
+        index = self._load_index()
+
+        chroms = np.asarray(chroms, dtype=object)
+        positions = np.asarray(positions, dtype=np.int64)
+        if self.one_based:
+            positions = positions - 1
+
+        block_idx = np.full(len(positions), -1, dtype=np.int64)
+
+        for chrom, chrom_pos_idx in (
+            pd.Series(np.arange(len(chroms))).groupby(chroms).groups.items()
+        ):
+            if chrom not in index["chrom_ranges"]:
+                continue
+            start, end = index["chrom_ranges"][chrom]
+            chrom_pos_idx = np.asarray(chrom_pos_idx)
+            block_idx[chrom_pos_idx] = self._find_blocks(
+                positions[chrom_pos_idx], start, end
+            )
+
+        found = block_idx >= 0
+        blocks = block_idx[found]
+
+        offsets = positions[found] - index["target_start"][blocks]
+        query_pos = index["query_start"][blocks] + offsets
+        minus = index["query_minus"][blocks]
+        # minus strand query coordinates count from the end of the query chromosome
+        query_pos[minus] = index["query_size"][blocks][minus] - query_pos[minus] - 1
+        if self.one_based:
+            query_pos += 1
+
+        lifted_chroms = np.full(len(positions), None, dtype=object)
+        lifted_chroms[found] = index["query_chroms"][index["query_chrom"][blocks]]
+        lifted_positions = np.full(len(positions), -1, dtype=np.int64)
+        lifted_positions[found] = query_pos
+        strands = np.full(len(positions), None, dtype=object)
+        strands[found] = np.where(minus, "-", "+")
+
+        return lifted_chroms, lifted_positions, strands
+
+    def lift_breakpoint_ends(self, chroms, positions):
+        """'chrom:pos' strings of the lifted positions, raising ValueError for any that cannot be lifted"""
+
+        lifted_chroms, lifted_positions, _ = self.lift(chroms, positions)
+
+        unlifted = pd.isnull(lifted_chroms)
+        if unlifted.any():
+            raise ValueError(
+                "Error, cannot liftover: "
+                + ", ".join(
+                    "{}:{}".format(chrom, pos)
+                    for chrom, pos in zip(
+                        np.asarray(chroms, dtype=object)[unlifted][:5],
+                        np.asarray(positions)[unlifted][:5],
+                    )
+                )
+            )
+
+        return (
+            pd.Series(lifted_chroms, dtype=object)
+            + ":"
+            + pd.Series(lifted_positions).astype(str)
+        ).values
+
+    def _find_blocks(self, positions, start, end):
+        """index of the block containing each position among the chromosome's blocks [start, end), or -1"""
+
+        block_starts = self._index["block_start"][start:end]
+        target_end = self._index["target_end"][start:end]
+
+        block_idx = np.searchsorted(block_starts, positions, side="right") - 1
+        in_block = block_idx >= 0
+        in_block[in_block] = positions[in_block] < target_end[block_idx[in_block]]
+
+        return np.where(in_block, block_idx + start, -1)
+
+    def _load_index(self):
+        if self._index is not None:
+            return self._index
+
+        if not os.path.exists(self.chain_file):
+            raise FileNotFoundError(
+                "Error, chain file {} not found. Download it (ie. from "
+                "https://hgdownload.soe.ucsc.edu/goldenPath/hg19/liftOver/) into {} "
+                "or set LIFTOVER_CHAIN_DIR".format(
+                    self.chain_file, os.path.dirname(self.chain_file)
+                )
+            )
+
+        with open(self.chain_file, "rb") as fh:
+            file_hash = hashlib.sha1(fh.read()).hexdigest()
+
+        cache_file = os.path.join(
+            self.cache_dir,
+            "{}.{}.npz".format(os.path.basename(self.chain_file), file_hash),
+        )
+
+        if os.path.exists(cache_file):
+            with np.load(cache_file, allow_pickle=False) as cache:
+                arrays = {key: cache[key] for key in cache.files}
+        else:
+            arrays = parse_chain_blocks(self.chain_file)
+            _write_index_cache(arrays, cache_file)
+
+        self._index = _build_index(arrays)
+
+        return self._index
+
+
+class _ChromLiftover(object):
+    def __init__(self, lifter, chrom):
+        self.lifter = lifter
+        self.chrom = chrom
+
+    def __getitem__(self, pos):
+        chroms, positions, strands = self.lifter.lift([self.chrom], [pos])
+        if chroms[0] is None:
+            return []
+        return [(chroms[0], int(positions[0]), strands[0])]
+
+
+def parse_chain_blocks(chain_file):
+    """
+    aligned blocks of the chains, in chain file order, as arrays:
+    target_chrom, target_start, target_end, query_chrom, query_start, query_size, query_minus,
+    with the chromosome codes indexing target_chroms and query_chroms
+    """
+
+    target_chroms = dict()
+    query_chroms = dict()
+    blocks = list()
+
+    opener = gzip.open if chain_file.endswith(".gz") else open
+    with opener(chain_file, "rt") as fh:
+        for line in fh:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == "chain":
+                # chain score tName tSize tStrand tStart tEnd qName qSize qStrand qStart qEnd id
+                target_chrom = target_chroms.setdefault(fields[2], len(target_chroms))
+                query_chrom = query_chroms.setdefault(fields[7], len(query_chroms))
+                query_size = int(fields[8])
+                query_minus = fields[9] == "-"
+                target_pos = int(fields[5])
+                query_pos = int(fields[10])
+                continue
+
+            # size [dt dq]
+            size = int(fields[0])
+            blocks.append(
+                (
+                    target_chrom,
+                    target_pos,
+                    target_pos + size,
+                    query_chrom,
+                    query_pos,
+                    query_size,
+                    query_minus,
+                )
+            )
+            if len(fields) == 3:
+                target_pos += size + int(fields[1])
+                query_pos += size + int(fields[2])
+
+    blocks = np.array(blocks, dtype=np.int64).reshape(-1, 7)
+
+    return {
+        "target_chroms": np.array(list(target_chroms), dtype=str),
+        "query_chroms": np.array(list(query_chroms), dtype=str),
+        "target_chrom": blocks[:, 0],
+        "target_start": blocks[:, 1],
+        "target_end": blocks[:, 2],
+        "query_chrom": blocks[:, 3],
+        "query_start": blocks[:, 4],
+        "query_size": blocks[:, 5],
+        "query_minus": blocks[:, 6].astype(bool),
+    }
+
+
+def _write_index_cache(arrays, cache_file):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # written to a temp file and renamed, so concurrent runs never read a partial cache
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".npz")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez(fh, **arrays)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        warnings.warn(
+            "Cannot write liftover cache {}: {}".format(cache_file, e), Warning
+        )
+
+
+def _build_index(arrays):
+    """
+    Blocks sorted by target chromosome and start, with each target chromosome's range of blocks.
+
+    Where blocks overlap, the positions go to the block starting first (then first in the chain file),
+    so each block is only searched from block_start, past the ends of the blocks sorted before it,
+    and a single searchsorted finds the block for a position.
+    """
+
+    order = np.lexsort(
+        (
+            np.arange(len(arrays["target_start"])),
+            arrays["target_start"],
+            arrays["target_chrom"],
+        )
+    )
+    index = {
+        key: arrays[key][order]
+        for key in arrays
+        if key not in ("target_chroms", "query_chroms")
+    }
+    index["query_chroms"] = arrays["query_chroms"].astype(object)
+
+    target_chrom = index["target_chrom"]
+    chrom_starts = np.flatnonzero(
+        np.concatenate([[True], target_chrom[1:] != target_chrom[:-1]])
+    )
+    chrom_ends = np.append(chrom_starts[1:], len(target_chrom))
+
+    index["block_start"] = index["target_start"].copy()
+    chrom_ranges = dict()
+    for start, end in zip(chrom_starts, chrom_ends):
+        prev_max_end = np.maximum.accumulate(index["target_end"][start:end])[:-1]
+        index["block_start"][start + 1 : end] = np.maximum(
+            index["target_start"][start + 1 : end], prev_max_end
+        )
+        chrom_ranges[str(arrays["target_chroms"][target_chrom[start]])] = (start, end)
+
+    # drop the blocks entirely covered by earlier ones
+    kept = index["block_start"] < index["target_end"]
+    kept_before = np.concatenate([[0], np.cumsum(kept)])
+    index = {
+        key: (
+            val[kept] if isinstance(val, np.ndarray) and key != "query_chroms" else val
+        )
+        for key, val in index.items()
+    }
+    index["chrom_ranges"] = {
+        chrom: (kept_before[start], kept_before[end])
+        for chrom, (start, end) in chrom_ranges.items()
+    }
+
+    return index
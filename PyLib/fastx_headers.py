@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+
+"""
+Header-only scanning of FASTQ and FASTA files.
+
+The truth-set builders only need the record descriptions, so rather than
+parsing full records (ie. with Bio.SeqIO), only the header lines are decoded:
+every 4th line of a FASTQ file, or the '>' lines of a FASTA file.
+Descriptions are yielded in batches, for vectorized extraction with pandas.
+
+FASTQ files must have 4-line records, as written by the read simulators and
+sequencers. Multi-line (wrapped) FASTQ records are rejected with a ValueError
+rather than misread, as the record boundaries then cannot be told from the lines.
+
+Gzipped files are read through large buffers, decompressed with multiple
+threads when threads > 1 and python-isal or pigz is available.
+"""
+
+import gzip
+import io
+import itertools
+import shutil
+import subprocess
+from contextlib import contextmanager
+
+try:
+    from isal import igzip_threaded  # type: ignore
+except ImportError:
+    igzip_threaded = None
+
+BUFFER_SIZE = 1 << 20
+
+BATCH_SIZE = 100000
+
+
+@contextmanager
+def open_binary(filename, threads=1):
+    """binary file handle, decompressing .gz files"""
+
+    if not filename.endswith(".gz"):
+        with open(filename, "rb", buffering=BUFFER_SIZE) as fh:
+            yield fh
+
+    elif threads > 1 and igzip_threaded is not None:
+        with igzip_threaded.open(filename, "rb", threads=threads) as fh:
+            yield fh
+
+    elif threads > 1 and shutil.which("pigz"):
+        process = subprocess.Popen(
+            ["pigz", "-dc", "-p", str(threads), filename],
+            stdout=subprocess.PIPE,
+            bufsize=BUFFER_SIZE,
+        )
+        try:
+            yield process.stdout
+        finally:
+            process.stdout.close()
+            ret = process.wait()
+        if ret != 0:
+            raise RuntimeError(
+                "Error, pigz -dc {} failed with ret {}".format(filename, ret)
+            )
+
+    else:
+        with gzip.open(filename, "rb") as gz_fh:
+            yield io.BufferedReader(gz_fh, buffer_size=BUFFER_SIZE)
+
+
+def iter_description_batches(filename, seq_format, batch_size=BATCH_SIZE, threads=1):
+    """
+    yields lists of the record descriptions (header lines without the leading '@' or '>'),
+    as record.description from Bio.SeqIO.parse(), in batches of up to batch_size
+
+    :param seq_format: `str`, fastq (4 lines per record) or fasta
+    :param threads: `int`, threads for decompressing gzipped files, see open_binary()
+    :raises ValueError: for fastq files without 4-line records, ie. multi-line fastq
+    """
+
+    if seq_format not in ("fastq", "fasta"):
+        raise ValueError(
+            "Error, seq_format must be fastq or fasta, not {}".format(seq_format)
+        )
+
+    with open_binary(filename, threads) as fh:
+        if seq_format == "fastq":
+            header_lines = iter_fastq_header_lines(filename, fh)
+        else:
+            header_lines = (line for line in fh if line.startswith(b">"))
+
+        while True:
+            batch = list(itertools.islice(header_lines, batch_size))
+            if not batch:
+                break
+
+            yield [line[1:].decode("utf-8").rstrip() for line in batch]
+
+
+def iter_fastq_header_lines(filename, fh):
+    """header lines of the 4-line fastq records, raising ValueError for other record layouts"""
+
+    for header, _, separator, quality in itertools.zip_longest(fh, fh, fh, fh):
+        if quality is None:
+            raise ValueError(
+                "Error, {} ends within a fastq record, expecting 4 lines per record".format(
+                    filename
+                )
+            )
+
+        if not (header.startswith(b"@") and separator.startswith(b"+")):
+            expected, line = ("@", header) if header[:1] != b"@" else ("+", separator)
+            raise ValueError(
+                "Error, expected a line starting with {} in {}, found: {}. "
+                "Multi-line fastq records are not supported.".format(
+                    expected, filename, line.decode("utf-8", "replace").rstrip()
+                )
+            )
+
+        yield header
+
+
+def iter_descriptions(filename, seq_format, threads=1):
+    """record descriptions, one at a time"""
+
+    for batch in iter_description_batches(filename, seq_format, threads=threads):
+        yield from batch
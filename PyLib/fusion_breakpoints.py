@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+
+"""
+Integer-encoded fusion breakpoints.
+
+Breakpoint strings like chr12:52846197--chr17:9981884 are parsed once into a
+structured array of (left_chrom, left_coord, right_chrom, right_coord), with the
+chromosomes stored as int16 codes from a ChromCodes registry shared by all the
+breakpoint arrays being compared, and the coordinates as int64.
+
+Lex-sorting, uniqueness, set operations and distances are all done on these arrays.
+The ordering functions reproduce the ordering of the original 'chrom:coord' strings,
+so breakpoints formatted back to strings for output match the string-based
+LexSort breakpoints exactly.
+"""
+
+import numpy as np
+import pandas as pd
+
+BREAKPOINT_REGEX = r"^([^:]+):(\d+)--([^:]+):(\d+)$"
+
+BREAKPOINT_DTYPE = np.dtype(
+    [
+        ("left_chrom", np.int16),
+        ("left_coord", np.int64),
+        ("right_chrom", np.int16),
+        ("right_coord", np.int64),
+    ]
+)
+
+# coordinates are left-aligned to this many decimal digits for string ordering
+MAX_COORD_DIGITS = 18
+POWERS_OF_TEN = 10 ** np.arange(1, MAX_COORD_DIGITS + 1, dtype=np.int64)
+
+
+class ChromCodes(object):
+    """chromosome name <-> int16 code registry"""
+
+    def __init__(self):
+        self.chroms = list()
+        self._chrom_to_code = dict()
+        self._string_rank = None
+
+    def encode(self, chroms):
+        """return the int16 codes for the chroms, registering any new chromosome names"""
+
+        uniq_chroms, inverse = np.unique(
+            np.asarray(chroms, dtype=object), return_inverse=True
+        )
+        uniq_codes = np.empty(len(uniq_chroms), dtype=np.int16)
+        for i, chrom in enumerate(uniq_chroms):
+            if chrom not in self._chrom_to_code:
+                assert (
+                    len(self.chroms) < np.iinfo(np.int16).max
+                ), "Error, too many chromosomes to encode"
+                self._chrom_to_code[chrom] = len(self.chroms)
+                self.chroms.append(chrom)
+                self._string_rank = None
+            uniq_codes[i] = self._chrom_to_code[chrom]
+
+        return uniq_codes[inverse.reshape(-1)]
+
+    def decode(self, codes):
+        return np.array(self.chroms, dtype=object)[codes]
+
+    def string_rank(self):
+        """rank of each chrom code in the order its 'chrom:coord' strings would sort"""
+
+        if self._string_rank is None:
+            order = sorted(range(len(self.chroms)), key=lambda i: self.chroms[i] + ":")
+            self._string_rank = np.empty(len(self.chroms), dtype=np.int64)
+            self._string_rank[order] = np.arange(len(self.chroms))
+
+        return self._string_rank
+
+    def codes_with_prefix(self, prefix):
+        return np.array(
+            [
+                code
+                for code, chrom in enumerate(self.chroms)
+                if chrom.startswith(prefix)
+            ],
+            dtype=np.int16,
+        )
+
+
+def is_breakpoint(breakpoints):
+    """mask of the values with the chrom:coord--chrom:coord formatting, as parsed by parse_breakpoints()"""
+
+    return (
+        pd.Series(np.asarray(breakpoints, dtype=object), dtype=object)
+        .str.match(BREAKPOINT_REGEX)
+        .fillna(False)
+        .values.astype(bool)
+    )
+
+
+def parse_breakpoints(breakpoints, chrom_codes):
+    """parse breakpoint strings (chr12:52846197--chr17:9981884) into a breakpoint array"""
+
+    breakpoints = pd.Series(np.asarray(breakpoints, dtype=object), dtype=object)
+
+    fields = breakpoints.str.extract(BREAKPOINT_REGEX)
+    unparsed = fields[0].isnull()
+    if unparsed.any():
+        raise ValueError(
+            "Error, breakpoints lack expected chrom:coord--chrom:coord formatting: "
+            + ", ".join(map(str, breakpoints[unparsed].head().tolist()))
+        )
+
+    brkpts = np.empty(len(breakpoints), dtype=BREAKPOINT_DTYPE)
+    brkpts["left_chrom"] = chrom_codes.encode(fields[0].values)
+    brkpts["left_coord"] = fields[1].values.astype(np.int64)
+    brkpts["right_chrom"] = chrom_codes.encode(fields[2].values)
+    brkpts["right_coord"] = fields[3].values.astype(np.int64)
+
+    return brkpts
+
+
+def make_breakpoints(left_chroms, left_coords, right_chroms, right_coords, chrom_codes):
+    """build a breakpoint array from separate chrom and coordinate columns"""
+
+    brkpts = np.empty(len(left_coords), dtype=BREAKPOINT_DTYPE)
+    brkpts["left_chrom"] = chrom_codes.encode(left_chroms)
+    brkpts["left_coord"] = np.asarray(left_coords, dtype=np.int64)
+    brkpts["right_chrom"] = chrom_codes.encode(right_chroms)
+    brkpts["right_coord"] = np.asarray(right_coords, dtype=np.int64)
+
+    return brkpts
+
+
+def format_breakpoints(brkpts, chrom_codes):
+    """format a breakpoint array as chrom:coord--chrom:coord strings"""
+
+    if len(brkpts) == 0:
+        return np.array([], dtype=object)
+
+    left_ends = format_breakpoint_ends(
+        brkpts["left_chrom"], brkpts["left_coord"], chrom_codes
+    )
+    right_ends = format_breakpoint_ends(
+        brkpts["right_chrom"], brkpts["right_coord"], chrom_codes
+    )
+
+    return (left_ends + "--" + right_ends).values
+
+
+def format_breakpoint_ends(chroms, coords, chrom_codes):
+    return (
+        pd.Series(chrom_codes.decode(chroms), dtype=object)
+        + ":"
+        + pd.Series(coords).astype(str)
+    )
+
+
+def _end_string_keys(chroms, coords, chrom_codes):
+    # string comparison of decimal coordinates == comparing the left-aligned digits, shorter first
+    num_digits = np.searchsorted(POWERS_OF_TEN, coords, side="right") + 1
+    aligned_coords = coords * 10 ** (MAX_COORD_DIGITS - num_digits)
+
+    return chrom_codes.string_rank()[chroms], aligned_coords, num_digits
+
+
+def lexsort_ends(brkpts, chrom_codes):
+    """order the two ends of each breakpoint as sorted() on their 'chrom:coord' strings would"""
+
+    left_keys = _end_string_keys(
+        brkpts["left_chrom"], brkpts["left_coord"], chrom_codes
+    )
+    right_keys = _end_string_keys(
+        brkpts["right_chrom"], brkpts["right_coord"], chrom_codes
+    )
+
+    swap = np.zeros(len(brkpts), dtype=bool)
+    undecided = np.ones(len(brkpts), dtype=bool)
+    for left_key, right_key in zip(left_keys, right_keys):
+        swap |= undecided & (right_key < left_key)
+        undecided &= right_key == left_key
+
+    lexsorted = brkpts.copy()
+    lexsorted["left_chrom"][swap] = brkpts["right_chrom"][swap]
+    lexsorted["left_coord"][swap] = brkpts["right_coord"][swap]
+    lexsorted["right_chrom"][swap] = brkpts["left_chrom"][swap]
+    lexsorted["right_coord"][swap] = brkpts["left_coord"][swap]
+
+    return lexsorted
+
+
+def string_order(brkpts, chrom_codes):
+    """indices that sort the breakpoints as their formatted strings would sort"""
+
+    left_keys = _end_string_keys(
+        brkpts["left_chrom"], brkpts["left_coord"], chrom_codes
+    )
+    right_keys = _end_string_keys(
+        brkpts["right_chrom"], brkpts["right_coord"], chrom_codes
+    )
+
+    return np.lexsort(tuple(reversed(left_keys + right_keys)))
+
+
+def unique_breakpoints(brkpts, chrom_codes):
+    uniq = np.unique(brkpts)
+    return uniq[string_order(uniq, chrom_codes)]
+
+
+def intersect_breakpoints(brkpts_A, brkpts_B, chrom_codes):
+    shared = np.intersect1d(brkpts_A, brkpts_B)
+    return shared[string_order(shared, chrom_codes)]
+
+
+def setdiff_breakpoints(brkpts_A, brkpts_B, chrom_codes):
+    diff = np.setdiff1d(brkpts_A, brkpts_B)
+    return diff[string_order(diff, chrom_codes)]
+
+
+def breakpoint_distances(brkpts_A, brkpts_B):
+    """elementwise (left, right) absolute distances between breakpoints on the same chromosomes"""
+
+    assert np.all(
+        brkpts_A["left_chrom"] == brkpts_B["left_chrom"]
+    ), "Error, left chromosomes differ"
+    assert np.all(
+        brkpts_A["right_chrom"] == brkpts_B["right_chrom"]
+    ), "Error, right chromosomes differ"
+
+    return (
+        np.abs(brkpts_A["left_coord"] - brkpts_B["left_coord"]),
+        np.abs(brkpts_A["right_coord"] - brkpts_B["right_coord"]),
+    )
+
+
+def group_by_chrom_pair(brkpts):
+    """
+    returns dict: (left_chrom, right_chrom) -> (left_coords, right_coords, indices)
+    with the coordinates sorted by the left coordinate, and the indices into brkpts.
+    """
+
+    order = np.lexsort(
+        (brkpts["left_coord"], brkpts["right_chrom"], brkpts["left_chrom"])
+    )
+    sorted_brkpts = brkpts[order]
+
+    chrom_pairs = np.stack(
+        [sorted_brkpts["left_chrom"], sorted_brkpts["right_chrom"]], axis=1
+    )
+    if len(chrom_pairs) == 0:
+        return dict()
+
+    group_starts = (
+        np.flatnonzero(np.any(chrom_pairs[1:] != chrom_pairs[:-1], axis=1)) + 1
+    )
+    group_starts = np.concatenate([[0], group_starts])
+    group_ends = np.concatenate([group_starts[1:], [len(order)]])
+
+    chrom_pair_to_brkpts = dict()
+    for start, end in zip(group_starts, group_ends):
+        chrom_pair = (int(chrom_pairs[start, 0]), int(chrom_pairs[start, 1]))
+        chrom_pair_to_brkpts[chrom_pair] = (
+            sorted_brkpts["left_coord"][start:end],
+            sorted_brkpts["right_coord"][start:end],
+            order[start:end],
+        )
+
+    return chrom_pair_to_brkpts
+
+
+def find_breakpoint_pairs_within_distance(
+    query_brkpts, target_brkpts, min_offset, max_offset
+):
+    """
+    Find all (query, target) pairs on the same chromosome pair where
+    min_offset <= target_coord - query_coord <= max_offset at both ends.
+
+    The sorted target left coordinates are windowed for all queries at once via searchsorted,
+    then the candidates are retained if their right coordinates are also in range.
+
+    returns (query_indices, target_indices, left_distances, right_distances)
+    ordered by query index, then target index.
+    """
+
+    target_chrom_pair_to_brkpts = group_by_chrom_pair(target_brkpts)
+
+    query_hits = []
+    target_hits = []
+    left_dists = []
+    right_dists = []
+
+    for chrom_pair, (query_left, query_right, query_idx) in group_by_chrom_pair(
+        query_brkpts
+    ).items():
+
+        if chrom_pair not in target_chrom_pair_to_brkpts:
+            continue
+
+        target_left, target_right, target_idx = target_chrom_pair_to_brkpts[chrom_pair]
+
+        window_lend = np.searchsorted(target_left, query_left + min_offset, side="left")
+        window_rend = np.searchsorted(
+            target_left, query_left + max_offset, side="right"
+        )
+        window_sizes = np.maximum(window_rend - window_lend, 0)
+        if window_sizes.sum() == 0:
+            continue
+
+        # expand each query's window into (query, target) candidate pairs
+        query_pos = np.repeat(np.arange(len(query_left)), window_sizes)
+        window_starts = np.cumsum(window_sizes) - window_sizes
+        target_pos = (
+            np.arange(window_sizes.sum())
+            - np.repeat(window_starts, window_sizes)
+            + np.repeat(window_lend, window_sizes)
+        )
+
+        right_offset = target_right[target_pos] - query_right[query_pos]
+        within_dist = (right_offset >= min_offset) & (right_offset <= max_offset)
+
+        query_pos = query_pos[within_dist]
+        target_pos = target_pos[within_dist]
+
+        query_hits.append(query_idx[query_pos])
+        target_hits.append(target_idx[target_pos])
+        left_dists.append(np.abs(target_left[target_pos] - query_left[query_pos]))
+        right_dists.append(np.abs(target_right[target_pos] - query_right[query_pos]))
+
+    if not query_hits:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty, empty
+
+    query_hits = np.concatenate(query_hits)
+    target_hits = np.concatenate(target_hits)
+    left_dists = np.concatenate(left_dists)
+    right_dists = np.concatenate(right_dists)
+
+    order = np.lexsort((target_hits, query_hits))
+
+    return (
+        query_hits[order],
+        target_hits[order],
+        left_dists[order],
+        right_dists[order],
+    )
+
+
+def find_nearest_breakpoint_pairs(query_brkpts, target_brkpts, max_candidates=10000000):
+    """
+    For each query with targets on its chromosome pair, the target with the smallest
+    max(left distance, right distance), taking the first in group_by_chrom_pair() order on ties.
+
+    The targets next to each query by left and by right coordinate bound its distance from above.
+    The sorted target left coordinates are then windowed to that bound via searchsorted, and the
+    nearest target is taken among the window's candidates, so the targets far from the query are
+    never compared. The candidates are expanded for at most about max_candidates pairs at a time.
+
+    returns (query_indices, target_indices, max_distances) ordered by query index.
+    """
+
+    target_chrom_pair_to_brkpts = group_by_chrom_pair(target_brkpts)
+
+    query_hits = []
+    target_hits = []
+    min_dists = []
+
+    for chrom_pair, (query_left, query_right, query_idx) in group_by_chrom_pair(
+        query_brkpts
+    ).items():
+
+        if chrom_pair not in target_chrom_pair_to_brkpts:
+            continue
+
+        target_left, target_right, target_idx = target_chrom_pair_to_brkpts[chrom_pair]
+
+        def max_dist(query_pos, target_pos):
+            return np.maximum(
+                np.abs(target_left[target_pos] - query_left[query_pos]),
+                np.abs(target_right[target_pos] - query_right[query_pos]),
+            )
+
+        # upper bound: the distance to the targets next to the query at either end
+        query_pos = np.arange(len(query_left))
+        right_order = np.argsort(target_right, kind="stable")
+        left_pos = np.searchsorted(target_left, query_left)
+        right_pos = np.searchsorted(target_right[right_order], query_right)
+        neighbor_pos = [
+            np.clip(pos, 0, len(target_left) - 1)
+            for pos in (left_pos - 1, left_pos, right_pos - 1, right_pos)
+        ]
+        neighbor_pos[2:] = [right_order[pos] for pos in neighbor_pos[2:]]
+        bound = np.min([max_dist(query_pos, pos) for pos in neighbor_pos], axis=0)
+
+        # nearer targets are within the bound at the left end too
+        window_lend = np.searchsorted(target_left, query_left - bound, side="left")
+        window_rend = np.searchsorted(target_left, query_left + bound, side="right")
+        window_sizes = window_rend - window_lend
+        window_ends = np.cumsum(window_sizes)
+
+        chunk_start = 0
+        while chunk_start < len(query_left):
+            chunk_end = max(
+                np.searchsorted(
+                    window_ends,
+                    window_ends[chunk_start]
+                    - window_sizes[chunk_start]
+                    + max_candidates,
+                    side="right",
+                ),
+                chunk_start + 1,
+            )
+            chunk_sizes = window_sizes[chunk_start:chunk_end]
+
+            # expand each query's window into (query, target) candidate pairs
+            candidate_query_pos = np.repeat(
+                np.arange(chunk_start, chunk_end), chunk_sizes
+            )
+            chunk_window_starts = np.cumsum(chunk_sizes) - chunk_sizes
+            candidate_target_pos = (
+                np.arange(chunk_sizes.sum())
+                - np.repeat(chunk_window_starts, chunk_sizes)
+                + np.repeat(window_lend[chunk_start:chunk_end], chunk_sizes)
+            )
+            candidate_dists = max_dist(candidate_query_pos, candidate_target_pos)
+
+            # the first of the nearest candidates of each query
+            order = np.lexsort(
+                (candidate_target_pos, candidate_dists, candidate_query_pos)
+            )
+            _, first = np.unique(candidate_query_pos[order], return_index=True)
+            nearest = order[first]
+
+            query_hits.append(query_idx[candidate_query_pos[nearest]])
+            target_hits.append(target_idx[candidate_target_pos[nearest]])
+            min_dists.append(candidate_dists[nearest])
+
+            chunk_start = chunk_end
+
+    if not query_hits:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, empty
+
+    query_hits = np.concatenate(query_hits)
+    order = np.argsort(query_hits, kind="stable")
+
+    return (
+        query_hits[order],
+        np.concatenate(target_hits)[order],
+        np.concatenate(min_dists)[order],
+    )
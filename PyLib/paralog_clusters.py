@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+"""
+Paralog cluster index for matching fusions up to paralogs.
+
+The resources/paralog_clusters*.dat files list one paralog cluster per line as
+whitespace-separated gene symbols. The ParalogIndex assigns each cluster an
+integer ID, and keys each gene by its own ID along with the IDs of the clusters
+it belongs to. A fusion A--B is then keyed by the (left key, right key)
+combinations of its genes, and fusions with equal or paralogous genes at both
+ends share a key, so paralog-equivalent fusions are found with a single join.
+
+The .dat files are read from the local resources/ directory, with the parsed
+clusters cached per file hash (see load_paralog_clusters()).
+"""
+
+import os
+import hashlib
+import pickle
+import tempfile
+import warnings
+from collections import defaultdict
+import numpy as np
+import pandas as pd
+
+RESOURCES_DIR = os.path.sep.join(
+    [os.path.dirname(os.path.realpath(__file__)), "../resources"]
+)
+
+# parsed paralog clusters are cached as pickle files keyed on the .dat file hash
+CACHE_DIR = os.environ.get(
+    "PARALOG_CLUSTERS_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "LR-FusionBenchmarking"),
+)
+
+PARALOG_CLUSTER_FILES = {
+    "I3": "paralog_clusters.2020.I3.dat",
+    "I5": "paralog_clusters.2020.I5.dat",
+    "2019": "paralog_clusters.dat.2019",
+    "default": "paralog_clusters.dat",
+}
+
+
+def paralog_clusters_file(variant="I5"):
+    """path to the resources paralog clusters file for the variant: I3, I5, 2019, or default"""
+
+    if variant not in PARALOG_CLUSTER_FILES:
+        raise ValueError(
+            "Error, unknown paralog clusters variant {}, expecting one of: {}".format(
+                variant, ", ".join(PARALOG_CLUSTER_FILES)
+            )
+        )
+
+    return os.path.join(RESOURCES_DIR, PARALOG_CLUSTER_FILES[variant])
+
+
+def parse_paralog_clusters(dat_file):
+    """list of paralog clusters, each a list of the gene symbols in upper case"""
+
+    paralog_clusters = list()
+    with open(dat_file) as fh:
+        for line in fh:
+            # NOTE: take uppper case to be consistent with gold standard and prediction
+            paralog_clusters.append([gene.upper() for gene in line.split()])
+
+    return paralog_clusters
+
+
+# (dat file path, file hash) -> paralog clusters, for those already loaded in this process
+_loaded_paralog_clusters = dict()
+
+
+def load_paralog_clusters(dat_file, cache_dir=None):
+    """
+    paralog clusters as from parse_paralog_clusters(), loaded from the cache when available.
+    The cache is keyed on the sha1 of the .dat file, so changes to the file are picked up automatically.
+    """
+
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+
+    with open(dat_file, "rb") as fh:
+        file_hash = hashlib.sha1(fh.read()).hexdigest()
+
+    loaded_key = (os.path.realpath(dat_file), file_hash)
+    if loaded_key in _loaded_paralog_clusters:
+        return _loaded_paralog_clusters[loaded_key]
+
+    cache_file = os.path.join(
+        cache_dir, "{}.{}.pkl".format(os.path.basename(dat_file), file_hash)
+    )
+
+    if os.path.exists(cache_file):
+        with open(cache_file, "rb") as fh:
+            paralog_clusters = pickle.load(fh)
+    else:
+        paralog_clusters = parse_paralog_clusters(dat_file)
+        _write_paralog_clusters_cache(paralog_clusters, cache_file)
+
+    _loaded_paralog_clusters[loaded_key] = paralog_clusters
+
+    return paralog_clusters
+
+
+def _write_paralog_clusters_cache(paralog_clusters, cache_file):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        # written to a temp file and renamed, so concurrent scorers never read a partial cache
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file), suffix=".pkl")
+        with os.fdopen(fd, "wb") as fh:
+            pickle.dump(paralog_clusters, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        warnings.warn(
+            "Cannot write paralog clusters cache {}: {}".format(cache_file, e), Warning
+        )
+
+
+def paralog_pairs_dict(paralog_clusters):
+    """gene -> list of the indices of the paralog clusters containing it"""
+
+    gene_to_clusters = defaultdict(list)
+    for cluster_id, paralog_cluster in enumerate(paralog_clusters):
+        for gene in paralog_cluster:
+            gene_to_clusters[gene].append(cluster_id)
+
+    return gene_to_clusters
+
+
+class ParalogIndex(object):
+    """gene -> paralog cluster IDs, for matching fusions with equal or paralogous genes"""
+
+    def __init__(self, paralog_clusters):
+        genes = list()
+        cluster_ids = list()
+        for cluster_id, paralog_cluster in enumerate(paralog_clusters):
+            genes.extend(paralog_cluster)
+            cluster_ids.extend([cluster_id] * len(paralog_cluster))
+
+        self.num_clusters = len(paralog_clusters)
+        self.gene_clusters = pd.DataFrame(
+            {"gene": genes, "cluster_id": np.array(cluster_ids, dtype=np.int64)}
+        ).drop_duplicates()
+
+    @classmethod
+    def from_dat_file(cls, dat_file):
+        return cls(parse_paralog_clusters(dat_file))
+
+    def gene_keys(self, genes):
+        """
+        returns DataFrame (gene_idx, key): each gene keyed by its own ID, unique to the gene symbol
+        and beyond the cluster IDs, and by the IDs of its paralog clusters
+        """
+
+        genes = np.asarray(genes, dtype=object)
+        gene_idx = np.arange(len(genes))
+
+        gene_codes, _ = pd.factorize(genes)
+        own_keys = pd.DataFrame(
+            {"gene_idx": gene_idx, "key": self.num_clusters + gene_codes}
+        )
+
+        cluster_keys = (
+            pd.DataFrame({"gene_idx": gene_idx, "gene": genes})
+            .merge(self.gene_clusters, on="gene")
+            .rename(columns={"cluster_id": "key"})
+        )
+
+        return pd.concat(
+            [own_keys, cluster_keys[["gene_idx", "key"]]], ignore_index=True
+        )
+
+    def fusion_keys(self, fusions):
+        """
+        returns DataFrame (fusion_idx, left_key, right_key) for the A--B fusions,
+        excluding those not of two genes (ie. chains A--B--C)
+        """
+
+        fusions = pd.Series(np.asarray(fusions, dtype=object), dtype=object)
+        genes = fusions.str.split("--")
+        two_genes = (genes.str.len() == 2).values
+        fusion_idx = np.flatnonzero(two_genes)
+
+        # left and right genes share the gene codes, so the same symbol gets the same key at either end
+        keys = self.gene_keys(
+            np.concatenate(
+                [genes[two_genes].str[0].values, genes[two_genes].str[1].values]
+            )
+        )
+        left_keys = keys[keys["gene_idx"] < len(fusion_idx)]
+        right_keys = keys[keys["gene_idx"] >= len(fusion_idx)]
+
+        fusion_keys = pd.DataFrame(
+            {
+                "fusion_idx": fusion_idx[left_keys["gene_idx"].values],
+                "left_key": left_keys["key"].values,
+            }
+        ).merge(
+            pd.DataFrame(
+                {
+                    "fusion_idx": fusion_idx[
+                        right_keys["gene_idx"].values - len(fusion_idx)
+                    ],
+                    "right_key": right_keys["key"].values,
+                }
+            ),
+            on="fusion_idx",
+        )
+
+        return fusion_keys
+
+    def match_fusions(self, query_fusions, target_fusions):
+        """
+        Find the (query, target) fusion pairs with equal or paralogous left genes and
+        equal or paralogous right genes, as a join on their (left_key, right_key).
+
+        returns (query_indices, target_indices), ordered by query index, then target index.
+        """
+
+        fusion_keys = self.fusion_keys(
+            np.concatenate(
+                [
+                    np.asarray(query_fusions, dtype=object),
+                    np.asarray(target_fusions, dtype=object),
+                ]
+            )
+        )
+
+        is_query = fusion_keys["fusion_idx"] < len(query_fusions)
+        query_keys = fusion_keys[is_query]
+        target_keys = fusion_keys[~is_query].assign(
+            fusion_idx=fusion_keys["fusion_idx"][~is_query] - len(query_fusions)
+        )
+
+        hits = (
+            query_keys.merge(
+                target_keys,
+                on=["left_key", "right_key"],
+                suffixes=("_query", "_target"),
+            )[["fusion_idx_query", "fusion_idx_target"]]
+            .drop_duplicates()
+            .sort_values(["fusion_idx_query", "fusion_idx_target"])
+        )
+
+        return (
+            hits["fusion_idx_query"].values.astype(np.int64),
+            hits["fusion_idx_target"].values.astype(np.int64),
+        )
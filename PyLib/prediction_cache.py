@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+
+"""
+Cache of parsed and cleaned fusion predictions, as Parquet files.
+
+The entries are keyed on the sha1 of the prediction file contents along with
+the parser (ie. the BaseFusion subclass name), its parser version, and any
+parameters changing the parsed result, so re-running an evaluation over the
+same prog_results files loads (memory-maps) the normalized tables instead of
+re-parsing them. A changed file, or a bumped parser version, simply maps to
+a new entry.
+
+Entries are evicted least recently used first once the cache exceeds
+MAX_CACHE_BYTES, with the file modification time marking the last use.
+
+Requires pyarrow; without it, nothing is cached. The BaseFusion parsers only use
+the cache when constructed with use_cache=True, as by evaluate_prog_results.py.
+The cache directory is reported on stderr the first time an entry is written.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import warnings
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:
+    pa = None
+    pq = None
+
+CACHE_DIR = os.environ.get(
+    "PREDICTION_CACHE_DIR",
+    os.path.join(
+        os.path.expanduser("~"), ".cache", "LR-FusionBenchmarking", "predictions"
+    ),
+)
+
+MAX_CACHE_BYTES = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", 2 * 1024**3))
+
+# original column names, as parquet requires string column names (ie. LongGF's numbered columns)
+COLUMNS_METADATA_KEY = b"prediction_cache.columns"
+
+# cache directories already reported in this process
+_reported_cache_dirs = set()
+
+
+def cache_key(filename, parser, parser_version, *params):
+    """hex key of the file contents, the parser and its version, and the params (ie. a sample id)"""
+
+    file_hash = hashlib.sha1()
+    with open(filename, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            file_hash.update(chunk)
+
+    return hashlib.sha1(
+        json.dumps(
+            [file_hash.hexdigest(), parser, parser_version, [str(p) for p in params]]
+        ).encode()
+    ).hexdigest()
+
+
+def load(key, cache_dir=None):
+    """cached DataFrame for the key, or None if not cached"""
+
+    if pq is None:
+        return None
+
+    cache_file = _cache_file(key, cache_dir)
+    if not os.path.exists(cache_file):
+        return None
+
+    try:
+        table = pq.read_table(cache_file, memory_map=True)
+        # mark as recently used, for the LRU eviction
+        os.utime(cache_file)
+    except (OSError, pa.ArrowException) as e:
+        warnings.warn(
+            "Cannot read prediction cache {}: {}".format(cache_file, e), Warning
+        )
+        return None
+
+    df = table.to_pandas()
+    df.columns = json.loads(table.schema.metadata[COLUMNS_METADATA_KEY])
+
+    return df
+
+
+def store(df, key, cache_dir=None, max_bytes=None):
+    """cache the DataFrame under the key, then evict the least recently used entries beyond max_bytes"""
+
+    if pq is None:
+        return
+
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    if max_bytes is None:
+        max_bytes = MAX_CACHE_BYTES
+
+    cache_file = _cache_file(key, cache_dir)
+    tmp_file = None
+
+    try:
+        table = pa.Table.from_pandas(
+            df.set_axis([str(col) for col in df.columns], axis=1)
+        )
+        table = table.replace_schema_metadata(
+            {
+                **table.schema.metadata,
+                COLUMNS_METADATA_KEY: json.dumps(df.columns.tolist()),
+            }
+        )
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if cache_dir not in _reported_cache_dirs:
+            _reported_cache_dirs.add(cache_dir)
+            print(
+                "Caching parsed predictions in {} (up to {} bytes)".format(
+                    cache_dir, max_bytes
+                ),
+                file=sys.stderr,
+            )
+        # written to a temp file and renamed, so concurrent runs never read a partial entry
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir, suffix=".parquet.tmp")
+        with os.fdopen(fd, "wb") as fh:
+            pq.write_table(table, fh)
+        os.replace(tmp_file, cache_file)
+    except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+        warnings.warn(
+            "Cannot write prediction cache {}: {}".format(cache_file, e), Warning
+        )
+        if tmp_file is not None and os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        return
+
+    evict(cache_dir, max_bytes)
+
+
+def evict(cache_dir=None, max_bytes=None):
+    """remove the least recently used entries until the cache is within max_bytes, keeping the latest"""
+
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    if max_bytes is None:
+        max_bytes = MAX_CACHE_BYTES
+
+    entries = list()
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".parquet"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    entries.sort()
+    total_bytes = sum(size for _, size, _ in entries)
+
+    for _, size, path in entries[:-1]:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # evicted by a concurrent run
+            pass
+        total_bytes -= size
+
+
+def _cache_file(key, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = CACHE_DIR
+    return os.path.join(cache_dir, "{}.parquet".format(key))
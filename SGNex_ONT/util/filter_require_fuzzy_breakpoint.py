@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 
 import sys, os, re
-import intervaltree as itree
-import gzip
-from collections import defaultdict
-import csv
 import logging
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0,
+    os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), "../../PyLib"]),
+)
+import fusion_breakpoints
 
 logging.basicConfig(
     level=logging.INFO,
@@ -34,54 +38,73 @@ def main():
 
     preds_file = sys.argv[1]
 
-    logger.info("-building itrees for exon and fuzzy breakpoints")
-    chrom_itrees = build_fuzzy_breakpoint_itree(REF_EXONS_FILE)
+    logger.info("-indexing fuzzy exon boundaries")
+    chrom_codes = fusion_breakpoints.ChromCodes()
+    chrom_boundaries = build_exon_boundary_index(REF_EXONS_FILE, chrom_codes)
 
-    preds_reader = csv.DictReader(open(preds_file, "rt"), delimiter="\t")
-    preds_writer = csv.DictWriter(
-        sys.stdout,
-        fieldnames=preds_reader.fieldnames,
-        delimiter="\t",
-        lineterminator="\n",
-    )
+    preds = pd.read_table(preds_file, dtype=str, keep_default_na=False)
 
     logger.info("-filtering breakpoints")
-    preds_writer.writeheader()
+    brkpts = fusion_breakpoints.parse_breakpoints(preds["breakpoint"], chrom_codes)
 
-    for row in preds_reader:
-        breakpoint = row["breakpoint"]
-        break_lend, break_rend = breakpoint.split("--")
-        chrom_lend, coord_lend = break_lend.split(":")
-        chrom_rend, coord_rend = break_rend.split(":")
-
-        coord_lend = int(coord_lend)
-        coord_rend = int(coord_rend)
+    # within fuzzy break distance of exon boundaries
+    fuzzy_breakpoint = near_exon_boundary(
+        brkpts["left_chrom"], brkpts["left_coord"], chrom_boundaries
+    ) & near_exon_boundary(
+        brkpts["right_chrom"], brkpts["right_coord"], chrom_boundaries
+    )
 
-        if (len(chrom_itrees[chrom_lend][coord_lend : coord_lend + 1]) > 0) and (
-            len(chrom_itrees[chrom_rend][coord_rend : coord_rend + 1]) > 0
-        ):
-            # within fuzzy break distance of exon boundaries
-            preds_writer.writerow(row)
+    preds[fuzzy_breakpoint].to_csv(sys.stdout, sep="\t", index=False)
 
     logger.info("-done")
 
     sys.exit(0)
 
 
-def build_fuzzy_breakpoint_itree(ref_exons_file):
+def build_exon_boundary_index(ref_exons_file, chrom_codes):
+    """chrom code -> sorted unique exon boundary coordinates (exon lend and rend) on the chromosome"""
+
+    exons = pd.read_table(
+        ref_exons_file,
+        header=None,
+        names=["chrom", "lend", "rend"],
+        dtype={"chrom": str, "lend": np.int64, "rend": np.int64},
+    )
+
+    # only the distinct chromosome names are encoded
+    exon_chroms, chrom_names = pd.factorize(exons["chrom"])
+    chroms = np.tile(chrom_codes.encode(chrom_names)[exon_chroms], 2)
+    boundaries = np.concatenate([exons["lend"].values, exons["rend"].values])
+
+    return {
+        chrom: np.unique(boundaries[chrom_idx])
+        for chrom, chrom_idx in pd.Series(chroms).groupby(chroms).indices.items()
+    }
+
+
+def near_exon_boundary(chroms, coords, chrom_boundaries):
+    """
+    whether each coordinate is within FUZZY of an exon boundary on its chromosome,
+    as contained in the [boundary - FUZZY - 1, boundary + FUZZY + 1) intervals of the former
+    interval trees: coord - FUZZY <= boundary <= coord + FUZZY + 1
+    """
+
+    near = np.zeros(len(coords), dtype=bool)
 
-    chr_itrees = defaultdict(lambda: itree.IntervalTree())
+    for chrom, chrom_idx in pd.Series(chroms).groupby(chroms).indices.items():
+        if chrom not in chrom_boundaries:
+            continue
+        boundaries = chrom_boundaries[chrom]
+        chrom_coords = coords[chrom_idx]
 
-    with gzip.open(ref_exons_file, "rt") as fh:
-        for line in fh:
-            line = line.rstrip()
-            chrom, lend, rend = line.split("\t")
-            lend = int(lend)
-            rend = int(rend)
-            chr_itrees[chrom][(lend - FUZZY - 1) : (lend + FUZZY + 1)] = True
-            chr_itrees[chrom][(rend - FUZZY - 1) : (rend + FUZZY + 1)] = True
+        # first boundary at or past coord - FUZZY, which must not be past coord + FUZZY + 1
+        nearest_idx = np.searchsorted(boundaries, chrom_coords - FUZZY, side="left")
+        in_range = nearest_idx < len(boundaries)
+        near[chrom_idx[in_range]] = (
+            boundaries[nearest_idx[in_range]] <= chrom_coords[in_range] + FUZZY + 1
+        )
 
-    return chr_itrees
+    return near
 
 
 if __name__ == "__main__":
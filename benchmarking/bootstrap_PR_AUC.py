@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+
+import sys, os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+import calc_PR
+import scored_preds_to_ROC_PR
+
+# Bootstrap confidence intervals for the PR-AUC of each (sample, prog) in a scored predictions file.
+#
+# Each replicate resamples the truth fusions (TP and FN entries) and the FP predictions with replacement.
+# The replicates are represented as matrices of resampled indices, and the ROC, PR curve and AUC of all
+# replicates in a chunk are computed together with array operations, with the chunks spread over a process pool.
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="bootstrap confidence intervals for PR-AUC per sample and prog",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument(
+        "--scored_preds",
+        type=str,
+        required=True,
+        help="scored predictions with pred_class TP, FP, or FN",
+    )
+    parser.add_argument(
+        "--for_brkpts",
+        action="store_true",
+        default=False,
+        help="scored by breakpoints (fusion_breakpoints_to_TP_FP_FN.py)",
+    )
+    parser.add_argument(
+        "--min_read_support",
+        type=int,
+        default=0,
+        help="minimum read support for including data point in AUC computation",
+    )
+    parser.add_argument(
+        "--num_replicates",
+        type=int,
+        default=1000,
+        help="number of bootstrap replicates",
+    )
+    parser.add_argument(
+        "--conf_level",
+        type=float,
+        default=0.95,
+        help="confidence level for the intervals",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=100,
+        help="number of replicates computed together by each task",
+    )
+    parser.add_argument("--seed", type=int, default=1, help="random seed")
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes")
+    parser.add_argument(
+        "--output", type=str, required=True, help="output AUC confidence interval table"
+    )
+
+    args = parser.parse_args()
+
+    scored_df = scored_preds_to_ROC_PR.parse_scored_preds(
+        args.scored_preds, args.for_brkpts
+    )
+
+    CI_df = bootstrap_PR_AUC(
+        scored_df,
+        num_replicates=args.num_replicates,
+        conf_level=args.conf_level,
+        min_read_support=args.min_read_support,
+        for_brkpts=args.for_brkpts,
+        chunk_size=args.chunk_size,
+        seed=args.seed,
+        jobs=args.jobs,
+    )
+
+    CI_df.to_csv(args.output, sep="\t", index=False, float_format="%.3f", na_rep="NA")
+
+    sys.exit(0)
+
+
+def bootstrap_PR_AUC(
+    scored_df,
+    num_replicates=1000,
+    conf_level=0.95,
+    min_read_support=0,
+    for_brkpts=False,
+    chunk_size=100,
+    seed=1,
+    jobs=1,
+    step=0.01,
+):
+    """
+    scored_df: (sample, prog, pred_type, num_reads) as from scored_preds_to_ROC_PR.parse_scored_preds()
+
+    returns DataFrame with columns: sample, prog, AUC, CI_lower, CI_upper, num_replicates
+    """
+
+    sample_progs = list()
+    tasks = list()
+
+    seed_seqs = np.random.SeedSequence(seed).spawn(
+        scored_df.groupby(["sample", "prog"], sort=False).ngroups
+    )
+
+    for (sample, prog), sample_prog_df in scored_df.groupby(
+        ["sample", "prog"], sort=False
+    ):
+        num_reads = sample_prog_df["num_reads"].values
+        pred_type = sample_prog_df["pred_type"].values
+
+        # truth entries are ordered with the TPs first, so resampled indices < num_TP are TPs
+        TP_reads = num_reads[pred_type == "TP"].astype(float)
+        FP_reads = num_reads[pred_type == "FP"].astype(float)
+        num_truth = len(TP_reads) + np.sum(pred_type == "FN")
+
+        chunk_sizes = [chunk_size] * (num_replicates // chunk_size)
+        if num_replicates % chunk_size:
+            chunk_sizes.append(num_replicates % chunk_size)
+
+        for chunk_seed_seq, num_chunk_replicates in zip(
+            seed_seqs[len(sample_progs)].spawn(len(chunk_sizes)), chunk_sizes
+        ):
+            tasks.append(
+                (
+                    len(sample_progs),
+                    (
+                        TP_reads,
+                        FP_reads,
+                        num_truth,
+                        num_chunk_replicates,
+                        chunk_seed_seq,
+                        min_read_support,
+                        for_brkpts,
+                        step,
+                    ),
+                )
+            )
+
+        sample_progs.append((sample, prog, sample_prog_df))
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            chunk_AUCs = list(
+                executor.map(bootstrap_chunk_AUCs, *zip(*[task for _, task in tasks]))
+            )
+    else:
+        chunk_AUCs = [bootstrap_chunk_AUCs(*task) for _, task in tasks]
+
+    alpha = 1 - conf_level
+    CI_rows = list()
+
+    for i, (sample, prog, sample_prog_df) in enumerate(sample_progs):
+
+        replicate_AUCs = np.concatenate(
+            [AUCs for (j, _), AUCs in zip(tasks, chunk_AUCs) if j == i]
+        )
+
+        AUC = sample_prog_PR_AUC(sample_prog_df, min_read_support, for_brkpts, step)
+
+        if np.all(np.isnan(replicate_AUCs)):
+            CI_lower, CI_upper = np.nan, np.nan
+        else:
+            CI_lower, CI_upper = np.nanquantile(
+                replicate_AUCs, [alpha / 2, 1 - alpha / 2]
+            )
+
+        CI_rows.append(
+            {
+                "sample": sample,
+                "prog": prog,
+                "AUC": AUC,
+                "CI_lower": CI_lower,
+                "CI_upper": CI_upper,
+                "num_replicates": int(np.sum(~np.isnan(replicate_AUCs))),
+            }
+        )
+
+    return pd.DataFrame(
+        CI_rows,
+        columns=["sample", "prog", "AUC", "CI_lower", "CI_upper", "num_replicates"],
+    )
+
+
+def sample_prog_PR_AUC(sample_prog_df, min_read_support=0, for_brkpts=False, step=0.01):
+    """point estimate, as by scored_preds_to_ROC_PR.py on the sample's scored predictions"""
+
+    if not (sample_prog_df["pred_type"] != "FP").any():
+        return np.nan
+
+    ROC_df = scored_preds_to_ROC_PR.scored_preds_to_ROC(sample_prog_df, for_brkpts)
+
+    with open(os.devnull, "w") as fout:
+        prog_aucs = calc_PR.ROC_to_PR(
+            ROC_df.itertuples(index=False, name=None), fout, min_read_support, step
+        )
+
+    return prog_aucs[0][1] if prog_aucs else np.nan
+
+
+def bootstrap_chunk_AUCs(
+    TP_reads,
+    FP_reads,
+    num_truth,
+    num_replicates,
+    seed_seq,
+    min_read_support=0,
+    for_brkpts=False,
+    step=0.01,
+):
+    """
+    PR-AUC of num_replicates bootstrap replicates of a prog's TP, FP, and FN entries,
+    with the resampled indices drawn as (num_replicates, num_entries) matrices.
+    """
+
+    if num_truth == 0:
+        return np.full(num_replicates, np.nan)
+
+    rng = np.random.default_rng(seed_seq)
+
+    read_support = np.unique(np.concatenate([TP_reads, FP_reads]))
+
+    truth_idx = rng.integers(0, num_truth, size=(num_replicates, num_truth))
+    FP_idx = rng.integers(0, len(FP_reads), size=(num_replicates, len(FP_reads)))
+
+    TP_counts = replicate_counts(
+        truth_idx,
+        np.searchsorted(read_support, TP_reads),
+        len(read_support),
+    )
+    FP_counts = replicate_counts(
+        FP_idx, np.searchsorted(read_support, FP_reads), len(read_support)
+    )
+
+    return counts_to_PR_AUCs(
+        TP_counts,
+        FP_counts,
+        read_support,
+        num_truth,
+        min_read_support,
+        for_brkpts,
+        step,
+    )
+
+
+def replicate_counts(idx, entry_read_support_idx, num_read_support_vals):
+    """
+    idx: (num_replicates, n) resampled entry indices, with those beyond the entries ignored (FNs)
+    returns (num_replicates, num_read_support_vals) counts of the resampled entries at each read support value
+    """
+
+    replicate, entry = np.nonzero(idx < len(entry_read_support_idx))
+    flat_idx = (
+        replicate * num_read_support_vals
+        + entry_read_support_idx[idx[replicate, entry]]
+    )
+
+    return np.bincount(flat_idx, minlength=len(idx) * num_read_support_vals).reshape(
+        len(idx), num_read_support_vals
+    )
+
+
+def counts_to_PR_AUCs(
+    TP_counts,
+    FP_counts,
+    read_support,
+    num_truth,
+    min_read_support=0,
+    for_brkpts=False,
+    step=0.01,
+):
+    """
+    PR-AUC per replicate from the (num_replicates, len(read_support)) TP and FP counts at each
+    read support value, as calc_PR.py would compute from the replicate's ROC.
+
+    The ROC is evaluated at every read support value in all replicates. Values absent from a replicate
+    repeat the next ROC point, contributing zero area, and those past the replicate's top
+    value are excluded, so the AUCs equal those of the replicates' own ROC points.
+
+    returns AUC array, with nan for replicates lacking any retained ROC points
+    """
+
+    num_replicates, num_vals = TP_counts.shape
+
+    # TP and FP counts at each min read support threshold
+    TP_at = np.cumsum(TP_counts[:, ::-1], axis=1)[:, ::-1]
+    FP_at = np.cumsum(FP_counts[:, ::-1], axis=1)[:, ::-1]
+
+    # number of the replicate's own read support values at or above each value
+    present = (TP_counts + FP_counts) > 0
+    num_present_at = np.cumsum(present[:, ::-1], axis=1)[:, ::-1]
+
+    # all_TP_FP_FN_to_ROC.for_brkpts.pl excludes the top threshold, so the values up to
+    # the replicate's second highest present value are retained, rather than up to the
+    # grid value below its top value, which may be absent from the replicate
+    retained = (num_present_at >= (2 if for_brkpts else 1)) & (
+        read_support.astype(np.int64) >= min_read_support
+    )[np.newaxis, :]
+
+    # ROC points of all replicates as rows, ordered by replicate then increasing threshold
+    replicate, val_idx = np.nonzero(retained)
+    AUCs = np.full(num_replicates, np.nan)
+    if len(replicate) == 0:
+        return AUCs
+
+    tp = TP_at[replicate, val_idx]
+    fp = FP_at[replicate, val_idx]
+    ntruth = np.full(len(tp), num_truth, dtype=np.int64)
+
+    # each replicate's curve starts from all possible pairs predicted
+    first = np.concatenate([[True], replicate[1:] != replicate[:-1]])
+    ltp = np.where(first, ntruth, np.roll(tp, 1))
+    lfp = np.where(first, calc_PR.NTOTAL - ntruth, np.roll(fp, 1))
+
+    trecall, tprecision, keep = calc_PR.interpolate_PR(tp, fp, ltp, lfp, ntruth, step)
+
+    recall = tp / ntruth
+    precision = tp / (tp + fp)
+    lrecall = ltp / ntruth
+    lprecision = ltp / (ltp + lfp)
+
+    # points from the previous point through the kept interpolated points to the ROC point,
+    # with the points not kept set to the ROC point
+    curve_recall = np.concatenate(
+        [
+            lrecall[:, np.newaxis],
+            np.where(keep, trecall, recall[:, np.newaxis]),
+            recall[:, np.newaxis],
+        ],
+        axis=1,
+    )
+    curve_precision = np.concatenate(
+        [
+            lprecision[:, np.newaxis],
+            np.where(keep, tprecision, precision[:, np.newaxis]),
+            precision[:, np.newaxis],
+        ],
+        axis=1,
+    )
+
+    row_AUCs = np.sum(
+        0.5
+        * (curve_precision[:, :-1] + curve_precision[:, 1:])
+        * (curve_recall[:, :-1] - curve_recall[:, 1:]),
+        axis=1,
+    )
+
+    # extend the precision of each replicate's last ROC point down to recall 0
+    last = np.concatenate([replicate[1:] != replicate[:-1], [True]])
+    row_AUCs[last] += precision[last] * recall[last]
+
+    has_points = np.bincount(replicate, minlength=num_replicates) > 0
+    AUCs[has_points] = np.bincount(
+        replicate, weights=row_AUCs, minlength=num_replicates
+    )[has_points]
+
+    return AUCs
+
+
+if __name__ == "__main__":
+    main()
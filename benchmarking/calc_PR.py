@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 
-import sys
+import sys, os, re
+import glob
 import math
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import numpy as np
 
 # contributed by Bo Li, mod by bhaas
 
@@ -10,120 +14,367 @@ import argparse
 # https://dl.acm.org/doi/10.1145/1143844.1143874
 # pdf: https://scholar.google.com/scholar_url?url=https://dl.acm.org/doi/pdf/10.1145/1143844.1143874%3Fcasa_token%3DpI3ADwSLJ7IAAAAA:JiJtLel0wyk5TG1jZylYlXUvv00jNNT7Ka-6LLWm-4InTPyQj477xKBKetfCx5p5TqDkNXsYA1A&hl=en&sa=T&oi=ucasa&ct=ucasa&ei=s76fZpL1Dt2v6rQP6qW4gQY&scisig=AFWwaebC_t16FDtVfAZLSRuhDfFw
 
-ntruth = 0
+NTOTAL = 25000**2  # all possible gene pairs, rough approx.
 
 
 def main():
 
     parser = argparse.ArgumentParser(description="computes Precision-Recall Curve and AUC values", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     
-    parser.add_argument("--in_ROC", dest="in_ROC_file", type=str, default="", required=True, help="input ROC file")
+    parser.add_argument("--in_ROC", dest="in_ROC_file", type=str, default="", required=False, help="input ROC file")
 
-    parser.add_argument("--out_PR", dest="out_PR_file", type=str, default="", required=True, help="output PR file")
+    parser.add_argument("--out_PR", dest="out_PR_file", type=str, default="", required=False, help="output PR file")
+
+    parser.add_argument("--in_ROC_list", dest="in_ROC_list", type=str, default="", required=False,
+                        help="batch mode: file listing the input ROC files (ie. ROC.files.list), each written to its .PR and .PR.AUC files")
+
+    parser.add_argument("--in_ROC_glob", dest="in_ROC_glob", type=str, default="", required=False,
+                        help="batch mode: glob pattern for the input ROC files (ie. './*/fusion_preds.txt.scored.ROC')")
+
+    parser.add_argument("--in_PR_AUC_list", dest="in_PR_AUC_list", type=str, default="", required=False,
+                        help="file listing .PR.AUC files already written (ie. by scored_preds_to_ROC_PR.py), only consolidated into --out_AUC_table")
+
+    parser.add_argument("--out_AUC_table", dest="out_AUC_table", type=str, default="", required=False,
+                        help="batch mode: consolidated AUC table with analysis, sample, prog, and AUC columns")
+
+    parser.add_argument("--jobs", dest="jobs", type=int, default=1, help="batch mode: number of processes")
 
     parser.add_argument("--min_read_support", dest="min_read_support", type=int, default=0, help="minimum read support for including data point in AUC computation")
 
+    parser.add_argument("--min_read_support_range", dest="min_read_support_range", type=str, default="",
+                        help="sweep the minimum read support as min:max[:step] (inclusive), writing the AUC for each to --out_AUC_matrix")
+
+    parser.add_argument("--out_AUC_matrix", dest="out_AUC_matrix", type=str, default="", required=False,
+                        help="output (prog, min_support, AUC) table for --min_read_support_range")
+
+    parser.add_argument("--step", dest="step", type=float, default=0.01, help="recall step size for interpolating precision between ROC points")
+
     args = parser.parse_args()
 
     
-    ntotal = 25000**2  # all possible gene pairs, rough approx.
-    prog = ""
-    ltp = lfp = 0
-    auc = 0.0
-
-    with open(args.in_ROC_file) as fin, open(args.out_PR_file, "w") as fout:
-        # write header
-        fout.write("{}\t{}\t{}\t{}\n".format('prog', 'recall', 'precision', 'actual'))
-        next(fin) # skip header line
-        for line in fin:
-            fields = line.strip().split()
+    if args.min_read_support_range:
+        if not (args.in_ROC_file and args.out_AUC_matrix):
+            parser.error("--min_read_support_range requires --in_ROC and --out_AUC_matrix")
 
-            min_frags = int(float(fields[1]))
-            if (min_frags < args.min_read_support):
-                continue
-            
-            tp = int(fields[2])
-            fp = int(fields[3])
-            fn = int(fields[4])
-
-            global ntruth
-            ntruth = tp + fn
-
-            if prog != fields[0]:
-                # prog switch
-                if prog != "":
-                    # process last line of prev prog and report
-                    auc += output(fout, prog, 0, 0, ltp, lfp)
-                    print("{}\t{:.2f}".format(prog, auc))
-                # first line of next prog, reinit vals
-                prog = fields[0]
-                ltp = ntruth
-                lfp = ntotal - ntruth
-                auc = output(fout, prog, ltp, lfp)
-
-            # add to auc
-            auc += output(fout, prog, tp, fp, ltp, lfp)
-            ltp = tp
-            lfp = fp
-
-        if prog != "":
-            # last line of file, process last prog results
-            auc += output(fout, prog, 0, 0, ltp, lfp)
-            print("{}\t{:.2f}".format(prog, auc))
+        min_read_supports = parse_range(args.min_read_support_range)
+
+        with open(args.in_ROC_file) as fin:
+            next(fin) # skip header line
+            roc_rows = (line.strip().split() for line in fin)
+            prog_support_aucs = ROC_to_AUC_matrix(roc_rows, min_read_supports, args.step)
+
+        with open(args.out_AUC_matrix, "w") as fout:
+            fout.write("\t".join(["prog", "min_support", "AUC"]) + "\n")
+            for prog, min_support, auc in prog_support_aucs:
+                fout.write("{}\t{}\t{}\n".format(prog, min_support, "NA" if auc is None else "{:.2f}".format(auc)))
+
+    elif args.in_PR_AUC_list:
+        if not args.out_AUC_table:
+            parser.error("--out_AUC_table is required with --in_PR_AUC_list")
+
+        with open(args.in_PR_AUC_list) as fh:
+            PR_AUC_files = [line.strip() for line in fh if line.strip()]
+
+        consolidate_PR_AUC_files(PR_AUC_files, args.out_AUC_table)
+
+    elif args.in_ROC_list or args.in_ROC_glob:
+        if not args.out_AUC_table:
+            parser.error("--out_AUC_table is required in batch mode")
+
+        ROC_files = list()
+        if args.in_ROC_list:
+            with open(args.in_ROC_list) as fh:
+                ROC_files.extend([line.strip() for line in fh if line.strip()])
+        if args.in_ROC_glob:
+            ROC_files.extend(sorted(glob.glob(args.in_ROC_glob, recursive=True)))
+
+        batch_ROC_to_PR(ROC_files, args.out_AUC_table, args.min_read_support, args.step, args.jobs)
+
+    elif args.in_ROC_file and args.out_PR_file:
+        with open(args.in_ROC_file) as fin, open(args.out_PR_file, "w") as fout:
+            next(fin) # skip header line
+            roc_rows = (line.strip().split() for line in fin)
+            for prog, auc in ROC_to_PR(roc_rows, fout, args.min_read_support, args.step):
+                print("{}\t{:.2f}".format(prog, auc))
+
+    else:
+        parser.error("require --in_ROC and --out_PR, or --in_ROC_list / --in_ROC_glob / --in_PR_AUC_list with --out_AUC_table")
 
 
     sys.exit(0)
 
 
 
+def batch_ROC_to_PR(ROC_files, out_AUC_table, min_read_support=0, step=0.01, jobs=1):
+    """
+    Process all the ROC files in one interpreter, across a process pool, writing each
+    file's .PR and .PR.AUC files along with the consolidated long-format AUC table.
+    """
 
-def output(fout, prog, ntp, nfp, nltp = -1, nlfp = -1):
-    """ return delta auc """
+    args = [(ROC_file, min_read_support, step) for ROC_file in ROC_files]
 
-    dauc = 0.0
-    if nltp < 0:
-        recall = 1.0
-        precision = ntp * 1.0 / (ntp + nfp)
-        fout.write("{}\t{}\t{}\t0\n".format(prog, recall, precision))
-    elif ntp == 0 and nfp == 0:
-        assert nltp >= 0 and nlfp >= 0 and nltp + nlfp > 0
-        lrecall = nltp * 1.0 / ntruth
-        lprecision = nltp * 1.0 / (nltp + nlfp)
-        recall = 0.0
-        precision = lprecision
-        if lrecall > 0.0:
-            fout.write("{}\t{}\t{}\t0\n".format(prog, recall, precision))
-            dauc = lrecall * lprecision
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            file_aucs = list(executor.map(ROC_file_to_PR, *zip(*args)))
     else:
-        recall = ntp * 1.0 / ntruth
-        precision = ntp * 1.0 / (ntp + nfp)
-
-        if nltp > ntp:
-            lrecall = nltp * 1.0 / ntruth
-            lprecision = nltp * 1.0 / (nltp + nlfp)
-            
-            rate = (nlfp - nfp) * 1.0 / (nltp - ntp)
-            trecall = lrecall - 0.01
-            x = nltp - ntp - 0.01 * ntruth
-            tlrecall = lrecall
-            tlprecision = lprecision
-            while trecall > recall:
-                trecall = (ntp + x) * 1.0 / ntruth
-                tprecision = (ntp + x) * 1.0 / (ntp + x + nfp + rate * x)
-                fout.write("{}\t{}\t{}\t0\n".format(prog, trecall, tprecision))
-                dauc += 0.5 * (tlprecision + tprecision) * (tlrecall - trecall)
-
-                tlrecall = trecall 
-                tlprecision = tprecision
-                trecall -= 0.01
-                x -= 0.01 * ntruth
-
-            dauc += 0.5 * (tlprecision + precision) * (tlrecall - recall)    
-
-        fout.write("{}\t{}\t{}\t1\n".format(prog, recall, precision))
+        file_aucs = [ROC_file_to_PR(*arg) for arg in args]
+
+    with open(out_AUC_table, "w") as ofh:
+        ofh.write("\t".join(["analysis", "sample", "prog", "AUC"]) + "\n")
+        for ROC_file, prog_aucs in zip(ROC_files, file_aucs):
+            analysis, sample = get_analysis_and_sample(ROC_file)
+            for AUC_line in format_AUC_lines(prog_aucs).splitlines(keepends=True):
+                ofh.write(analysis + "\t" + sample + "\t" + AUC_line)
+
+
+
+def consolidate_PR_AUC_files(PR_AUC_files, out_AUC_table):
+    """
+    Write the consolidated long-format AUC table, as by batch_ROC_to_PR(), from .PR.AUC files
+    that are already written, without recomputing the PR curves.
+    """
+
+    with open(out_AUC_table, "w") as ofh:
+        ofh.write("\t".join(["analysis", "sample", "prog", "AUC"]) + "\n")
+        for PR_AUC_file in PR_AUC_files:
+            analysis, sample = get_analysis_and_sample(PR_AUC_file)
+            with open(PR_AUC_file) as fh:
+                for AUC_line in fh:
+                    if AUC_line.strip():
+                        ofh.write(analysis + "\t" + sample + "\t" + AUC_line)
+
+
+
+def ROC_file_to_PR(ROC_file, min_read_support=0, step=0.01):
+    """
+    writes ROC_file's PR curve to its .PR file and the AUC values to its .PR.AUC file,
+    as per: calc_PR.py --in_ROC x.ROC --out_PR x.PR | sort -k2,2gr > x.PR.AUC
+    returns the list of (prog, AUC)
+    """
+
+    PR_file_prefix = re.sub(r"\.ROC$", "", ROC_file)
+
+    with open(ROC_file) as fin, open(PR_file_prefix + ".PR", "w") as fout:
+        next(fin) # skip header line
+        roc_rows = (line.strip().split() for line in fin)
+        prog_aucs = ROC_to_PR(roc_rows, fout, min_read_support, step)
+
+    with open(PR_file_prefix + ".PR.AUC", "w") as fout:
+        fout.write(format_AUC_lines(prog_aucs))
+
+    return prog_aucs
+
+
+
+def get_analysis_and_sample(ROC_file):
+    """
+    sample is the directory holding the ROC (or .PR.AUC) file, analysis is the directory above it
+    ie. __breakpoint_win10/rep1_cov50_pass10_sample1/fusion_preds.txt.scored.ROC
+    """
+
+    sample_dir = os.path.dirname(os.path.abspath(ROC_file))
+
+    return os.path.basename(os.path.dirname(sample_dir)), os.path.basename(sample_dir)
+
+
+
+def format_AUC_lines(prog_aucs):
+    """
+    prog\tAUC lines, ordered as by: sort -k2,2gr
+    """
+
+    AUC_lines = sorted(["{}\t{:.2f}\n".format(prog, auc) for prog, auc in prog_aucs],
+                       key=lambda x: (-float(x.split("\t")[1]), x))
+
+    return "".join(AUC_lines)
+
+
+
+def parse_range(range_str):
+    """
+    'min:max[:step]' -> list of the integers from min to max inclusive
+    """
+
+    vals = [int(x) for x in range_str.split(":")]
+    if len(vals) == 2:
+        vals.append(1)
+    if len(vals) != 3 or vals[2] <= 0 or vals[1] < vals[0]:
+        raise ValueError("Error, cannot parse range {}, expecting min:max[:step]".format(range_str))
+
+    return list(range(vals[0], vals[1] + 1, vals[2]))
+
+
+
+def group_ROC_rows(roc_rows):
+    """
+    roc_rows: iterable of ROC (prog, min_sum_frags, TP, FP, FN, ...) rows, grouped by prog
+    yields (prog, min_support, counts) per prog, with min_support the integer min_sum_frags
+    of each ROC point and counts the (TP, FP, FN) array
+    """
+
+    for prog, prog_rows in itertools.groupby(roc_rows, key=lambda fields: fields[0]):
+        prog_rows = list(prog_rows)
+
+        min_support = np.array([int(float(fields[1])) for fields in prog_rows], dtype=np.int64)
+        counts = np.array([(int(fields[2]), int(fields[3]), int(fields[4])) for fields in prog_rows], dtype=np.int64)
+
+        yield prog, min_support, counts
+
+
+
+def ROC_to_PR(roc_rows, fout, min_read_support=0, step=0.01):
+    """
+    roc_rows: iterable of ROC (prog, min_sum_frags, TP, FP, FN, ...) rows, grouped by prog
+    writes the PR curve to fout in a single write, and returns a list of (prog, AUC)
+    """
+
+    roc_rows = (fields for fields in roc_rows if int(float(fields[1])) >= min_read_support)
+
+    prog_aucs = list()
+    PR_lines = ["{}\t{}\t{}\t{}\n".format('prog', 'recall', 'precision', 'actual')]
+
+    for prog, min_support, counts in group_ROC_rows(roc_rows):
+
+        recall, precision, actual = PR_curve(counts[:,0], counts[:,1], counts[:,2], step)
+
+        prog_aucs.append((prog, PR_AUC(recall, precision)))
+
+        PR_lines.extend(["%s\t%r\t%r\t%d\n" % (prog, r, p, a)
+                         for r, p, a in zip(recall.tolist(), precision.tolist(), actual.tolist())])
+
+    fout.write("".join(PR_lines))
     
-    return dauc
+    return prog_aucs
+
+
+
+def ROC_to_AUC_matrix(roc_rows, min_read_supports, step=0.01):
+    """
+    AUC at each of the min_read_supports, from a single pass over the ROC rows.
+    Each prog's ROC points are in increasing min_sum_frags order, so the points retained at a
+    given min read support are the suffix starting from its searchsorted position.
+
+    returns a list of (prog, min_support, AUC), with AUC None if no ROC points are retained,
+    and otherwise the same AUC as ROC_to_PR() with that min_read_support
+    """
+
+    prog_support_aucs = list()
+
+    for prog, min_support, counts in group_ROC_rows(roc_rows):
+
+        assert np.all(min_support[1:] >= min_support[:-1]), "Error, ROC rows for {} not sorted by min_sum_frags".format(prog)
+
+        starts = np.searchsorted(min_support, min_read_supports, side="left")
+
+        for min_read_support, start in zip(min_read_supports, starts.tolist()):
+            if start == len(min_support):
+                prog_support_aucs.append((prog, min_read_support, None))
+                continue
+
+            recall, precision, actual = PR_curve(counts[start:,0], counts[start:,1], counts[start:,2], step)
+            prog_support_aucs.append((prog, min_read_support, PR_AUC(recall, precision)))
+
+    return prog_support_aucs
+
+
+
+def PR_AUC(recall, precision):
+    # trapezoids between consecutive points of the curve, from recall 1 down to 0
+    return float(np.sum(0.5 * (precision[:-1] + precision[1:]) * (recall[:-1] - recall[1:])))
+
+
+
+def PR_curve(tp, fp, fn, step=0.01):
+    """
+    Precision-Recall curve for a prog's ROC points (tp, fp, fn at increasing min read support),
+    with precision interpolated in recall steps between the ROC points.
+
+    returns (recall, precision, actual) arrays, actual=1 for the ROC points, 0 for interpolated ones.
+    """
+
+    # ROC points without any TP or FP prediction (ie. beyond the highest read support) have no
+    # precision. As the former TP=FP=0 branch, they only end the curve at recall 0, with the
+    # precision of the previous point, which the recall 0 extension below adds.
+    has_preds = (tp + fp) > 0
+    if not np.any(has_preds):
+        # from all possible pairs predicted straight down to recall 0
+        precision = fn[0] / NTOTAL
+        return np.array([1.0, 0.0]), np.array([precision, precision]), np.array([0, 0])
+    tp, fp, fn = tp[has_preds], fp[has_preds], fn[has_preds]
+
+    # recall at each ROC point is relative to the number of truth fusions
+    ntruth = tp + fn
+
+    # start from all possible pairs predicted: (recall=1, precision=ntruth/ntotal)
+    ltp = np.concatenate([[ntruth[0]], tp[:-1]])
+    lfp = np.concatenate([[NTOTAL - ntruth[0]], fp[:-1]])
+
+    # each ROC point is preceded by the points interpolated from the previous one
+    trecall, tprecision, keep = interpolate_PR(tp, fp, ltp, lfp, ntruth, step)
+
+    recall = np.concatenate([trecall, (tp / ntruth)[:, np.newaxis]], axis=1)
+    precision = np.concatenate([tprecision, (tp / (tp + fp))[:, np.newaxis]], axis=1)
+    actual = np.zeros(recall.shape, dtype=np.int64)
+    actual[:, -1] = 1
+    keep = np.concatenate([keep, np.ones((len(tp), 1), dtype=bool)], axis=1)
+
+    recall = np.concatenate([[1.0], recall[keep]])
+    precision = np.concatenate([[ntruth[0] / NTOTAL], precision[keep]])
+    actual = np.concatenate([[0], actual[keep]])
+
+    # extend the precision of the last ROC point down to recall 0.
+    # This last segment adds tp[-1]/ntruth[-1] * precision to the AUC, with the prog's own TP+FN.
+    # The previous implementation divided by the global ntruth, which at a prog switch was already
+    # that of the next prog's first ROC row, so its PR.AUC of every prog but the last one in the
+    # file was off whenever the next prog's TP+FN differed.
+    if tp[-1] > 0:
+        recall = np.append(recall, 0.0)
+        precision = np.append(precision, tp[-1] / (tp[-1] + fp[-1]))
+        actual = np.append(actual, 0)
+
+    return recall, precision, actual
+
+
+
+def interpolate_PR(ntp, nfp, nltp, nlfp, ntruth, step=0.01):
+    """
+    Interpolate (recall, precision) between each pair of ROC points (nltp, nlfp) -> (ntp, nfp)
+    at recall steps below the previous point, as per Davis & Goadrich: the FPs accumulate
+    at a constant rate per additional TP.
+
+    returns (recall, precision, keep), as 2D arrays with a row per ROC point pair,
+    and keep flagging the interpolated points in each row.
+    """
+
+    recall = ntp / ntruth
+    lrecall = nltp / ntruth
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rate = (nlfp - nfp) / (nltp - ntp)
+
+    # number of steps needed for the widest pair, with a margin for rounding
+    max_steps = int(np.max(np.maximum(lrecall - recall, 0)) / step) + 3
+
+    # x: additional TPs beyond ntp, decremented by step*ntruth as a running sum along each row
+    x = np.repeat((-step * ntruth)[:, np.newaxis], max_steps, axis=1)
+    x[:, 0] = nltp - ntp - step * ntruth
+    x = np.cumsum(x, axis=1)
+
+    # (the margin steps may divide by zero, and are not kept)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        trecall = (ntp[:, np.newaxis] + x) / ntruth[:, np.newaxis]
+        tprecision = (ntp[:, np.newaxis] + x) / (
+            ntp[:, np.newaxis] + x + nfp[:, np.newaxis] + rate[:, np.newaxis] * x
+        )
+
+    # keep stepping while the recall one step below the previous point exceeds the ROC point recall
+    next_recall = np.concatenate(
+        [(lrecall - step)[:, np.newaxis], trecall[:, :-1] - step], axis=1
+    )
+    keep = np.logical_and.accumulate(next_recall > recall[:, np.newaxis], axis=1)
+    keep[nltp <= ntp, :] = False
+    assert not np.any(keep[:, -1]), "Error, interpolation steps exceeded"
 
+    return trecall, tprecision, keep
 
 
 
@@ -3,13 +3,16 @@
 import sys, os, re
 import pandas as pd
 import gzip
-import intervaltree
-from intervaltree import Interval
-from typing import Any
 from collections import defaultdict
 import warnings
 import numpy as np
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(
+    0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), "../PyLib"])
+)
+import fusion_breakpoints
 
 
 def main():
@@ -20,28 +23,145 @@ def main():
     )
 
     parser.add_argument(
-        "--truth_fusions", type=str, required=True, help="truth fusions"
+        "--truth_fusions",
+        type=str,
+        required=True,
+        help="truth fusions. If it includes a 'sample' column (ie. pbsim3_wreps.truthset.rep1.TSV), all samples are scored in batch mode",
     )
     parser.add_argument(
         "--pred_fusions", type=str, required=True, help="predicted fusions"
     )
     parser.add_argument(
         "--max_dist",
+        type=str,
+        required=False,
+        help="maximum allowed distance from known breakpoints, or a comma-delimited list of them (ie. 0,10,100) to score all in a single pass",
+        default="0",
+    )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        required=False,
+        default=None,
+        help="batch mode: write scored predictions to output_dir/{sample}/fusion_preds.txt.scored instead of stdout. Comma-delimited list with one output_dir per --max_dist if multiple.",
+    )
+    parser.add_argument(
+        "--curve_table",
+        type=str,
+        required=False,
+        default=None,
+        help="write the fraction of truth and predicted breakpoints matched vs. max_dist to this file",
+    )
+    parser.add_argument(
+        "--jobs",
         type=int,
         required=False,
-        help="maximum allowed distance from known breakpoints",
-        default=0,
+        default=1,
+        help="batch mode: number of processes for scoring the (sample, prog) groups",
     )
 
     args = parser.parse_args()
 
     truth_fusions = args.truth_fusions
     pred_fusions = args.pred_fusions
-    max_dist = args.max_dist
+    max_dists = [int(x) for x in args.max_dist.split(",")]
+
+    output_dirs = None
+    if args.output_dir is not None:
+        output_dirs = args.output_dir.split(",")
+        assert len(output_dirs) == len(
+            max_dists
+        ), "Error, need one --output_dir per --max_dist"
+
+    # chromosome codes shared by the truth and predicted breakpoint arrays
+    chrom_codes = fusion_breakpoints.ChromCodes()
+
+    truth_fusions_df, truth_brkpts = parse_truth_fusions(truth_fusions, chrom_codes)
+    pred_fusions_df, pred_brkpts, pred_parsed = parse_pred_fusions(
+        pred_fusions, chrom_codes
+    )
+
+    if "sample" not in truth_fusions_df.columns:
+        ## should only be one sample type!
+        assert len(pred_fusions_df["sample"].unique()) == 1, "Error, num samples != 1 "
+        sample_name = pred_fusions_df["sample"].unique()[0]
+        truth_fusions_df["sample"] = sample_name
+
+    write_header = True
+    curve_dfs = list()
+    for sample_name, dist_to_scored_df in score_samples(
+        truth_fusions_df,
+        truth_brkpts,
+        pred_fusions_df,
+        pred_brkpts,
+        max_dists,
+        chrom_codes,
+        args.jobs,
+        pred_parsed,
+    ):
+        for i, max_dist in enumerate(max_dists):
+            scored_df = dist_to_scored_df[max_dist]
+
+            if output_dirs is not None:
+                sample_dir = os.path.join(output_dirs[i], sample_name)
+                os.makedirs(sample_dir, exist_ok=True)
+                scored_df.to_csv(
+                    os.path.join(sample_dir, "fusion_preds.txt.scored"),
+                    sep="\t",
+                    index=False,
+                )
+            else:
+                if len(max_dists) > 1:
+                    scored_df = scored_df.assign(max_dist=max_dist)
+                scored_df.to_csv(sys.stdout, sep="\t", index=False, header=write_header)
+                write_header = False
+
+        if args.curve_table is not None:
+            curve_dfs.append(breakpoint_accuracy_curve(dist_to_scored_df))
+
+    if write_header and output_dirs is None:
+        # nothing scored, written as an empty scored table
+        empty_scored_df(truth_fusions_df, pred_fusions_df).to_csv(
+            sys.stdout, sep="\t", index=False
+        )
+
+    if args.curve_table is not None:
+        if not curve_dfs:
+            curve_dfs.append(breakpoint_accuracy_curve(dict()))
+        pd.concat(curve_dfs).to_csv(args.curve_table, sep="\t", index=False)
+
+    sys.exit(0)
+
+
+def parse_truth_fusions(truth_fusions, chrom_codes):
+    """
+    returns (truth_fusions_df, truth_brkpts), with truth_brkpts the lex-sorted breakpoint array
+    aligned with the rows of truth_fusions_df
+    """
 
     truth_fusions_df = pd.read_csv(truth_fusions, sep="\t")
-    truth_fusions_df["truth_lexsort_breakpoint"] = truth_fusions_df["breakpoint"].apply(
-        lambda x: "--".join(sorted(x.split("--")))
+
+    if "sample" in truth_fusions_df.columns:
+        # multi-sample truth set, restructured as done by parse_truth_set() in the analyze_*.pl scripts
+        truth_fusions_df = pd.DataFrame(
+            {
+                "sample": truth_fusions_df["sample"],
+                "fusion_name": truth_fusions_df["FusionName"],
+                "breakpoint": truth_fusions_df["Hg38_LeftBreakpoint"]
+                + "--"
+                + truth_fusions_df["Hg38_RightBreakpoint"],
+                "num_reads": truth_fusions_df["num_reads"],
+            }
+        ).drop_duplicates(["sample", "fusion_name"], keep="last")
+
+    truth_brkpts = fusion_breakpoints.lexsort_ends(
+        fusion_breakpoints.parse_breakpoints(
+            truth_fusions_df["breakpoint"], chrom_codes
+        ),
+        chrom_codes,
+    )
+    truth_fusions_df["truth_lexsort_breakpoint"] = (
+        fusion_breakpoints.format_breakpoints(truth_brkpts, chrom_codes)
     )
     truth_fusions_df.rename(
         columns={
@@ -52,29 +172,175 @@ def main():
         inplace=True,
     )
 
+    return truth_fusions_df, truth_brkpts
+
+
+def parse_pred_fusions(pred_fusions, chrom_codes):
+    """
+    returns (pred_fusions_df, pred_brkpts, pred_parsed), with pred_brkpts the lex-sorted breakpoint array
+    aligned with the rows of pred_fusions_df, and pred_parsed masking the rows with parsed breakpoints.
+
+    Predictions lacking the chrom:coord--chrom:coord formatting (ie. chains or '.') are skipped
+    for breakpoint matching, and reported as unmatched predictions. Those lacking any breakpoint are dropped.
+    """
+
     pred_fusions_df = pd.read_csv(pred_fusions, sep="\t")
-    pred_fusions_df["pred_lexsort_breakpoint"] = pred_fusions_df["breakpoint"].apply(
-        lambda x: "--".join(sorted(x.split("--")))
+
+    no_breakpoint = pred_fusions_df["breakpoint"].isnull().values
+    if no_breakpoint.any():
+        warnings.warn(
+            f"{no_breakpoint.sum()} predictions lack a breakpoint. Skipping.", Warning
+        )
+        pred_fusions_df = pred_fusions_df[~no_breakpoint].reset_index(drop=True)
+
+    pred_parsed = fusion_breakpoints.is_breakpoint(pred_fusions_df["breakpoint"])
+    for breakpt in pred_fusions_df["breakpoint"][~pred_parsed].unique():
+        warnings.warn(f"{breakpt} lacks expected formatting. Skipping.", Warning)
+
+    # rows not parsed keep the zeroed entries, and are left out of the matching
+    pred_brkpts = np.zeros(
+        len(pred_fusions_df), dtype=fusion_breakpoints.BREAKPOINT_DTYPE
+    )
+    pred_brkpts[pred_parsed] = fusion_breakpoints.lexsort_ends(
+        fusion_breakpoints.parse_breakpoints(
+            pred_fusions_df["breakpoint"][pred_parsed], chrom_codes
+        ),
+        chrom_codes,
     )
 
-    ## should only be one sample type!
-    assert len(pred_fusions_df["sample"].unique()) == 1, "Error, num samples != 1 "
-    sample_name = pred_fusions_df["sample"].unique()[0]
+    pred_lexsort_breakpoint = (
+        pred_fusions_df["breakpoint"]
+        .astype(str)
+        .map(lambda x: "--".join(sorted(x.split("--"))))
+    )
+    pred_lexsort_breakpoint[pred_parsed] = fusion_breakpoints.format_breakpoints(
+        pred_brkpts[pred_parsed], chrom_codes
+    )
+    pred_fusions_df["pred_lexsort_breakpoint"] = pred_lexsort_breakpoint
 
-    # must copy the truth set for each program to be analyzed separately so FNs show up in each case.
-    all_results_df = None
-    progs = pred_fusions_df["prog"].unique()
-    truth_breakpoints = truth_fusions_df["truth_lexsort_breakpoint"]
-    for prog in progs:
+    return pred_fusions_df, pred_brkpts, pred_parsed
 
-        prog_pred_fusions_df = pred_fusions_df[pred_fusions_df["prog"] == prog]
 
-        prog_pred_fusions_brkpts = prog_pred_fusions_df["pred_lexsort_breakpoint"]
+def score_samples(
+    truth_fusions_df,
+    truth_brkpts,
+    pred_fusions_df,
+    pred_brkpts,
+    max_dists,
+    chrom_codes,
+    jobs=1,
+    pred_parsed=None,
+):
+    """
+    Score each (sample, prog) group at each of the max_dists, spreading the groups across a process pool,
+    and yield (sample_name, {max_dist: scored_df}) for each sample in the truth set.
+
+    Only the predictions masked by pred_parsed (default: all) are matched by breakpoint.
+    """
 
-        results_df = overlap_breakpoints(
-            truth_breakpoints, prog_pred_fusions_brkpts, max_dist
+    if pred_parsed is None:
+        pred_parsed = np.ones(len(pred_fusions_df), dtype=bool)
+
+    sample_progs = list()
+    group_args = list()
+
+    missing_truth_samples = np.setdiff1d(
+        pred_fusions_df["sample"].unique().astype(str),
+        truth_fusions_df["sample"].unique().astype(str),
+    )
+    if len(missing_truth_samples) > 0:
+        warnings.warn(
+            "No truth fusions for predicted samples: {}. Skipping their predictions.".format(
+                ", ".join(missing_truth_samples)
+            )
         )
 
+    for sample_name in truth_fusions_df["sample"].unique():
+
+        sample_truth_mask = (truth_fusions_df["sample"] == sample_name).values
+        sample_truth_df = truth_fusions_df[sample_truth_mask].drop(columns="sample")
+        sample_pred_mask = (pred_fusions_df["sample"] == sample_name).values
+        sample_pred_fusions_df = pred_fusions_df[sample_pred_mask]
+        sample_pred_brkpts = pred_brkpts[sample_pred_mask]
+        sample_pred_parsed = pred_parsed[sample_pred_mask]
+
+        progs = sample_pred_fusions_df["prog"].unique()
+        if len(progs) == 0:
+            warnings.warn(f"No predictions for sample {sample_name}. Skipping.")
+            continue
+
+        sample_progs.append((sample_name, len(progs)))
+
+        # must copy the truth set for each program to be analyzed separately so FNs show up in each case.
+        for prog in progs:
+            prog_mask = (sample_pred_fusions_df["prog"] == prog).values
+            group_args.append(
+                (
+                    sample_truth_df,
+                    truth_brkpts[sample_truth_mask],
+                    sample_pred_fusions_df[prog_mask],
+                    sample_pred_brkpts[prog_mask & sample_pred_parsed],
+                    sample_name,
+                    prog,
+                    max_dists,
+                    chrom_codes,
+                )
+            )
+
+    if not group_args:
+        warnings.warn("No predictions for any of the truth samples.")
+        return
+
+    if jobs > 1:
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        group_results = executor.map(score_prog_breakpoints, *zip(*group_args))
+    else:
+        executor = None
+        group_results = map(score_prog_breakpoints, *zip(*group_args))
+
+    for sample_name, num_progs in sample_progs:
+        sample_results = [next(group_results) for _ in range(num_progs)]
+        dist_to_scored_df = dict()
+        for max_dist in max_dists:
+            all_results_df = pd.concat(
+                [dist_to_results_df[max_dist] for dist_to_results_df in sample_results]
+            )
+            dist_to_scored_df[max_dist] = assign_pred_classes(all_results_df)
+
+        yield sample_name, dist_to_scored_df
+
+    if executor is not None:
+        executor.shutdown()
+
+
+def empty_scored_df(truth_fusions_df, pred_fusions_df):
+    """scored table without any rows, with the columns of the truth and predicted fusions"""
+
+    columns = ["truth_brkpts", "pred_brkpts", "brkpt_match_type"]
+    for colname in list(truth_fusions_df.columns) + list(pred_fusions_df.columns):
+        if colname not in columns:
+            columns.append(colname)
+
+    return pd.DataFrame(columns=columns + ["pred_class"])
+
+
+def score_prog_breakpoints(
+    truth_fusions_df,
+    truth_brkpts,
+    prog_pred_fusions_df,
+    prog_pred_brkpts,
+    sample_name,
+    prog,
+    max_dists,
+    chrom_codes,
+):
+
+    dist_to_results_df = overlap_breakpoints_multi_dist(
+        truth_brkpts, prog_pred_brkpts, max_dists, chrom_codes
+    )
+
+    for max_dist, results_df in dist_to_results_df.items():
+
         # merge in truth info
         results_df = pd.merge(
             results_df,
@@ -92,32 +358,86 @@ def main():
             how="outer",
         )
 
+        # predictions skipped for matching (unparsed breakpoints) are unmatched predictions
+        unmatched_pred = (
+            results_df["pred_brkpts"].isnull()
+            & results_df["pred_lexsort_breakpoint"].notnull()
+        )
+        if unmatched_pred.any():
+            results_df.loc[unmatched_pred, "pred_brkpts"] = results_df.loc[
+                unmatched_pred, "pred_lexsort_breakpoint"
+            ]
+            results_df.loc[unmatched_pred, "brkpt_match_type"] = (
+                "ExactUnmatched" if max_dist == 0 else "InexactUnmatched"
+            )
+
         results_df["prog"] = prog  # ensure in all entries for FNs (unmatched truth)
         results_df["sample"] = sample_name
 
-        if all_results_df is None:
-            all_results_df = results_df
-        else:
-            all_results_df = pd.concat([all_results_df, results_df])
+        dist_to_results_df[max_dist] = results_df
 
-    def assign_TP_FN(df_slice):
+    return dist_to_results_df
 
-        df_slice.sort_values("num_reads", ascending=False, inplace=True)
 
-        categories = list()
-        for _, row in df_slice.iterrows():
-            if pd.isnull(row["pred_brkpts"]):
-                categories.append("FN")
-            else:
-                categories.append("TP")
+def breakpoint_accuracy_curve(dist_to_scored_df):
+    """
+    Fraction of the truth and of the predicted breakpoints matched at each max_dist, per sample and prog.
+    """
+
+    curve_rows = list()
+
+    for max_dist, scored_df in dist_to_scored_df.items():
+        for (sample_name, prog), prog_df in scored_df.groupby(
+            ["sample", "prog"], sort=False
+        ):
+            matched = prog_df[
+                (~prog_df["truth_brkpts"].isnull()) & (~prog_df["pred_brkpts"].isnull())
+            ]
 
-        # only score each breakpoint once.
-        if len(categories) > 1:
-            categories[1:] = ["NA_" + x for x in categories[1:]]
+            num_truth_brkpts = prog_df["truth_brkpts"].dropna().nunique()
+            num_truth_matched = matched["truth_brkpts"].nunique()
+            num_pred_brkpts = prog_df["pred_brkpts"].dropna().nunique()
+            num_pred_matched = matched["pred_brkpts"].nunique()
 
-        df_slice["pred_class"] = categories
+            curve_rows.append(
+                {
+                    "sample": sample_name,
+                    "prog": prog,
+                    "max_dist": max_dist,
+                    "num_truth_brkpts": num_truth_brkpts,
+                    "num_truth_matched": num_truth_matched,
+                    "frac_truth_matched": (
+                        num_truth_matched / num_truth_brkpts
+                        if num_truth_brkpts > 0
+                        else np.nan
+                    ),
+                    "num_pred_brkpts": num_pred_brkpts,
+                    "num_pred_matched": num_pred_matched,
+                    "frac_pred_matched": (
+                        num_pred_matched / num_pred_brkpts
+                        if num_pred_brkpts > 0
+                        else np.nan
+                    ),
+                }
+            )
 
-        return df_slice
+    return pd.DataFrame(
+        curve_rows,
+        columns=[
+            "sample",
+            "prog",
+            "max_dist",
+            "num_truth_brkpts",
+            "num_truth_matched",
+            "frac_truth_matched",
+            "num_pred_brkpts",
+            "num_pred_matched",
+            "frac_pred_matched",
+        ],
+    )
+
+
+def assign_pred_classes(all_results_df):
 
     # those without matched truth fusions are labeled FPs.
     FP_results_df = (
@@ -125,12 +445,26 @@ def main():
     )
     FP_results_df["pred_class"] = "FP"
 
-    TP_FN_results = (
-        all_results_df[~all_results_df["truth_brkpts"].isnull()]
-        .groupby(["prog", "truth_brkpts"])
-        .apply(assign_TP_FN)
+    # rank the entries for each truth breakpoint by read support, ties kept in their original order.
+    TP_FN_results = all_results_df[
+        ~all_results_df["truth_brkpts"].isnull()
+    ].sort_values(
+        ["prog", "truth_brkpts", "num_reads"],
+        ascending=[True, True, False],
+        kind="mergesort",
+        na_position="last",
+    )
+
+    pred_class = np.where(TP_FN_results["pred_brkpts"].isnull(), "FN", "TP").astype(
+        object
     )
 
+    # only score each breakpoint once.
+    brkpt_rank = TP_FN_results.groupby(["prog", "truth_brkpts"], sort=False).cumcount()
+    pred_class[brkpt_rank.values > 0] = "NA_" + pred_class[brkpt_rank.values > 0]
+
+    TP_FN_results = TP_FN_results.assign(pred_class=pred_class)
+
     all_results_df = pd.concat([TP_FN_results, FP_results_df])
 
     all_results_df.sort_values(
@@ -139,262 +473,223 @@ def main():
         inplace=True,
     )
 
-    all_results_df.to_csv(sys.stdout, sep="\t", index=False)
-
-    sys.exit(0)
+    return all_results_df
 
 
 # methods based on Alvin's code:
 
 
-def get_genes_to_breakpts(
-    breakpoint_pairs, max_breakpoints_distance
-) -> tuple[dict[Any, Any], dict[Any, Any]]:
+def get_chr_breakpoints(brkpts, chrom_codes):
+    """
+    Indices of the breakpoints with both ends on chr* contigs, the only ones eligible for inexact matching.
+    """
 
-    left_trees_dict: dict[Any, Any] = {}
-    right_trees_dict: dict[Any, Any] = {}
+    chr_codes = chrom_codes.codes_with_prefix("chr")
+    is_chr = np.isin(brkpts["left_chrom"], chr_codes) & np.isin(
+        brkpts["right_chrom"], chr_codes
+    )
 
-    # chr12:52846197--chr17:9981884
-    for index, breakpt in enumerate(breakpoint_pairs):
-        if not re.search("^chr[^\\:]+:\\d+--chr[^\\:]+:\\d+$", breakpt):
-            warnings.warn(f"{breakpt} lacks expected formatting. Skipping.", Warning)
-            continue
+    for breakpt in fusion_breakpoints.format_breakpoints(brkpts[~is_chr], chrom_codes):
+        warnings.warn(f"{breakpt} lacks expected formatting. Skipping.", Warning)
 
-        left, right = breakpt.split("--")
-        # print(left); print(right)
-        left = left.split(":")
-        right = right.split(":")
+    return np.where(is_chr)[0]
 
-        if left[0] not in left_trees_dict:
-            left_trees_dict[left[0]] = intervaltree.IntervalTree()
 
-        left_trees_dict[left[0]].add(
-            Interval(
-                int(left[1]) - max_breakpoints_distance // 2,
-                int(left[1]) + max_breakpoints_distance // 2 + 1,
-                (index, int(left[1])),
-            )
-        )
+def overlap_breakpoints(
+    gold_standard_brkpts, predicted_brkpts, chrom_codes, max_breakpoints_distance=0
+):
 
-        if right[0] not in right_trees_dict:
-            right_trees_dict[right[0]] = intervaltree.IntervalTree()
+    return overlap_breakpoints_multi_dist(
+        gold_standard_brkpts, predicted_brkpts, [max_breakpoints_distance], chrom_codes
+    )[max_breakpoints_distance]
 
-        right_trees_dict[right[0]].add(
-            Interval(
-                int(right[1]) - max_breakpoints_distance // 2,
-                int(right[1]) + max_breakpoints_distance // 2 + 1,
-                (index, int(right[1])),
-            )
-        )
 
-    return left_trees_dict, right_trees_dict
+def overlap_breakpoints_multi_dist(
+    gold_standard_brkpts, predicted_brkpts, max_breakpoints_distances, chrom_codes
+):
+    """
+    Overlap gold standard and predicted breakpoint arrays for each of the max_breakpoints_distances.
 
+    The inexact candidate pairs are found once within the largest distance allowance,
+    and each smaller allowance is then just a filter on the max distance of those pairs.
 
-def overlap_breakpoints(
-    gold_standard_breakpts, predicted_breakpts, max_breakpoints_distance=0
-):
+    returns dict: max_breakpoints_distance -> overlap df, with breakpoints formatted as strings
+    """
 
-    strictly_equal_breakpt = list(
-        np.intersect1d(
-            np.unique(gold_standard_breakpts),
-            np.unique(predicted_breakpts),
-        )
+    uniq_gold_brkpts = np.unique(gold_standard_brkpts)
+    uniq_predicted_brkpts = np.unique(predicted_brkpts)
+
+    strictly_equal_breakpt = fusion_breakpoints.format_breakpoints(
+        fusion_breakpoints.intersect_breakpoints(
+            uniq_gold_brkpts, uniq_predicted_brkpts, chrom_codes
+        ),
+        chrom_codes,
+    )
+
+    not_found_gold_brkpts = fusion_breakpoints.setdiff_breakpoints(
+        uniq_gold_brkpts, uniq_predicted_brkpts, chrom_codes
+    )
+    not_found_prediction_brkpts = fusion_breakpoints.setdiff_breakpoints(
+        uniq_predicted_brkpts, uniq_gold_brkpts, chrom_codes
     )
 
-    total_overlap_count = 0
-    hit_paralogs_gold_pair = []
-    recovered_not_found_predicted_pair = []
+    # continue to search for additional entries within a max_breakpoints_distance allowance
+    # both ends of a matched prediction must be within half the window of the gold breakpoint
+    largest_max_breakpoints_distance = max(max_breakpoints_distances)
+    if largest_max_breakpoints_distance > 0:
+        gold_chr_idx = get_chr_breakpoints(not_found_gold_brkpts, chrom_codes)
+        pred_chr_idx = get_chr_breakpoints(not_found_prediction_brkpts, chrom_codes)
+
+        (
+            all_gold_hit_idx,
+            all_pred_hit_idx,
+            all_left_distances,
+            all_right_distances,
+        ) = fusion_breakpoints.find_breakpoint_pairs_within_distance(
+            not_found_gold_brkpts[gold_chr_idx],
+            not_found_prediction_brkpts[pred_chr_idx],
+            -(largest_max_breakpoints_distance // 2),
+            largest_max_breakpoints_distance // 2,
+        )
+        all_gold_hit_idx = gold_chr_idx[all_gold_hit_idx]
+        all_pred_hit_idx = pred_chr_idx[all_pred_hit_idx]
+        all_max_distances = np.maximum(all_left_distances, all_right_distances)
 
-    not_found_gold_brkpts = np.setdiff1d(
-        np.unique(gold_standard_breakpts),
-        np.unique(predicted_breakpts),
+    not_found_gold_brkpts = fusion_breakpoints.format_breakpoints(
+        not_found_gold_brkpts, chrom_codes
     )
-    not_found_prediction_brkpts = np.setdiff1d(
-        np.unique(predicted_breakpts),
-        np.unique(gold_standard_breakpts),
+    not_found_prediction_brkpts = fusion_breakpoints.format_breakpoints(
+        not_found_prediction_brkpts, chrom_codes
     )
 
-    df = None
+    dist_to_df = dict()
 
-    if len(strictly_equal_breakpt) > 0:
-        df = pd.DataFrame(
-            {
-                "truth_brkpts": strictly_equal_breakpt,
-                "pred_brkpts": strictly_equal_breakpt,
-                "dist_left": 0,
-                "dist_right": 0,
-                "brkpt_match_type": "ExactMatched",
-            }
-        )
-    if max_breakpoints_distance == 0:
+    for max_breakpoints_distance in max_breakpoints_distances:
 
-        if len(not_found_gold_brkpts) > 0:
-            not_found_gold_brkpts_df = pd.DataFrame(
-                {
-                    "truth_brkpts": not_found_gold_brkpts,
-                    "brkpt_match_type": "ExactUnmatched",
-                }
-            )
-            if df is None:
-                df = not_found_gold_brkpts_df
-            else:
-                df = pd.concat([df, not_found_gold_brkpts_df])
+        df = None
 
-        if len(not_found_prediction_brkpts) > 0:
-            not_found_prediction_brkpts_df = pd.DataFrame(
+        if len(strictly_equal_breakpt) > 0:
+            df = pd.DataFrame(
                 {
-                    "pred_brkpts": not_found_prediction_brkpts,
-                    "brkpt_match_type": "ExactUnmatched",
+                    "truth_brkpts": strictly_equal_breakpt,
+                    "pred_brkpts": strictly_equal_breakpt,
+                    "dist_left": 0,
+                    "dist_right": 0,
+                    "brkpt_match_type": "ExactMatched",
                 }
             )
-            if df is None:
-                df = not_found_prediction_brkpts_df
-            else:
-                df = pd.concat([df, not_found_prediction_brkpts_df])
 
-        return df
+        if max_breakpoints_distance == 0:
 
-    # continue to search for additional entries within a max_breakpoints_distance allowance
-    # build search tree for the unmatched predictions
-    left_breakpt_tree, right_breakpt_tree = get_genes_to_breakpts(
-        list(not_found_prediction_brkpts), max_breakpoints_distance
-    )
+            if len(not_found_gold_brkpts) > 0:
+                not_found_gold_brkpts_df = pd.DataFrame(
+                    {
+                        "truth_brkpts": not_found_gold_brkpts,
+                        "brkpt_match_type": "ExactUnmatched",
+                    }
+                )
+                if df is None:
+                    df = not_found_gold_brkpts_df
+                else:
+                    df = pd.concat([df, not_found_gold_brkpts_df])
+
+            if len(not_found_prediction_brkpts) > 0:
+                not_found_prediction_brkpts_df = pd.DataFrame(
+                    {
+                        "pred_brkpts": not_found_prediction_brkpts,
+                        "brkpt_match_type": "ExactUnmatched",
+                    }
+                )
+                if df is None:
+                    df = not_found_prediction_brkpts_df
+                else:
+                    df = pd.concat([df, not_found_prediction_brkpts_df])
 
-    # search the unmatched gold brkpts using the unmatched prediction trees
-
-    missing_gold_breakpts = []
-    recovered_predicted_brkpts = []
-    for gold_breakpt in not_found_gold_brkpts:
-        left, right = gold_breakpt.split("--")
-        left = left.split(":")
-        right = right.split(":")
-
-        if (right[0] not in right_breakpt_tree) or (left[0] not in left_breakpt_tree):
-            # NOTE: skip alternative contigs from liftover
-            # If no chromosome matched, use infinity for maximum distances
-            # then no fp_distance_list exists
-            # warnings.warn(
-            #     f"Missing one or both chromosome pairs\
-            #     in the prediction: {left[0]}, {right[0]}!",
-            #     Warning,
-            # )
-            missing_gold_breakpts.append(gold_breakpt)
+            dist_to_df[max_breakpoints_distance] = df
             continue
 
-        # left: [chr, start], gold standard left break point
-        # left_overlapped_intervals: intervals from interval
-        # trees, (start, end, data), data is the breakpoint pair index
-        left_overlapped_intervals = list(left_breakpt_tree[left[0]].at(int(left[1])))
-        right_overlapped_intervals = list(
-            right_breakpt_tree[right[0]].at(int(right[1]))
-        )
-        if (
-            len(left_overlapped_intervals) > 0
-            and len(right_overlapped_intervals) > 0
-            and any(
-                [
-                    i.data[0] == j.data[0]
-                    for i in left_overlapped_intervals
-                    for j in right_overlapped_intervals
-                ]
+        within_dist = all_max_distances <= max_breakpoints_distance // 2
+        gold_hit_idx = all_gold_hit_idx[within_dist]
+        pred_hit_idx = all_pred_hit_idx[within_dist]
+
+        total_overlap_count = len(gold_hit_idx)
+
+        if total_overlap_count > 0:
+
+            gold_hit_counts = np.bincount(
+                gold_hit_idx, minlength=len(not_found_gold_brkpts)
             )
-        ):
-            # Matched hit
-            # if both left and right breakpoint overlaps with gold standard
-            # and they belong to the same breakpoint pair
-            local_intersected_breakpts = []
-            local_intersected_intervals = []
-            local_max_distances = []
-            local_left_distances = []
-            local_right_distances = []
-            for i in left_overlapped_intervals:
-                for j in right_overlapped_intervals:
-                    if i.data[0] == j.data[0]:
-                        local_intersected_breakpts.append(
-                            not_found_prediction_brkpts[i.data[0]]
-                        )
-                        local_intersected_intervals.append(
-                            f"{left[0]}:{i.data[1]}--{right[0]}:{j.data[1]}"
-                        )
-                        total_overlap_count += 1
-                        local_left_distances.append(abs(int(left[1]) - i.data[1]))
-                        local_right_distances.append(abs(int(right[1]) - j.data[1]))
-
-                        local_max_distances.append(
-                            max(
-                                [
-                                    abs(int(left[1]) - i.data[1]),
-                                    abs(int(right[1]) - j.data[1]),
-                                ]
-                            )
-                        )
-            if len(local_intersected_intervals) > 1:
+            for gold_idx in np.where(gold_hit_counts > 1)[0]:
                 # NOTE: this condition never happen in the simulation
                 warnings.warn(
                     "One gold standard pair match to multiple\
-                    predicted breakpoints after window extension!"
-                    + str(local_intersected_intervals),
+                        predicted breakpoints after window extension!"
+                    + str(
+                        list(
+                            not_found_prediction_brkpts[
+                                pred_hit_idx[gold_hit_idx == gold_idx]
+                            ]
+                        )
+                    ),
                     Warning,
                     stacklevel=2,
                 )
 
-            df_local = pd.DataFrame(
+            matched_df = pd.DataFrame(
                 {
-                    "truth_brkpts": gold_breakpt,
-                    "pred_brkpts": local_intersected_breakpts,
-                    "left_distances": local_left_distances,
-                    "right_distances": local_right_distances,
-                    "max_distance": local_max_distances,
+                    "truth_brkpts": not_found_gold_brkpts[gold_hit_idx],
+                    "pred_brkpts": not_found_prediction_brkpts[pred_hit_idx],
+                    "left_distances": all_left_distances[within_dist],
+                    "right_distances": all_right_distances[within_dist],
+                    "max_distance": all_max_distances[within_dist],
                     "brkpt_match_type": "InexactMatched",
                 }
             )
 
-            recovered_predicted_brkpts.extend(local_intersected_breakpts)
-
             # append matched breakpoints to df
             if df is None:
-                df = df_local
+                df = matched_df
             else:
-                df = pd.concat([df, df_local])
-
-        else:  # no overlaps found
-            missing_gold_breakpts.append(gold_breakpt)
+                df = pd.concat([df, matched_df])
 
-    missing_gold_brkpts_df = None
-    if missing_gold_breakpts:
-        missing_gold_breakpts_df = pd.DataFrame(
-            {
-                "truth_brkpts": missing_gold_breakpts,
-                "brkpt_match_type": "InexactUnmatched",
-            }
-        )
+        missing_gold_breakpts = np.delete(not_found_gold_brkpts, gold_hit_idx)
 
-        if df is not None:
-            df = pd.concat([df, missing_gold_breakpts_df])
-        else:
-            # really nothing matched
-            df = missing_gold_breakpts_df
+        if len(missing_gold_breakpts) > 0:
+            missing_gold_breakpts_df = pd.DataFrame(
+                {
+                    "truth_brkpts": missing_gold_breakpts,
+                    "brkpt_match_type": "InexactUnmatched",
+                }
+            )
 
-    remaining_unfound_prediction_breakpts = np.setdiff1d(
-        np.unique(not_found_prediction_brkpts), np.unique(recovered_predicted_brkpts)
-    )
+            if df is not None:
+                df = pd.concat([df, missing_gold_breakpts_df])
+            else:
+                # really nothing matched
+                df = missing_gold_breakpts_df
 
-    if len(remaining_unfound_prediction_breakpts) > 0:
-        remaining_unfound_prediction_breakpts_df = pd.DataFrame(
-            {
-                "pred_brkpts": remaining_unfound_prediction_breakpts,
-                "brkpt_match_type": "InexactUnmatched",
-            }
+        remaining_unfound_prediction_breakpts = np.delete(
+            not_found_prediction_brkpts, pred_hit_idx
         )
-        if df is not None:
-            df = pd.concat([df, remaining_unfound_prediction_breakpts_df])
-        else:
-            df = remaining_unfound_prediction_breakpts_df
 
-    if total_overlap_count == 0:
-        warnings.warn("No breakpoints found even with window extension!")
+        if len(remaining_unfound_prediction_breakpts) > 0:
+            remaining_unfound_prediction_breakpts_df = pd.DataFrame(
+                {
+                    "pred_brkpts": remaining_unfound_prediction_breakpts,
+                    "brkpt_match_type": "InexactUnmatched",
+                }
+            )
+            if df is not None:
+                df = pd.concat([df, remaining_unfound_prediction_breakpts_df])
+            else:
+                df = remaining_unfound_prediction_breakpts_df
+
+        if total_overlap_count == 0:
+            warnings.warn("No breakpoints found even with window extension!")
+
+        dist_to_df[max_breakpoints_distance] = df
 
-    return df
+    return dist_to_df
 
 
 if __name__ == "__main__":
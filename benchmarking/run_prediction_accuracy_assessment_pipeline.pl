@@ -135,22 +135,16 @@ main: {
     
     $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.tp_fp_fn.ok"));
 
-    ##############
-    # generate ROC
+    ##############################################################
+    # generate ROC and convert to Precision-Recall curve and AUC
     
-    $cmd = "$benchmark_toolkit_basedir/all_TP_FP_FN_to_ROC.pl $output_filename.scored > $output_filename.scored.ROC"; 
-    $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.roc.ok"));
+    $cmd = "$benchmark_toolkit_basedir/scored_preds_to_ROC_PR.py --scored_preds $output_filename.scored --min_read_support 3";
+    $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.roc_pr.ok"));
     
     # plot ROC
     $cmd = "$benchmark_toolkit_basedir/plotters/plot_ROC.Rscript $output_filename.scored.ROC";
     $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.plot_roc.ok"));
 
-    ###################################
-    # convert to Precision-Recall curve
-    
-    $cmd = "$benchmark_toolkit_basedir/calc_PR.py --in_ROC $output_filename.scored.ROC --min_read_support 3 --out_PR $output_filename.scored.PR | sort -k2,2gr | tee $output_filename.scored.PR.AUC";
-    $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.pr.ok"));
-    
     # plot PR curve
     $cmd = "$benchmark_toolkit_basedir/plotters/plotPRcurves.R $output_filename.scored.PR $output_filename.scored.PR.plot.pdf";
     $pipeliner->add_commands(new Command($cmd, "$checkpoint_token.plot_pr.ok"));
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import sys, os
+import argparse
+import numpy as np
+import pandas as pd
+
+import calc_PR
+
+# In-process replacement for the on-disk chain:
+#   all_TP_FP_FN_to_ROC(.for_brkpts).pl scored > scored.ROC
+#   calc_PR.py --in_ROC scored.ROC --out_PR scored.PR | sort -k2,2gr | tee scored.PR.AUC
+# writing the same .ROC, .PR, and .PR.AUC outputs for the plotters.
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="computes the ROC, Precision-Recall curve, and PR-AUC values from scored fusion predictions",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument(
+        "--scored_preds",
+        type=str,
+        required=True,
+        help="scored predictions with pred_class TP, FP, or FN",
+    )
+    parser.add_argument(
+        "--for_brkpts",
+        action="store_true",
+        default=False,
+        help="scored by breakpoints (fusion_breakpoints_to_TP_FP_FN.py), as per all_TP_FP_FN_to_ROC.for_brkpts.pl",
+    )
+    parser.add_argument(
+        "--min_read_support",
+        type=int,
+        default=0,
+        help="minimum read support for including data point in AUC computation",
+    )
+    parser.add_argument(
+        "--out_prefix",
+        type=str,
+        default=None,
+        help="prefix for the .ROC, .PR, and .PR.AUC output files (default: --scored_preds)",
+    )
+
+    args = parser.parse_args()
+
+    out_prefix = args.out_prefix if args.out_prefix is not None else args.scored_preds
+
+    scored_df = parse_scored_preds(args.scored_preds, args.for_brkpts)
+
+    ROC_df = scored_preds_to_ROC(scored_df, args.for_brkpts)
+    ROC_df.to_csv(f"{out_prefix}.ROC", sep="\t", index=False)
+
+    with open(f"{out_prefix}.PR", "w") as fout:
+        prog_aucs = calc_PR.ROC_to_PR(
+            ROC_df.itertuples(index=False, name=None), fout, args.min_read_support
+        )
+
+    AUC_lines = calc_PR.format_AUC_lines(prog_aucs)
+    with open(f"{out_prefix}.PR.AUC", "w") as fout:
+        fout.write(AUC_lines)
+    sys.stdout.write(AUC_lines)
+
+    sys.exit(0)
+
+
+def parse_scored_preds(scored_preds_file, for_brkpts=False):
+    """
+    Read the TP, FP, and FN entries of the scored predictions, ensuring each is scored only once.
+    """
+
+    # values kept as strings, as parsed by all_TP_FP_FN_to_ROC.pl
+    scored_df = pd.read_csv(
+        scored_preds_file, sep="\t", dtype=str, keep_default_na=False
+    )
+
+    def column(colname):
+        if colname in scored_df.columns:
+            return scored_df[colname]
+        return pd.Series("", index=scored_df.index)
+
+    pred_type = column("pred_class").where(
+        column("pred_class") != "", column("pred_result")
+    )
+    scored_df = scored_df.assign(pred_type=pred_type)
+    scored_df = scored_df[scored_df["pred_type"].isin(["TP", "FP", "FN"])]
+
+    if for_brkpts:
+        fusion = column("fusion").where(
+            column("fusion") != "", column("truth_fusion_name")
+        )
+        breakpoint = column("truth_brkpts").where(
+            column("truth_brkpts") != "", column("pred_brkpts")
+        )
+        if (breakpoint[scored_df.index] == "").any():
+            raise RuntimeError(
+                "Error, need truth_brkpts || pred_brkpts column value in {}".format(
+                    scored_preds_file
+                )
+            )
+        fusion_token = [fusion, breakpoint]
+    else:
+        fusion = column("fusion").where(
+            column("selected_fusion") == ".", column("selected_fusion")
+        )
+        fusion_token = [fusion]
+
+    fusion_token = (
+        pd.concat([column("prog"), column("sample")] + fusion_token, axis=1)
+        .loc[scored_df.index]
+        .apply(tuple, axis=1)
+    )
+    if fusion_token.duplicated().any():
+        raise RuntimeError(
+            "Error, already processed fusion [{}], and these should be unique entries in this file {}".format(
+                "::".join(fusion_token[fusion_token.duplicated()].iloc[0]),
+                scored_preds_file,
+            )
+        )
+
+    scored_df = scored_df.assign(sample=column("sample"))
+
+    return scored_df[["sample", "prog", "pred_type", "num_reads"]]
+
+
+def scored_preds_to_ROC(scored_df, for_brkpts=False):
+    """
+    ROC table as per all_TP_FP_FN_to_ROC(.for_brkpts).pl, with the TP and FP counts at each
+    minimum read support threshold computed as reverse cumulative sums over the thresholds.
+    """
+
+    ROC_dfs = list()
+
+    for prog, prog_df in scored_df.groupby("prog", sort=False):
+
+        num_truth_fusions = (prog_df["pred_type"] != "FP").sum()
+
+        TP_FP_df = prog_df[prog_df["pred_type"] != "FN"]
+
+        # thresholds are the unique read support values, reported as written in the scored file
+        uniq_vals = np.unique(TP_FP_df["num_reads"].values.astype(str))
+        uniq_vals = uniq_vals[np.argsort(uniq_vals.astype(float), kind="stable")]
+        if for_brkpts:
+            # all_TP_FP_FN_to_ROC.for_brkpts.pl excludes the top threshold
+            uniq_vals = uniq_vals[:-1]
+        if len(uniq_vals) == 0:
+            continue
+
+        assert num_truth_fusions > 0, f"Error, no truth fusions for prog {prog}"
+
+        # counts at each read support value, accumulated from the highest value down
+        read_support, read_support_idx = np.unique(
+            TP_FP_df["num_reads"].values.astype(float), return_inverse=True
+        )
+        is_TP = (TP_FP_df["pred_type"] == "TP").values
+        num_TP_at = np.cumsum(
+            np.bincount(read_support_idx[is_TP], minlength=len(read_support))[::-1]
+        )[::-1]
+        num_FP_at = np.cumsum(
+            np.bincount(read_support_idx[~is_TP], minlength=len(read_support))[::-1]
+        )[::-1]
+
+        thresh_idx = np.searchsorted(read_support, uniq_vals.astype(float))
+        num_TP = num_TP_at[thresh_idx]
+        num_FP = num_FP_at[thresh_idx]
+        num_FN = num_truth_fusions - num_TP
+
+        # rounded as in the perl sprintf() calls, with PPV printed as a perl number
+        TPR_str = np.array(["%.2f" % x for x in num_TP / num_truth_fusions])
+        TPR = TPR_str.astype(float)
+        FDR = np.array(["%.2f" % x for x in num_FP / (num_FP + num_TP)], dtype=float)
+        PPV = 1 - FDR
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            F1 = 2 * TPR * PPV / (TPR + PPV)
+
+        ROC_dfs.append(
+            pd.DataFrame(
+                {
+                    "prog": prog,
+                    "min_sum_frags": uniq_vals,
+                    "TP": num_TP,
+                    "FP": num_FP,
+                    "FN": num_FN,
+                    "TPR": TPR_str,
+                    "PPV": ["%.15g" % x for x in PPV],
+                    "F1": [
+                        "%.3f" % x if y != 0 else "NA" for x, y in zip(F1, TPR + PPV)
+                    ],
+                }
+            )
+        )
+
+    if not ROC_dfs:
+        return pd.DataFrame(
+            columns=["prog", "min_sum_frags", "TP", "FP", "FN", "TPR", "PPV", "F1"]
+        )
+
+    return pd.concat(ROC_dfs)
+
+
+if __name__ == "__main__":
+    main()
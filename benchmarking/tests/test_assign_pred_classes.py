@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+
+import sys, os
+import subprocess
+import tempfile
+import pandas as pd
+
+BENCHMARKING_DIR = os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), ".."])
+sys.path.insert(0, BENCHMARKING_DIR)
+import fusion_breakpoints_to_TP_FP_FN as scorer
+
+# Regression check of assign_pred_classes() against the former groupby(...).apply(assign_TP_FN)
+# implementation, kept below as the reference: the scored outputs, as written by
+# fusion_breakpoints_to_TP_FP_FN.py, must be byte-identical for all the (sample, prog) groups
+# of the bundled simulated data prog_results, at each max_dist.
+#
+# The predictions are collected as by the analyze_LR_simulated_data.pl pipelines (requires perl).
+#
+# usage: python test_assign_pred_classes.py, or via pytest
+
+SIMULATED_DATA_DIR = os.path.sep.join([BENCHMARKING_DIR, "../simulated_data"])
+
+# simulated data dir -> breakpoint truth set
+SIM_TRUTH_SETS = {
+    "sim_jaffal": "jaffal_sim_truth_set.tsv",
+    "our_pbsim3_sims/ONT_pbsim3_part5": "ont_fusion_brkpt_truth_set.tsv",
+    "our_pbsim3_sims/pbio_pbsim3_part5": "pbsim3_wreps.truthset.rep1.TSV",
+}
+
+MAX_DISTS = [0, 10, 100]
+
+
+def reference_assign_pred_classes(all_results_df):
+    """the former implementation of assign_pred_classes()"""
+
+    def assign_TP_FN(df_slice):
+
+        df_slice.sort_values("num_reads", ascending=False, inplace=True)
+
+        categories = list()
+        for _, row in df_slice.iterrows():
+            if pd.isnull(row["pred_brkpts"]):
+                categories.append("FN")
+            else:
+                categories.append("TP")
+
+        # only score each breakpoint once.
+        if len(categories) > 1:
+            categories[1:] = ["NA_" + x for x in categories[1:]]
+
+        df_slice["pred_class"] = categories
+
+        return df_slice
+
+    # those without matched truth fusions are labeled FPs.
+    FP_results_df = (
+        all_results_df[all_results_df["truth_brkpts"].isnull()].drop_duplicates().copy()
+    )
+    FP_results_df["pred_class"] = "FP"
+
+    TP_FN_results = (
+        all_results_df[~all_results_df["truth_brkpts"].isnull()]
+        .groupby(["prog", "truth_brkpts"])
+        .apply(assign_TP_FN)
+    )
+
+    all_results_df = pd.concat([TP_FN_results, FP_results_df])
+
+    all_results_df.sort_values(
+        ["prog", "truth_brkpts", "num_reads", "pred_class"],
+        ascending=[True, True, False, True],
+        inplace=True,
+    )
+
+    return all_results_df
+
+
+def collect_preds(sim_dir, out_dir):
+    """preds.collected of the sim_dir prog_results, as by analyze_LR_simulated_data.pl"""
+
+    listing_file = os.path.join(out_dir, "fusion_result_file_listing.dat")
+    preds_file = os.path.join(out_dir, "preds.collected")
+
+    subprocess.run(
+        "find ./prog_results -type f | ./util/make_LR_file_listing_input_table.pl > {}".format(
+            listing_file
+        ),
+        shell=True,
+        check=True,
+        cwd=sim_dir,
+    )
+    with open(preds_file, "w") as fh:
+        subprocess.run(
+            ["./util/collect_LR_preds.pl", listing_file],
+            stdout=fh,
+            stderr=subprocess.DEVNULL,
+            check=True,
+            cwd=sim_dir,
+        )
+
+    return preds_file
+
+
+def sample_results(truth_fusions_file, preds_file):
+    """yields (sample, max_dist, all_results_df) as passed to assign_pred_classes() by score_samples()"""
+
+    chrom_codes = scorer.fusion_breakpoints.ChromCodes()
+    truth_fusions_df, truth_brkpts = scorer.parse_truth_fusions(
+        truth_fusions_file, chrom_codes
+    )
+    pred_fusions_df, pred_brkpts, pred_parsed = scorer.parse_pred_fusions(
+        preds_file, chrom_codes
+    )
+
+    for sample_name in truth_fusions_df["sample"].unique():
+        sample_truth_mask = (truth_fusions_df["sample"] == sample_name).values
+        sample_pred_mask = (pred_fusions_df["sample"] == sample_name).values
+
+        prog_results = list()
+        for prog in pred_fusions_df[sample_pred_mask]["prog"].unique():
+            prog_mask = sample_pred_mask & (pred_fusions_df["prog"] == prog).values
+            prog_results.append(
+                scorer.score_prog_breakpoints(
+                    truth_fusions_df[sample_truth_mask].drop(columns="sample"),
+                    truth_brkpts[sample_truth_mask],
+                    pred_fusions_df[prog_mask],
+                    pred_brkpts[prog_mask & pred_parsed],
+                    sample_name,
+                    prog,
+                    MAX_DISTS,
+                    chrom_codes,
+                )
+            )
+
+        if not prog_results:
+            continue
+
+        for max_dist in MAX_DISTS:
+            yield sample_name, max_dist, pd.concat(
+                [dist_to_results_df[max_dist] for dist_to_results_df in prog_results]
+            )
+
+
+def check_sim_data(sim_name, truth_set):
+    sim_dir = os.path.join(SIMULATED_DATA_DIR, sim_name)
+
+    num_checked = 0
+    with tempfile.TemporaryDirectory() as out_dir:
+        preds_file = collect_preds(sim_dir, out_dir)
+
+        for sample_name, max_dist, all_results_df in sample_results(
+            os.path.join(sim_dir, truth_set), preds_file
+        ):
+            scored = scorer.assign_pred_classes(all_results_df.copy()).to_csv(
+                sep="\t", index=False
+            )
+            expected = reference_assign_pred_classes(all_results_df.copy()).to_csv(
+                sep="\t", index=False
+            )
+            assert (
+                scored == expected
+            ), "Error, scored output differs from the reference for {} sample {} at max_dist {}".format(
+                sim_name, sample_name, max_dist
+            )
+            num_checked += 1
+
+    assert num_checked > 0, "Error, no samples scored for {}".format(sim_name)
+
+    return num_checked
+
+
+def test_assign_pred_classes_matches_reference():
+    for sim_name, truth_set in SIM_TRUTH_SETS.items():
+        check_sim_data(sim_name, truth_set)
+
+
+if __name__ == "__main__":
+    import warnings
+
+    warnings.simplefilter("ignore")
+
+    for sim_name, truth_set in SIM_TRUTH_SETS.items():
+        num_checked = check_sim_data(sim_name, truth_set)
+        print("{}: {} sample scorings identical".format(sim_name, num_checked))
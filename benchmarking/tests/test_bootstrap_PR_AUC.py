@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import sys, os
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), ".."])
+)
+import bootstrap_PR_AUC
+
+# Checks that the bootstrap replicate PR-AUCs, computed together from the replicates' read support
+# counts, equal the point estimate (sample_prog_PR_AUC(), as by scored_preds_to_ROC_PR.py)
+# of each replicate's explicitly resampled scored predictions.
+#
+# usage: python test_bootstrap_PR_AUC.py, or via pytest
+
+
+def resampled_AUCs(
+    TP_reads, FP_reads, num_FN, num_replicates, seed_seq, min_read_support, for_brkpts
+):
+    """replicate AUCs from the explicitly resampled TP, FN and FP tables, drawn as by bootstrap_chunk_AUCs()"""
+
+    num_truth = len(TP_reads) + num_FN
+
+    rng = np.random.default_rng(seed_seq)
+    truth_idx = rng.integers(0, num_truth, size=(num_replicates, num_truth))
+    FP_idx = rng.integers(0, len(FP_reads), size=(num_replicates, len(FP_reads)))
+
+    AUCs = list()
+    for replicate in range(num_replicates):
+        # truth entries beyond the TPs are FNs
+        TP_idx = truth_idx[replicate][truth_idx[replicate] < len(TP_reads)]
+        num_replicate_FN = num_truth - len(TP_idx)
+        replicate_df = pd.DataFrame(
+            {
+                "sample": "sample",
+                "prog": "prog",
+                "pred_type": ["TP"] * len(TP_idx)
+                + ["FN"] * num_replicate_FN
+                + ["FP"] * len(FP_reads),
+                "num_reads": [str(x) for x in TP_reads[TP_idx]]
+                + ["0"] * num_replicate_FN
+                + [str(x) for x in FP_reads[FP_idx[replicate]]],
+            }
+        )
+        AUCs.append(
+            bootstrap_PR_AUC.sample_prog_PR_AUC(
+                replicate_df, min_read_support, for_brkpts
+            )
+        )
+
+    return np.array(AUCs, dtype=float)
+
+
+def check_replicate_AUCs(
+    TP_reads, FP_reads, num_FN, seed, num_replicates=5, min_read_support=0
+):
+    for for_brkpts in (False, True):
+        seed_seq = np.random.SeedSequence(seed)
+
+        AUCs = bootstrap_PR_AUC.bootstrap_chunk_AUCs(
+            TP_reads.astype(float),
+            FP_reads.astype(float),
+            len(TP_reads) + num_FN,
+            num_replicates,
+            seed_seq,
+            min_read_support,
+            for_brkpts,
+        )
+        expected_AUCs = resampled_AUCs(
+            TP_reads,
+            FP_reads,
+            num_FN,
+            num_replicates,
+            np.random.SeedSequence(seed),
+            min_read_support,
+            for_brkpts,
+        )
+
+        np.testing.assert_allclose(
+            AUCs,
+            expected_AUCs,
+            rtol=0,
+            atol=1e-9,
+            err_msg="seed {}, for_brkpts {}, min_read_support {}".format(
+                seed, for_brkpts, min_read_support
+            ),
+        )
+
+
+def test_brkpts_top_value_absent_from_replicate():
+    # the grid value 3 below the top value 5 is absent, so only the threshold 1 is retained
+    AUCs = bootstrap_PR_AUC.counts_to_PR_AUCs(
+        np.array([[1, 0, 1]]),
+        np.array([[0, 0, 1]]),
+        np.array([1.0, 3.0, 5.0]),
+        2,
+        for_brkpts=True,
+    )
+    expected_AUC = bootstrap_PR_AUC.sample_prog_PR_AUC(
+        pd.DataFrame(
+            {
+                "sample": "sample",
+                "prog": "prog",
+                "pred_type": ["TP", "TP", "FP"],
+                "num_reads": ["1", "5", "5"],
+            }
+        ),
+        for_brkpts=True,
+    )
+
+    np.testing.assert_allclose(AUCs, [expected_AUC], rtol=0, atol=1e-9)
+
+
+def test_replicate_AUCs_equal_resampled_point_estimates():
+    for seed in range(200):
+        rng = np.random.default_rng(seed)
+        TP_reads = rng.integers(1, 10, size=rng.integers(1, 8))
+        FP_reads = rng.integers(1, 10, size=rng.integers(1, 8))
+        num_FN = int(rng.integers(0, 4))
+        check_replicate_AUCs(
+            TP_reads, FP_reads, num_FN, seed, min_read_support=seed % 3
+        )
+
+
+if __name__ == "__main__":
+    test_brkpts_top_value_absent_from_replicate()
+    test_replicate_AUCs_equal_resampled_point_estimates()
+    print("ok")
@@ -42,6 +42,8 @@ my $sim_truth_set = "$FindBin::Bin/pbsim3_wreps.truthset.rep1.TSV";
 
 my $restrict_progs_file = $ARGV[0] || "";
 
+my $CPU = $ENV{CPU} || 4;
+
 
 main: {
 
@@ -117,6 +119,17 @@ main: {
     ## fusion breakpoint analysis - only the breakpoint and distance to the breakpoint matters here.
     #############################
     
+    # score breakpoints for all samples and progs at each max_dist in a single pass
+    $cmd = "$benchmark_toolkit_basedir/fusion_breakpoints_to_TP_FP_FN.py "
+        . " --truth_fusions $sim_truth_set "
+        . " --pred_fusions preds.collected.gencode_mapped.wAnnot.filt "
+        . " --max_dist 0,10,100 "
+        . " --output_dir __breakpoint_exact,__breakpoint_win10,__breakpoint_win100 "
+        . " --curve_table breakpoint_accuracy_vs_max_dist.tsv "
+        . " --jobs $CPU ";
+    $pipeliner->add_commands(new Command($cmd, "batch_breakpoint_tp_fp_fn.ok"));
+    $pipeliner->run();
+    
     &score_and_plot($sample_to_fusion_preds_href, 
                     $sample_to_truth_href, 
                     'breakpoint_exact', 
@@ -204,9 +217,13 @@ sub score_and_plot {
 
     $cmd = 'find . -regex ".*fusion_preds.txt.scored.PR.AUC"  >  PR.AUC.files.list';
     $pipeliner->add_commands(new Command($cmd, "gather.PR.AUC.files.ok"));
+
+    # PR AUCs for all samples, as written by scored_preds_to_ROC_PR.py, consolidated into a single table
+    $cmd = "$benchmark_toolkit_basedir/calc_PR.py --in_PR_AUC_list PR.AUC.files.list --out_AUC_table PR.AUC.tsv";
+    $pipeliner->add_commands(new Command($cmd, "gather.PR.AUC.tsv.ok"));
     
     
-    $cmd = "../util/plot_pbsim3_PR_AUC_barplot.Rscript";
+    $cmd = "../util/plot_pbsim3_PR_AUC_barplot.Rscript PR.AUC.tsv";
     $pipeliner->add_commands(new Command($cmd, "plot_summary.PR.AUC.files.ok"));    
     
 
@@ -267,22 +284,16 @@ sub examine_sample {
     ##################
     # score TP, FP, FN
 
-    my $pipeliner = &init_pipeliner();
-    
-    my $cmd;
-
     if ($analysis_settings_href->{breakpoint_eval}) {
         
-        my $max_dist = $analysis_settings_href->{max_dist};
-
-        $cmd = "$benchmark_toolkit_basedir/fusion_breakpoints_to_TP_FP_FN.py --truth_fusions $sample_TP_fusions_file --pred_fusions $fusion_preds_file --max_dist $max_dist > $fusion_preds_file.scored";
+        # already scored for all samples and max_dist settings in batch mode (see main)
         
-
-
     }
     else {
         
-        $cmd = "$benchmark_toolkit_basedir/fusion_preds_to_TP_FP_FN.pl --truth_fusions $sample_TP_fusions_file --fusion_preds $fusion_preds_file";
+        my $pipeliner = &init_pipeliner();
+        
+        my $cmd = "$benchmark_toolkit_basedir/fusion_preds_to_TP_FP_FN.pl --truth_fusions $sample_TP_fusions_file --fusion_preds $fusion_preds_file";
         
         if ($analysis_settings_href->{allow_reverse_fusion}) {
             $cmd .= " --allow_reverse_fusion ";
@@ -295,11 +306,11 @@ sub examine_sample {
         
         #print $cmd;
         #die;
-    }
-    
-    $pipeliner->add_commands(new Command($cmd, "tp_fp_fn.ok"));
+        
+        $pipeliner->add_commands(new Command($cmd, "tp_fp_fn.ok"));
     
-    $pipeliner->run();
+        $pipeliner->run();
+    }
     
         
     &ROC_and_PR("$fusion_preds_file.scored", $analysis_settings_href);
@@ -320,17 +331,16 @@ sub ROC_and_PR {
     ## run analysis pipeline
     my $pipeliner = &init_pipeliner();
 
-    ##############
-    # generate ROC
+    ##############################################################
+    # generate ROC and convert to Precision-Recall curve and AUC
     
-    my $ROC_script = "$benchmark_toolkit_basedir/all_TP_FP_FN_to_ROC.pl";
+    my $cmd = "$benchmark_toolkit_basedir/scored_preds_to_ROC_PR.py --scored_preds $preds_scored";
 
     if ($analysis_settings_href->{breakpoint_eval}) {
-        $ROC_script = "$benchmark_toolkit_basedir/all_TP_FP_FN_to_ROC.for_brkpts.pl";
+        $cmd .= " --for_brkpts";
     }
     
-    my $cmd = "$ROC_script $preds_scored > $preds_scored.ROC"; 
-    $pipeliner->add_commands(new Command($cmd, "roc.ok"));
+    $pipeliner->add_commands(new Command($cmd, "roc_pr.ok"));
     
     # plot ROC
     $cmd = "$benchmark_toolkit_basedir/plotters/plot_ROC.Rscript $preds_scored.ROC";
@@ -348,12 +358,6 @@ sub ROC_and_PR {
     $pipeliner->add_commands(new Command($cmd, "sim_plot_TP_FP_vs_minFrags.ok"));
     
     
-    ###################################
-    # convert to Precision-Recall curve
-
-    $cmd = "$benchmark_toolkit_basedir/calc_PR.py --in_ROC $preds_scored.ROC --out_PR $preds_scored.PR | sort -k2,2gr | tee $preds_scored.PR.AUC";
-    $pipeliner->add_commands(new Command($cmd, "pr.ok"));
-
     # plot PR  curve
     $cmd = "$benchmark_toolkit_basedir/plotters/plotPRcurves.R $preds_scored.PR $preds_scored.PR.plot.pdf";
     $pipeliner->add_commands(new Command($cmd, "plot_pr.ok"));
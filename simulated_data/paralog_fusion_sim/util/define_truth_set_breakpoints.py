@@ -10,19 +10,33 @@ import warnings
 import numpy as np
 import pandas as pd
 import intervaltree  # type: ignore
-from Bio import SeqIO  # type: ignore
 from intervaltree import Interval  # type: ignore
-from liftover import get_lifter  # type: ignore
 import re
 import glob
 import sys
-import gzip
+import argparse
+
+sys.path.insert(0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), "../../../PyLib"]))
+import chain_liftover
+import fastx_headers
 
 
 def main():
+
+    parser = argparse.ArgumentParser(
+        description="define the truth set breakpoints from the fusion transcript sequences",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument(
+        "--threads", type=int, default=1, help="threads for decompressing each fasta.gz"
+    )
+
+    args = parser.parse_args()
+
     template_sequences = "/seq/RNASEQ/public_ftp/STAR_FUSION_PAPER/SupplementaryData/sim_reads/fusion_transcript_sequences/*.fasta.gz"
 
-    gold_standard_brkpts = load_gold_standard(template_sequences)
+    gold_standard_brkpts = load_gold_standard(template_sequences, threads=args.threads)
 
     gold_standard_brkpts.to_csv("/seq/RNASEQ/public_ftp/STAR_FUSION_PAPER/SupplementaryData/sim_reads/fusion_transcript_sequences/fusion_breakpoint_summary.tsv", sep="\t", index=False)
 
@@ -35,7 +49,7 @@ Example fasta header:
 """
 
 
-def load_gold_standard(template_sequences):
+def load_gold_standard(template_sequences, threads=1):
     """
     Load all the template fasta
     and return the gold standard break points
@@ -43,59 +57,59 @@ def load_gold_standard(template_sequences):
     Args
     --------
     :param template_sequences: `str`, fasta paths
+    :param threads: `int`, threads for decompressing each fasta.gz, see fastx_headers.open_binary()
     """
     gold_standard_breakpoints_hg19 = []
     for fasta in glob.glob(template_sequences):
         #print(fasta)
         dataset = os.path.basename(fasta).replace(".fasta.gz", "")
-        with gzip.open(fasta, "rt") as handle:
-            for record in SeqIO.parse(handle, "fasta"):
-                desc = record.description.split()
-                # example: LCORL|ENSG00000178177.10--CT47B1|ENSG00000236446.2
-                fusion_gene_pair = re.search(r"(\S+)\|.*--(\S+)\|.*", desc[0])
-                if fusion_gene_pair:
-                    fusion_gene_pair = list(fusion_gene_pair.groups())
-                else:
-                    raise Exception
-
-                left_gene, right_gene = fusion_gene_pair
-
-                ###########################
-                ## get left breakpoint info
-                # example: chr4:18022357-18022154,17963655-17963526[-]
-
-                left_fusion_info = desc[2]
-                left_breakpoint_chrom = left_fusion_info.split(":")[0]
-
-                left_breakpoint_coord = re.search(r"-(\d+)\[", left_fusion_info.split(",")[-1])
-                if left_breakpoint_coord:
-                    left_breakpoint_coord = int(left_breakpoint_coord.groups()[0])
-                else:
-                    raise Exception
-
-                ############################
-                ## get right breakpoint info
-                # example: chrX:120007874-120007719,120006594-120006457[-]
-
-                right_breakpoint_info = desc[3]
-                right_breakpoint_chrom = right_breakpoint_info.split(":")[0]
-                right_breakpoint_coord = int(right_breakpoint_info.split(":")[1].split(",")[0].split("-")[0])
+        for description in fastx_headers.iter_descriptions(fasta, "fasta", threads=threads):
+            desc = description.split()
+            # example: LCORL|ENSG00000178177.10--CT47B1|ENSG00000236446.2
+            fusion_gene_pair = re.search(r"(\S+)\|.*--(\S+)\|.*", desc[0])
+            if fusion_gene_pair:
+                fusion_gene_pair = list(fusion_gene_pair.groups())
+            else:
+                raise Exception
+
+            left_gene, right_gene = fusion_gene_pair
+
+            ###########################
+            ## get left breakpoint info
+            # example: chr4:18022357-18022154,17963655-17963526[-]
+
+            left_fusion_info = desc[2]
+            left_breakpoint_chrom = left_fusion_info.split(":")[0]
+
+            left_breakpoint_coord = re.search(r"-(\d+)\[", left_fusion_info.split(",")[-1])
+            if left_breakpoint_coord:
+                left_breakpoint_coord = int(left_breakpoint_coord.groups()[0])
+            else:
+                raise Exception
+
+            ############################
+            ## get right breakpoint info
+            # example: chrX:120007874-120007719,120006594-120006457[-]
+
+            right_breakpoint_info = desc[3]
+            right_breakpoint_chrom = right_breakpoint_info.split(":")[0]
+            right_breakpoint_coord = int(right_breakpoint_info.split(":")[1].split(",")[0].split("-")[0])
 
                 
                 
-                gold_standard_breakpoints_hg19.append(
-                    [
-                        left_gene,
-                        left_breakpoint_chrom,
-                        left_breakpoint_coord,
-                        right_gene,
-                        right_breakpoint_chrom,
-                        right_breakpoint_coord,
-                        "--".join(fusion_gene_pair),
-                        dataset,
-                        record.description
-                    ]
-                )
+            gold_standard_breakpoints_hg19.append(
+                [
+                    left_gene,
+                    left_breakpoint_chrom,
+                    left_breakpoint_coord,
+                    right_gene,
+                    right_breakpoint_chrom,
+                    right_breakpoint_coord,
+                    "--".join(fusion_gene_pair),
+                    dataset,
+                    description
+                ]
+            )
 
     gold_standard_breakpoints_hg19 = pd.DataFrame(gold_standard_breakpoints_hg19)
 
@@ -109,31 +123,19 @@ def load_gold_standard(template_sequences):
     
     ## Convert to hg38 using liftover
 
-    converter = get_lifter("hg19", "hg38")
+    converter = chain_liftover.get_lifter("hg19", "hg38")
     """
     >>> converter['chr1'][20304873]
     [('chr1', 19978380, '+')]
     """
         
-    def run_hg19_to_hg38_liftover(chrom, coord):
-        
-        converted_coord_info = converter[chrom][coord][0]
-        
-        converted_chrom = converted_coord_info[0]
-        converted_coord = converted_coord_info[1]
-
-        converted_breakpoint = f"{converted_chrom}:{converted_coord}"
-        
-        return converted_breakpoint
-
-
     gold_standard_breakpoints_hg38 = gold_standard_breakpoints_hg19.copy()
 
-    gold_standard_breakpoints_hg38['Hg38_LeftBreakpoint'] = gold_standard_breakpoints_hg38.apply(
-        lambda x: run_hg19_to_hg38_liftover(x['LeftChrom'], x['Hg19_LeftBreakpointCoord']), axis=1)
+    gold_standard_breakpoints_hg38['Hg38_LeftBreakpoint'] = converter.lift_breakpoint_ends(
+        gold_standard_breakpoints_hg38['LeftChrom'], gold_standard_breakpoints_hg38['Hg19_LeftBreakpointCoord'])
 
-    gold_standard_breakpoints_hg38['Hg38_RightBreakpoint'] = gold_standard_breakpoints_hg38.apply(
-        lambda x: run_hg19_to_hg38_liftover(x['RightChrom'], x['Hg19_RightBreakpointCoord']), axis=1)
+    gold_standard_breakpoints_hg38['Hg38_RightBreakpoint'] = converter.lift_breakpoint_ends(
+        gold_standard_breakpoints_hg38['RightChrom'], gold_standard_breakpoints_hg38['Hg19_RightBreakpointCoord'])
     
     print(gold_standard_breakpoints_hg38.head()) 
     
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+import sys, os, re
+import argparse
+import glob
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.realpath(__file__)))
+import extract_fusion_predictions as efp
+
+# Evaluates all the fusion predictions of a prog_results/ tree against the gold standards.
+#
+# The result files are found by the prog_results/<prog>/<sample><suffix> naming of the
+# DepMap_Cell_Lines and SGNex_ONT trees, each parsed by the BaseFusion subclass of its prog,
+# and evaluated on a process pool, giving one tidy table of fusion name and breakpoint metrics.
+
+
+# prog_results/ directory name -> (parser class, result file name suffix following the sample name)
+PROG_RESULT_FILES = {
+    "ctat-LR-fusion": (efp.CTAT, ".ctat-LR-fusion.fusion_predictions.tsv"),
+    "fusionseeker": (efp.FusionSeeker, "_output.confident_genefusion.txt"),
+    "JAFFAL": (efp.JAFFAL, "_jaffal_results.csv"),
+    "LongGF": (efp.LongGF, "_longgf.out"),
+    "pbfusion": (efp.Pbfusion, "_pbfusion.breakpoints.groups.bed"),
+}
+
+# removed from the sample names, as by DepMap_Cell_Lines/util/make_LR_file_listing_input_table.pl
+SAMPLE_NAME_PREFIXES = ("DepMap_v2_", "DepMap_v1v2mrgd_")
+
+METRICS_COLUMNS = ["metric", "prog", "sample", "TP", "FP", "FN", "TPR", "PPV", "F1"]
+
+
+def main():
+
+    parser = argparse.ArgumentParser(
+        description="evaluates the fusion predictions of a prog_results/ tree against the gold standard",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+
+    parser.add_argument(
+        "--prog_results",
+        type=str,
+        required=True,
+        help="prog_results directory, with a subdirectory of result files per prog",
+    )
+    parser.add_argument(
+        "--gold_standard",
+        type=str,
+        required=True,
+        help="gold standard fusions, with sample and FusionName (and optionally Breakpoint) columns, "
+        + "or sample|FusionName entries in the first column",
+    )
+    parser.add_argument(
+        "--progs",
+        type=str,
+        nargs="+",
+        default=list(PROG_RESULT_FILES),
+        help="progs to evaluate",
+    )
+    parser.add_argument(
+        "--gold_sample_regex",
+        type=str,
+        default=None,
+        help="regex capturing the gold standard sample from the result sample name, ie. 'SGNex_([^_-]+)'",
+    )
+    parser.add_argument(
+        "--lower_threshold",
+        type=float,
+        default=0,
+        help="keep predictions with more than this read support",
+    )
+    parser.add_argument(
+        "--max_breakpoints_distance",
+        type=int,
+        default=0,
+        help="match breakpoints within this window, or exactly when 0",
+    )
+    parser.add_argument(
+        "--paralog_file",
+        type=str,
+        default=None,
+        help="paralog clusters file, to match fusion names up to paralogs",
+    )
+    parser.add_argument(
+        "--sweep",
+        action="store_true",
+        default=False,
+        help="report the metrics at every minimum read support (min_sum_frags) instead",
+    )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        default=False,
+        help="parse every result file, without the prediction cache (see PyLib/prediction_cache.py)",
+    )
+    parser.add_argument("--jobs", type=int, default=1, help="number of processes")
+    parser.add_argument(
+        "--output", type=str, required=True, help="output metrics table"
+    )
+
+    args = parser.parse_args()
+
+    prog_results = discover_prog_results(args.prog_results, args.progs)
+    gold_standard = load_sample_gold_standard(args.gold_standard)
+
+    metrics_df = evaluate_prog_results(
+        prog_results,
+        gold_standard,
+        gold_sample_regex=args.gold_sample_regex,
+        paralog_file=args.paralog_file,
+        sweep=args.sweep,
+        jobs=args.jobs,
+        lower_threshold=args.lower_threshold,
+        max_breakpoints_distance=args.max_breakpoints_distance,
+        use_cache=not args.no_cache,
+    )
+
+    metrics_df.to_csv(
+        args.output, sep="\t", index=False, float_format="%.3f", na_rep="NA"
+    )
+
+    sys.exit(0)
+
+
+def discover_prog_results(prog_results_dir, progs=None):
+    """
+    returns DataFrame (prog, sample, output_result_file) of the result files in prog_results_dir/<prog>/,
+    named <sample><suffix>[.gz] by the PROG_RESULT_FILES suffix of the prog
+    """
+
+    if progs is None:
+        progs = list(PROG_RESULT_FILES)
+
+    unknown_progs = [prog for prog in progs if prog not in PROG_RESULT_FILES]
+    if unknown_progs:
+        raise ValueError(
+            "Error, no parser for progs: {}, expecting one of: {}".format(
+                ", ".join(unknown_progs), ", ".join(PROG_RESULT_FILES)
+            )
+        )
+
+    rows = list()
+    for prog in progs:
+        _, suffix = PROG_RESULT_FILES[prog]
+        result_file_regex = re.compile("(.+){}(\\.gz)?$".format(re.escape(suffix)))
+
+        for output_result_file in sorted(
+            glob.glob(os.path.join(prog_results_dir, prog, "*"))
+        ):
+            m = result_file_regex.match(os.path.basename(output_result_file))
+            if m is None:
+                warnings.warn(
+                    "Skipping {}, not named as {} results".format(
+                        output_result_file, prog
+                    ),
+                    Warning,
+                )
+                continue
+
+            sample = m.group(1)
+            for prefix in SAMPLE_NAME_PREFIXES:
+                if sample.startswith(prefix):
+                    sample = sample[len(prefix) :]
+                    break
+
+            rows.append((prog, sample, output_result_file))
+
+    return pd.DataFrame(rows, columns=["prog", "sample", "output_result_file"])
+
+
+def load_sample_gold_standard(gold_standard_file):
+    """
+    gold standard fusions of each sample, as DataFrame with columns sample, FusionName, FusionLexSort,
+    and Breakpoint and BreakpointLexSort when the file has a Breakpoint column.
+
+    The file either has sample and FusionName columns (ie. Illumina_supported_fusions.tsv),
+    or sample|FusionName entries in its first column (ie. validated_fusions.tsv).
+    """
+
+    gold_standard = pd.read_table(gold_standard_file, dtype=str)
+
+    if not {"sample", "FusionName"}.issubset(gold_standard.columns):
+        entries = pd.read_table(
+            gold_standard_file, header=None, usecols=[0], dtype=str
+        )[0]
+        # skips a header line, if any
+        entries = entries[entries.str.contains("|", regex=False)]
+        sample_fusions = entries.str.split("|", n=1, regex=False)
+        gold_standard = pd.DataFrame(
+            {
+                "sample": sample_fusions.str[0].values,
+                "FusionName": sample_fusions.str[1].values,
+            }
+        )
+
+    gold_standard["FusionName"] = gold_standard["FusionName"].str.upper()
+    gold_standard["FusionLexSort"] = efp.lex_sort_names(gold_standard["FusionName"])
+    if "Breakpoint" in gold_standard.columns:
+        gold_standard["BreakpointLexSort"] = efp.lex_sort_names(
+            gold_standard["Breakpoint"]
+        )
+
+    return gold_standard
+
+
+def evaluate_prog_results(
+    prog_results,
+    gold_standard,
+    gold_sample_regex=None,
+    paralog_file=None,
+    sweep=False,
+    jobs=1,
+    **fusion_kwargs,
+):
+    """
+    Evaluate each of the prog_results (as from discover_prog_results()) against the gold standard
+    fusions of its sample, with the files spread over jobs processes.
+
+    :param gold_standard: DataFrame with a sample column, as from load_sample_gold_standard()
+    :param gold_sample_regex: regex capturing the gold standard sample from the result sample
+        (ie. SGNex_A549_cDNA_replicate1_run2 -> A549), or None to use the result sample
+    :param sweep: metrics at every minimum read support, as from BaseFusion.threshold_sweep()
+    :param fusion_kwargs: passed on to the BaseFusion subclasses, ie. lower_threshold or use_cache
+    :return: DataFrame with columns metric (FusionName, and Breakpoint when the gold standard has
+        breakpoints), prog, sample, (min_sum_frags when sweep), TP, FP, FN, TPR, PPV, F1
+    """
+
+    samples = prog_results["sample"]
+    if gold_sample_regex is not None:
+        gold_samples = samples.str.extract(gold_sample_regex, expand=False)
+        if gold_samples.isnull().any():
+            raise ValueError(
+                "Error, gold_sample_regex {} does not match samples: {}".format(
+                    gold_sample_regex,
+                    ", ".join(samples[gold_samples.isnull()].unique()),
+                )
+            )
+    else:
+        gold_samples = samples
+
+    sample_gold_standards = {
+        gold_sample: sample_gold_standard.reset_index(drop=True)
+        for gold_sample, sample_gold_standard in gold_standard.groupby("sample")
+    }
+    missing_samples = set(gold_samples) - set(sample_gold_standards)
+    if missing_samples:
+        warnings.warn(
+            "No gold standard fusions for samples: {}".format(
+                ", ".join(sorted(missing_samples))
+            ),
+            Warning,
+        )
+    gold_standards = [
+        sample_gold_standards.get(gold_sample, gold_standard.iloc[:0])
+        for gold_sample in gold_samples
+    ]
+
+    tasks = (
+        prog_results["prog"].tolist(),
+        samples.tolist(),
+        prog_results["output_result_file"].tolist(),
+        gold_standards,
+        repeat(paralog_file),
+        repeat(sweep),
+        repeat(fusion_kwargs),
+    )
+
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            metrics_dfs = list(executor.map(evaluate_prog_result, *tasks))
+    else:
+        metrics_dfs = list(map(evaluate_prog_result, *tasks))
+
+    if not metrics_dfs:
+        return pd.DataFrame(
+            columns=METRICS_COLUMNS[:3]
+            + (["min_sum_frags"] if sweep else [])
+            + METRICS_COLUMNS[3:]
+        )
+
+    return pd.concat(metrics_dfs, ignore_index=True)
+
+
+def evaluate_prog_result(
+    prog,
+    sample,
+    output_result_file,
+    gold_standard,
+    paralog_file=None,
+    sweep=False,
+    fusion_kwargs=None,
+):
+    """fusion name and breakpoint metrics of a single result file, see evaluate_prog_results()"""
+
+    fusion_cls, _ = PROG_RESULT_FILES[prog]
+    fusion_kwargs = dict(fusion_kwargs or {})
+    if paralog_file is not None:
+        fusion_kwargs.update(_paralog_kwargs(paralog_file))
+
+    metrics = ["FusionName"]
+    if "Breakpoint" in gold_standard.columns:
+        metrics.append("Breakpoint")
+
+    if sweep:
+        fusion_kwargs.pop("lower_threshold", None)
+        metrics_df = efp.sweep_thresholds(
+            fusion_cls,
+            output_result_file,
+            gold_standard,
+            prog,
+            metrics,
+            **fusion_kwargs,
+        )
+        metrics_df.insert(2, "sample", sample)
+        return metrics_df
+
+    fusion = fusion_cls(output_result_file, gold_standard, **fusion_kwargs)
+
+    rows = list()
+    for metric in metrics:
+        if metric == "FusionName":
+            TP, FP, TPR, PPV, F1 = fusion.fusionname_metrics
+            num_gold = len(np.unique(fusion.gold_standard_fusionnames))
+        else:
+            TP, FP, TPR, PPV, F1 = fusion.breakpt_metrics
+            num_gold = len(np.unique(fusion.gold_standard_breakpts))
+        rows.append((metric, prog, sample, TP, FP, num_gold - TP, TPR, PPV, F1))
+
+    return pd.DataFrame(rows, columns=METRICS_COLUMNS)
+
+
+# paralog_file -> BaseFusion paralog fields, with the ParalogIndex built once per process
+# and shared by its evaluations
+_paralog_kwargs_cache = dict()
+
+
+def _paralog_kwargs(paralog_file):
+    if paralog_file not in _paralog_kwargs_cache:
+        paralog_pairs_dict, paralogs = efp.match_paralogs(paralog_file)
+        _paralog_kwargs_cache[paralog_file] = {
+            "paralog_pairs_dict": paralog_pairs_dict,
+            "paralog_pairs": paralogs,
+            "paralog_index": efp.paralog_clusters.ParalogIndex(paralogs),
+        }
+    return _paralog_kwargs_cache[paralog_file]
+
+
+if __name__ == "__main__":
+    main()
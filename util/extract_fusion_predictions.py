@@ -1,24 +1,55 @@
 #!/usr/bin/env python3
 
 import re
+import io
 import glob
 import gzip
 import abc
 import os
+import sys
 from typing import Any
 from collections import defaultdict
 from dataclasses import dataclass
 from dataclasses import field
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 import numpy as np
 import pandas as pd
 #import intervaltree  # type: ignore
-#from Bio import SeqIO  # type: ignore
 #from intervaltree import Interval  # type: ignore
-#from liftover import get_lifter  # type: ignore
 
+sys.path.insert(
+    0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), "../PyLib"])
+)
+import fusion_breakpoints
+import paralog_clusters
+import chain_liftover
+import fastx_headers
+import prediction_cache
 
-converter = get_lifter("hg19", "hg38")
+
+@dataclass
+class FusionEvaluation(object):
+    """Overlaps of a BaseFusion result with its gold standard, each computed on first use.
+
+    The overlaps are held as (gold standard names, prediction names) views.
+    BaseFusion discards its evaluation when the result, gold standard, thresholds,
+    breakpoint window or paralogs change.
+    """
+
+    gold_standard_fusionnames: np.ndarray | None = None
+    predicted_fusionnames: np.ndarray | None = None
+    gold_standard_breakpts: np.ndarray | None = None
+    predicted_breakpoints: np.ndarray | None = None
+    fusionname_overlap: tuple | None = None
+    breakpt_overlap: tuple | None = None
+    breakpt_window_match: tuple | None = None
+    breakpt_distances: tuple | None = None
+
+
+# LongGF log lines with a fusion summary, with their preceding newline
+SUMGF_PATTERN = re.compile(rb"\nSumGF[ \t][^\n]*")
+LONGGF_CHUNK_SIZE = 1 << 24
 
 
 # TODO: use pandera to check DataFrame col types
@@ -28,6 +59,10 @@ class BaseFusion(object):
 
     :param output_result_file: input file from fusion software output path
     :type output_result_file: str
+    :param use_cache: load the parsed and cleaned result from the prediction cache, or write it
+        there, off by default. The Parquet cache is in ~/.cache/LR-FusionBenchmarking/predictions
+        (or $PREDICTION_CACHE_DIR), up to 2 GiB (or $PREDICTION_CACHE_MAX_BYTES), see prediction_cache.
+    :type use_cache: bool
 
     """
 
@@ -35,7 +70,7 @@ class BaseFusion(object):
 
     output_result_file: str
     gold_standard: pd.DataFrame
-    result: pd.DataFrame = pd.DataFrame()
+    result: pd.DataFrame = field(default_factory=pd.DataFrame)
     lower_threshold: float = 0
     upper_threshold: float = 100
     max_breakpoints_distance: int = (
@@ -46,17 +81,63 @@ class BaseFusion(object):
     breakpt_sort_label: str = "LexSort"
     paralog_pairs_dict: dict[Any, Any] = field(default_factory=dict)
     paralog_pairs: list[Any] = field(default_factory=list)
+    # built from paralog_pairs when not given, and rebuilt when paralog_pairs is set.
+    # A given index may be shared across instances, and is kept as is.
+    paralog_index: paralog_clusters.ParalogIndex | None = None
     # NOTE: jaffal specific field
     jaffal_sample_id: str | None = None
+    # load the parsed and cleaned result from the prediction cache when available, opt-in
+    use_cache: bool = False
+
+    # bump when parse_results() or clean_results() change, to skip the cached results
+    parser_version = 1
+
+    # fields the evaluation depends on
+    _evaluation_fields = (
+        "result",
+        "gold_standard",
+        "lower_threshold",
+        "upper_threshold",
+        "max_breakpoints_distance",
+        "fusion_sort_label",
+        "breakpt_sort_label",
+        "paralog_pairs_dict",
+        "paralog_pairs",
+        "paralog_index",
+    )
+
+    def __setattr__(self, name, value):
+        if name in self._evaluation_fields:
+            self.__dict__["_evaluation"] = None
+        if name == "paralog_index":
+            self.__dict__["_owns_paralog_index"] = False
+        elif name in ("paralog_pairs", "paralog_pairs_dict") and self.__dict__.get(
+            "_owns_paralog_index"
+        ):
+            # the index built from the previous paralog_pairs, rebuilt on the next evaluation
+            self.__dict__["paralog_index"] = None
+            self.__dict__["_owns_paralog_index"] = False
+        super().__setattr__(name, value)
 
     @property
     def reads_field(self):
         return "num_LR"
 
+    @property
+    def evaluation(self) -> FusionEvaluation:
+        """overlaps with the gold standard, computed once until an evaluation field is set.
+        Call invalidate_evaluation() after modifying result or gold_standard in place."""
+        if self.__dict__.get("_evaluation") is None:
+            self.__dict__["_evaluation"] = FusionEvaluation()
+        return self.__dict__["_evaluation"]
+
+    def invalidate_evaluation(self):
+        self.__dict__["_evaluation"] = None
+
     def __post_init__(self):
         # TODO: add assert for breakpoints and fusionnames
-        self.parse_results()
-        self.clean_results()
+        self.load_results()
+        self.filter_results()
         if self.sorted:
             self.fusion_sort_label = "LexSort"
             self.breakpt_sort_label = "LexSort"
@@ -72,37 +153,81 @@ class BaseFusion(object):
     def clean_results(self):
         """Method documentation"""
 
+    def load_results(self):
+        """Parse and clean the result, or load it from the prediction cache,
+        keyed on the output file contents, the parser class and parser_version"""
+        cache_key = None
+        if self.use_cache and os.path.exists(self.output_result_file):
+            cache_key = prediction_cache.cache_key(
+                self.output_result_file,
+                type(self).__name__,
+                self.parser_version,
+                self.jaffal_sample_id,
+            )
+            cached_result = prediction_cache.load(cache_key)
+            if cached_result is not None:
+                self.result = cached_result
+                return
+
+        self.parse_results()
+        self.clean_results()
+
+        if cache_key is not None:
+            prediction_cache.store(self.result, cache_key)
+
+    def filter_results(self):
+        """Keep the predictions with more than lower_threshold reads"""
+        self.result = self.result.loc[
+            self.result.loc[:, self.reads_field] > self.lower_threshold, :
+        ]
+
     @property
     def gold_standard_breakpts(self):
-        return self._gold_standard_breakpts
+        if self.evaluation.gold_standard_breakpts is None:
+            self.evaluation.gold_standard_breakpts = self.gold_standard[
+                f"Breakpoint{self.breakpt_sort_label}"
+            ].unique()
+        return self.evaluation.gold_standard_breakpts
 
     @gold_standard_breakpts.setter
     def gold_standard_breakpts(self, value):
-        self._gold_standard_breakpts = value
+        self.evaluation.gold_standard_breakpts = value
 
     @property
     def gold_standard_fusionnames(self):
-        return self._gold_standard_fusionnames
+        if self.evaluation.gold_standard_fusionnames is None:
+            self.evaluation.gold_standard_fusionnames = self.gold_standard[
+                f"Fusion{self.fusion_sort_label}"
+            ].unique()
+        return self.evaluation.gold_standard_fusionnames
 
     @gold_standard_fusionnames.setter
     def gold_standard_fusionnames(self, value):
-        self._gold_standard_fusionnames = value
+        self.evaluation.gold_standard_fusionnames = value
 
     @property
     def predicted_breakpoints(self) -> np.ndarray:
-        return self._predicted_breakpoints
+        if self.evaluation.predicted_breakpoints is None:
+            self.evaluation.predicted_breakpoints = self.result[
+                f"Breakpoint{self.breakpt_sort_label}"
+            ].unique()
+        return self.evaluation.predicted_breakpoints
 
     @predicted_breakpoints.setter
     def predicted_breakpoints(self, value) -> None:
-        self._predicted_breakpoints = value
+        self.evaluation.predicted_breakpoints = value
 
     @property
     def predicted_fusionnames(self):
-        return self._predicted_fusionnames
+        if self.evaluation.predicted_fusionnames is None:
+            self.evaluation.predicted_fusionnames = self.result[
+                f"Fusion{self.fusion_sort_label}"
+            ].unique()
+        return self.evaluation.predicted_fusionnames
 
     @predicted_fusionnames.setter
     def predicted_fusionnames(self, value):
-        self._predicted_fusionnames = value
+        self.evaluation.predicted_fusionnames = value
 
     @property
     def fusionname_metrics(self):
@@ -167,18 +292,153 @@ class BaseFusion(object):
             F1,
         )
 
+    def threshold_sweep(
+        self, prog=None, metrics=("FusionName", "Breakpoint")
+    ) -> pd.DataFrame:
+        """Fusion name and breakpoint metrics at every minimum read support of the result.
+
+        The predictions are sorted by reads_field once, and each gold standard entry counts
+        as a TP from the highest read support among its equal, paralog (fusion names) or
+        window (breakpoints) matched predictions, so the TP counts at all thresholds come from
+        cumulative counts, matching the metrics of the result filtered to each threshold.
+        Parse with lower_threshold=-np.inf (see sweep_thresholds()) to sweep all predictions.
+
+        :param metrics: FusionName and/or Breakpoint, ie. only FusionName for gold standards
+            without breakpoints
+        :return: DataFrame with columns metric (FusionName or Breakpoint), prog, min_sum_frags,
+            TP, FP, FN, TPR, PPV, F1, as the ROC tables of the plotters for each metric
+        """
+        if prog is None:
+            prog = type(self).__name__
+
+        result = self.result.sort_values(self.reads_field, kind="stable")
+        reads = result[self.reads_field].values
+
+        fusionname_col = f"Fusion{self.fusion_sort_label}"
+        breakpt_col = f"Breakpoint{self.breakpt_sort_label}"
+
+        sweep_dfs = list()
+        for metric, col, match_predictions in (
+            ("FusionName", fusionname_col, self._paralog_matches),
+            ("Breakpoint", breakpt_col, self._window_matches),
+        ):
+            if metric not in metrics:
+                continue
+            predicted_names = result[col].values
+            gold_names = np.unique(self.gold_standard[col].unique())
+
+            # highest read support of each unique predicted name
+            predicted_reads = (
+                pd.Series(reads).groupby(predicted_names, sort=True).max()
+            )
+            gold_reads = predicted_reads.reindex(gold_names).values.astype(float)
+
+            # matched predictions that are not themselves in the gold standard
+            not_gold_predicted = predicted_reads[
+                ~predicted_reads.index.isin(gold_names)
+            ]
+            gold_idx, predicted_idx = match_predictions(
+                gold_names, not_gold_predicted.index.values
+            )
+            matched_reads = (
+                pd.Series(not_gold_predicted.values[predicted_idx])
+                .groupby(gold_idx)
+                .max()
+            )
+            gold_reads[matched_reads.index.values] = np.fmax(
+                gold_reads[matched_reads.index.values], matched_reads.values
+            )
+
+            thresholds = predicted_reads.unique()
+            thresholds.sort()
+            sorted_predicted_reads = np.sort(predicted_reads.values)
+            sorted_gold_reads = np.sort(gold_reads[~np.isnan(gold_reads)])
+            num_predicted = len(sorted_predicted_reads) - np.searchsorted(
+                sorted_predicted_reads, thresholds, side="left"
+            )
+            num_TP = len(sorted_gold_reads) - np.searchsorted(
+                sorted_gold_reads, thresholds, side="left"
+            )
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                TPR = num_TP / len(gold_names) if len(gold_names) else np.nan
+                PPV = num_TP / num_predicted
+                F1 = 2 * TPR * PPV / (TPR + PPV)
+            F1 = np.where(np.isfinite(F1) & (TPR + PPV != 0), F1, np.nan)
+
+            sweep_dfs.append(
+                pd.DataFrame(
+                    {
+                        "metric": metric,
+                        "prog": prog,
+                        "min_sum_frags": thresholds,
+                        "TP": num_TP,
+                        "FP": num_predicted - num_TP,
+                        "FN": len(gold_names) - num_TP,
+                        "TPR": TPR,
+                        "PPV": PPV,
+                        "F1": F1,
+                    }
+                )
+            )
+
+        return pd.concat(sweep_dfs, ignore_index=True)
+
+    def _match_paralogs(self) -> bool:
+        """whether fusion names are matched up to paralogs, ie. paralog clusters are set,
+        whatever paralog_index"""
+        return len(self.paralog_pairs_dict) != 0 and len(self.paralog_pairs) != 0
+
+    def _paralog_matches(self, gold_fusionnames, predicted_fusionnames) -> tuple:
+        """(gold, prediction) index pairs of paralogous fusion names, as in overlap_fusionnames()"""
+        if not self._match_paralogs():
+            empty = np.array([], dtype=np.int64)
+            return empty, empty
+
+        if self.paralog_index is None:
+            # set through __dict__, to keep the evaluation in progress
+            self.__dict__["paralog_index"] = paralog_clusters.ParalogIndex(
+                self.paralog_pairs
+            )
+            self.__dict__["_owns_paralog_index"] = True
+
+        return self.paralog_index.match_fusions(gold_fusionnames, predicted_fusionnames)
+
+    def _window_matches(self, gold_breakpts, predicted_breakpts) -> tuple:
+        """(gold, prediction) index pairs of breakpoints within the window, as in overlap_breakpoints()"""
+        if self.max_breakpoints_distance == 0:
+            empty = np.array([], dtype=np.int64)
+            return empty, empty
+
+        chrom_codes = fusion_breakpoints.ChromCodes()
+        gold_idx, predicted_idx, _, _ = (
+            fusion_breakpoints.find_breakpoint_pairs_within_distance(
+                fusion_breakpoints.parse_breakpoints(gold_breakpts, chrom_codes),
+                fusion_breakpoints.parse_breakpoints(predicted_breakpts, chrom_codes),
+                1 - self.max_breakpoints_distance // 2,
+                self.max_breakpoints_distance // 2,
+            )
+        )
+        return gold_idx, predicted_idx
+
     def overlap_fusionnames(self, return_gold_standard_names=True):
-        self.gold_standard_fusionnames = self.gold_standard[
-            f"Fusion{self.fusion_sort_label}"
-        ].unique()
-        self.predicted_fusionnames = self.result[
-            f"Fusion{self.fusion_sort_label}"
-        ].unique()
-        if self.paralog_pairs_dict == {}:
-            return np.intersect1d(
+        """fusion names matched equally or by paralogs, as the gold standard names
+        or the (';'-joined) prediction names, computed once per evaluation"""
+        if self.evaluation.fusionname_overlap is None:
+            self.evaluation.fusionname_overlap = self._overlap_fusionnames()
+
+        gold_standard_names, predicted_names = self.evaluation.fusionname_overlap
+        if return_gold_standard_names:
+            return gold_standard_names.copy()
+        return predicted_names.copy()
+
+    def _overlap_fusionnames(self):
+        if not self._match_paralogs():
+            overlap = np.intersect1d(
                 np.unique(self.gold_standard_fusionnames),
                 np.unique(self.predicted_fusionnames),
             )
+            return overlap, overlap
 
         # NOTE: match paralogs
         # CORRECTION: use the non-equal gold standard fusion
@@ -192,130 +452,67 @@ class BaseFusion(object):
             np.unique(self.gold_standard_fusionnames),
         )
 
-        paralog_hits = 0
         hit_paralogs_gold_pair = []
         recovered_not_found_predicted_pair = []
 
-        # NOTE: for each gold standard that is not directly equal to prediction
-        for not_found_pair in not_found_pairs:
-            pair = not_found_pair.split("--")
-            if len(pair) > 2:
-                continue  # ignore chain genes like A--B--C--D...
-
-            left, right = pair
-            left_paralogs = [left]
-            right_paralogs = [right]
-            for a in self.paralog_pairs_dict[left]:
-                left_paralogs += self.paralog_pairs[a]
-            for b in self.paralog_pairs_dict[right]:
-                right_paralogs += self.paralog_pairs[b]
-            # there exist at least one pair of paralogs
-            # overlapped with gold standard pairs
-            if (
-                len(
-                    np.intersect1d(
-                        [f"{i}--{j}" for i in left_paralogs for j in right_paralogs],
-                        not_found_predicted_pairs,
-                    )
+        # NOTE: for each gold standard that is not directly equal to prediction,
+        # the predictions with the same or paralogous genes at both ends (ignoring chain genes like A--B--C--D...)
+        gold_idx, predicted_idx = self._paralog_matches(
+            not_found_pairs, not_found_predicted_pairs
+        )
+        paralog_hits = len(gold_idx)
+
+        hit_gold_idx, hit_starts, hit_counts = np.unique(
+            gold_idx, return_index=True, return_counts=True
+        )
+        for i, start, count in zip(hit_gold_idx, hit_starts, hit_counts):
+            # predictions are sorted, as from np.intersect1d
+            hit_predicted_pairs = not_found_predicted_pairs[
+                predicted_idx[start : start + count]
+            ]
+            # pick a random first paralog pair for listing all true positive output
+            hit_paralogs_gold_pair.append(not_found_pairs[i])
+            if count > 1:
+                warnings.warn(
+                    """multiple paralogs of one gold standard pair 
+                     match to multiple predicted fusion pairs!""",
+                    Warning,
+                    stacklevel=2,
                 )
-                > 0
-            ):
-                # pick a random first paralog pair for listing all true positive output
-                hit_paralogs_gold_pair.append(not_found_pair)
-                if (
-                    len(
-                        np.intersect1d(
-                            [
-                                f"{i}--{j}"
-                                for i in left_paralogs
-                                for j in right_paralogs
-                            ],
-                            not_found_predicted_pairs,
-                        )
-                    )
-                    > 1
-                ):
-                    warnings.warn(
-                        """multiple paralogs of one gold standard pair 
-                         match to multiple predicted fusion pairs!""",
-                        Warning,
-                        stacklevel=2,
-                    )
-                    print(
-                        "multiple",
-                        np.intersect1d(
-                            [
-                                f"{i}--{j}"
-                                for i in left_paralogs
-                                for j in right_paralogs
-                            ],
-                            not_found_predicted_pairs,
-                        ),
-                    )
-                    recovered_not_found_predicted_pair.append(
-                        ";".join(
-                            list(
-                                np.intersect1d(
-                                    [
-                                        f"{i}--{j}"
-                                        for i in left_paralogs
-                                        for j in right_paralogs
-                                    ],
-                                    not_found_predicted_pairs,
-                                )
-                            )
-                        )
-                    )
-                else:
-                    recovered_not_found_predicted_pair.append(
-                        np.intersect1d(
-                            [
-                                f"{i}--{j}"
-                                for i in left_paralogs
-                                for j in right_paralogs
-                            ],
-                            not_found_predicted_pairs,
-                        )[0]
-                    )
-                paralog_hits += len(
-                    np.intersect1d(
-                        [f"{i}--{j}" for i in left_paralogs for j in right_paralogs],
-                        not_found_predicted_pairs,
-                    )
+                print("multiple", hit_predicted_pairs)
+                recovered_not_found_predicted_pair.append(
+                    ";".join(list(hit_predicted_pairs))
                 )
+            else:
+                recovered_not_found_predicted_pair.append(hit_predicted_pairs[0])
 
         print(paralog_hits)
         if paralog_hits == 0:
             warnings.warn("No paralogs found!", Warning)
 
-        if return_gold_standard_names:
-            return (
-                list(
-                    np.intersect1d(
-                        np.unique(self.gold_standard_fusionnames),
-                        np.unique(self.predicted_fusionnames),
-                    )
-                )
-                + hit_paralogs_gold_pair
+        equal_fusionnames = list(
+            np.intersect1d(
+                np.unique(self.gold_standard_fusionnames),
+                np.unique(self.predicted_fusionnames),
             )
+        )
         return (
-            list(
-                np.intersect1d(
-                    np.unique(self.gold_standard_fusionnames),
-                    np.unique(self.predicted_fusionnames),
-                )
-            )
-            + recovered_not_found_predicted_pair
+            equal_fusionnames + hit_paralogs_gold_pair,
+            equal_fusionnames + recovered_not_found_predicted_pair,
         )
 
     def overlap_breakpoints(self, return_gold_standard_names: bool = True) -> list[str]:
-        self.predicted_breakpoints = self.result[
-            f"Breakpoint{self.breakpt_sort_label}"
-        ].unique()
-        self.gold_standard_breakpts = self.gold_standard[
-            f"Breakpoint{self.breakpt_sort_label}"
-        ].unique()
+        """breakpoints matched equally or within the window, as the gold standard breakpoints
+        or the (';'-joined) predicted breakpoints, computed once per evaluation"""
+        if self.evaluation.breakpt_overlap is None:
+            self.evaluation.breakpt_overlap = self._overlap_breakpoints()
 
+        gold_standard_breakpts, predicted_breakpts = self.evaluation.breakpt_overlap
+        if return_gold_standard_names:
+            return gold_standard_breakpts.copy()
+        return predicted_breakpts.copy()
+
+    def _overlap_breakpoints(self) -> tuple:
         strictly_equal_breakpt = list(
             np.intersect1d(
                 np.unique(self.gold_standard_breakpts),
@@ -324,298 +521,230 @@ class BaseFusion(object):
         )
 
         if self.max_breakpoints_distance == 0:
-            return strictly_equal_breakpt
+            return strictly_equal_breakpt, strictly_equal_breakpt
 
-        total_overlap_count = 0
-        hit_paralogs_gold_pair = []
-        recovered_not_found_predicted_pair = []
+        (
+            chrom_codes,
+            not_found_pair,
+            not_found_prediction_pair,
+            gold_hit_idx,
+            pred_hit_idx,
+            max_distances,
+        ) = self.match_breakpoints_within_window()
 
-        not_found_pair = np.setdiff1d(
-            np.unique(self.gold_standard_breakpts),
-            np.unique(self.predicted_breakpoints),
-        )
-        not_found_prediction_pair = np.setdiff1d(
-            np.unique(self.predicted_breakpoints),
-            np.unique(self.gold_standard_breakpts),
+        total_overlap_count = len(gold_hit_idx)
+
+        hit_gold_idx, hit_counts = np.unique(gold_hit_idx, return_counts=True)
+        recovered_breakpts = pd.Series(
+            fusion_breakpoints.format_breakpoints(
+                not_found_prediction_pair[pred_hit_idx], chrom_codes
+            ),
+            dtype=object,
         )
-        left_breakpt_tree, right_breakpt_tree = self.get_genes_to_breakpts(
-            not_found_prediction_pair
+        # Matched hit
+        # if both left and right breakpoint overlaps with gold standard
+        # and they belong to the same breakpoint pair
+        recovered_not_found_predicted_pair = (
+            recovered_breakpts.groupby(gold_hit_idx, sort=True).agg(";".join).tolist()
         )
-
-        for gold_breakpt in not_found_pair:
-            left, right = gold_breakpt.split("--")
-            left = left.split(":")
-            right = right.split(":")
-
-            if (right[0] not in right_breakpt_tree) or (
-                left[0] not in left_breakpt_tree
-            ):
-                # NOTE: skip alternative contigs from liftover
-                # If no chromosome matched, use infinity for maximum distances
-                # then no fp_distance_list exists
-                warnings.warn(
-                    f"Missing one or both chromosome pairs\
-                    in the prediction: {left[0]}, {right[0]}!",
-                    Warning,
-                )
-                continue
-
-            # left: [chr, start], gold standard left break point
-            # left_overlapped_intervals: intervals from interval
-            # trees, (start, end, data), data is the breakpoint pair index
-            left_overlapped_intervals = list(
-                left_breakpt_tree[left[0]].at(int(left[1]))
-            )
-            right_overlapped_intervals = list(
-                right_breakpt_tree[right[0]].at(int(right[1]))
+        for gold_idx in hit_gold_idx[hit_counts > 1]:
+            # NOTE: this condition never happen in the simulation
+            warnings.warn(
+                "One gold standard pair match to multiple\
+                predicted breakpoints after window extension!",
+                Warning,
+                stacklevel=2,
             )
-            if (
-                len(left_overlapped_intervals) > 0
-                and len(right_overlapped_intervals) > 0
-                and any(
-                    [
-                        i.data[0] == j.data[0]
-                        for i in left_overlapped_intervals
-                        for j in right_overlapped_intervals
-                    ]
-                )
-            ):
-                # Matched hit
-                # if both left and right breakpoint overlaps with gold standard
-                # and they belong to the same breakpoint pair
-                local_intersected_intervals = []
-                local_max_distances = []
-                for i in left_overlapped_intervals:
-                    for j in right_overlapped_intervals:
-                        if i.data[0] == j.data[0]:
-                            local_intersected_intervals.append(
-                                f"{left[0]}:{i.data[1]}--{right[0]}:{j.data[1]}"
-                            )
-                            total_overlap_count += 1
-                            local_max_distances.append(
-                                max(
-                                    [
-                                        abs(int(left[1]) - i.data[1]),
-                                        abs(int(right[1]) - j.data[1]),
-                                    ]
-                                )
-                            )
-                if len(local_intersected_intervals) > 1:
-                    # NOTE: this condition never happen in the simulation
-                    warnings.warn(
-                        "One gold standard pair match to multiple\
-                        predicted breakpoints after window extension!",
-                        Warning,
-                        stacklevel=2,
-                    )
-                    print(local_intersected_intervals)
-                hit_paralogs_gold_pair.append(gold_breakpt)
-                recovered_not_found_predicted_pair.append(
-                    ";".join(local_intersected_intervals)
-                )
+            print(recovered_breakpts[gold_hit_idx == gold_idx].tolist())
 
-                if recovered_not_found_predicted_pair[-1] == "":
-                    print(
-                        gold_breakpt,
-                        left_overlapped_intervals,
-                        right_overlapped_intervals,
-                        local_intersected_intervals,
-                    )
-                    warnings.warn(
-                        "Unmatched breakpoints for left and right end", Warning
-                    )
+        hit_paralogs_gold_pair = list(
+            fusion_breakpoints.format_breakpoints(
+                not_found_pair[hit_gold_idx], chrom_codes
+            )
+        )
 
         if total_overlap_count == 0:
             warnings.warn("No breakpoints found even with window extension!")
 
-        if return_gold_standard_names:
-            return strictly_equal_breakpt + hit_paralogs_gold_pair
-        return strictly_equal_breakpt + recovered_not_found_predicted_pair
+        return (
+            strictly_equal_breakpt + hit_paralogs_gold_pair,
+            strictly_equal_breakpt + recovered_not_found_predicted_pair,
+        )
 
     def breakpoints_distances_to_goldstandard(self) -> tuple:
-        """Return distances to the closest gold standards break points"""
+        """Return the maximum distances of the gold standard break points to the predictions
+        matched in the window, or else to the closest prediction on the chromosome pair"""
         assert self.max_breakpoints_distance > 0
-        not_found_pair = np.setdiff1d(
-            np.unique(self.gold_standard_breakpts),
-            np.unique(self.predicted_breakpoints),
-        )
-        not_found_prediction_pair = np.setdiff1d(
-            np.unique(self.predicted_breakpoints),
-            np.unique(self.gold_standard_breakpts),
-        )
-        left_breakpt_tree, right_breakpt_tree = self.get_genes_to_breakpts(
-            not_found_prediction_pair
+
+        if self.evaluation.breakpt_distances is None:
+            self.evaluation.breakpt_distances = (
+                self._breakpoints_distances_to_goldstandard()
+            )
+
+        distance_keys, breakpoints_keys, max_distances = (
+            self.evaluation.breakpt_distances
         )
+        return list(distance_keys), list(breakpoints_keys), list(max_distances)
+
+    def _breakpoints_distances_to_goldstandard(self) -> tuple:
+
+        (
+            chrom_codes,
+            not_found_pair,
+            not_found_prediction_pair,
+            gold_hit_idx,
+            pred_hit_idx,
+            hit_max_distances,
+        ) = self.match_breakpoints_within_window()
 
         # only records distances when break points
         # are not strictly equal
-        max_distances = []
-        # these two variables contain the gold standard
-        # lexsorted fusionnames or breakpoints keys
+        # gold standard index -> (max distance, breakpoints key)
         # it does not have to be a match to the prediction in the window
         # used to measure all the closest breakpoints distance
-        distance_keys = []
-        breakpoints_keys = []
-
-        for gold_breakpt in not_found_pair:
-            left, right = gold_breakpt.split("--")
-            left = left.split(":")
-            right = right.split(":")
-
-            if (right[0] not in right_breakpt_tree) or (
-                left[0] not in left_breakpt_tree
-            ):
-                # NOTE: skip alternative contigs from liftover
-                # If no chromosome matched, use infinity for maximum distances
-                # then no fp_distance_list exists
-                warnings.warn(
-                    f"Missing one or both chromosome pairs\
-                    in the prediction: {left[0]}, {right[0]}!",
-                    Warning,
-                )
-                continue
+        gold_idx_to_distance = dict()
 
-            # left: [chr, start], gold standard left break point
-            # left_overlapped_intervals: intervals from interval
-            # trees, (start, end, data), data is the breakpoint pair index
-            left_overlapped_intervals = list(
-                left_breakpt_tree[left[0]].at(int(left[1]))
+        # Maximum distances across multiple intersected intervals
+        recovered_breakpts = pd.Series(
+            fusion_breakpoints.format_breakpoints(
+                not_found_prediction_pair[pred_hit_idx], chrom_codes
+            ),
+            dtype=object,
+        )
+        hit_max_distances = pd.Series(hit_max_distances).groupby(gold_hit_idx).max()
+        hit_breakpoints_keys = recovered_breakpts.groupby(gold_hit_idx).agg(";".join)
+        for gold_idx in hit_max_distances.index:
+            gold_idx_to_distance[gold_idx] = (
+                hit_max_distances[gold_idx],
+                hit_breakpoints_keys[gold_idx],
             )
-            right_overlapped_intervals = list(
-                right_breakpt_tree[right[0]].at(int(right[1]))
+
+        # Measure the distance of the closest paired breakpoint on the same
+        # chromosome pair if not matched even with window extensions on both ends
+        chroms_found = self.gold_chroms_in_prediction(
+            not_found_pair, not_found_prediction_pair
+        )
+        unmatched_gold_idx = np.setdiff1d(np.where(chroms_found)[0], gold_hit_idx)
+        (
+            paired_gold_idx,
+            paired_pred_idx,
+            max_distances_paired_breakpoints,
+        ) = fusion_breakpoints.find_nearest_breakpoint_pairs(
+            not_found_pair[unmatched_gold_idx], not_found_prediction_pair
+        )
+        # NOTE: no break pairs between two chromsome
+        for gold_idx in np.setdiff1d(
+            np.arange(len(unmatched_gold_idx)), paired_gold_idx
+        ):
+            left_chrom, right_chrom = chrom_codes.decode(
+                [
+                    not_found_pair["left_chrom"][unmatched_gold_idx[gold_idx]],
+                    not_found_pair["right_chrom"][unmatched_gold_idx[gold_idx]],
+                ]
             )
-            if (
-                len(left_overlapped_intervals) > 0
-                and len(right_overlapped_intervals) > 0
-                and any(
-                    [
-                        i.data[0] == j.data[0]
-                        for i in left_overlapped_intervals
-                        for j in right_overlapped_intervals
-                    ]
-                )
-            ):
-                # Matched hit
-                # if both left and right breakpoint overlaps with gold standard
-                # and they belong to the same breakpoint pair
-                local_intersected_intervals = []
-                local_max_distances = []
-                for i in left_overlapped_intervals:
-                    for j in right_overlapped_intervals:
-                        if i.data[0] == j.data[0]:
-                            local_intersected_intervals.append(
-                                f"{left[0]}:{i.data[1]}--{right[0]}:{j.data[1]}"
-                            )
-                            local_max_distances.append(
-                                max(
-                                    [
-                                        abs(int(left[1]) - i.data[1]),
-                                        abs(int(right[1]) - j.data[1]),
-                                    ]
-                                )
-                            )
-                if len(local_intersected_intervals) > 1:
-                    # NOTE: this condition never happen in the simulation
-                    warnings.warn(
-                        "One gold standard pair match to multiple\
-                        predicted breakpoints after window extension!",
-                        Warning,
-                        stacklevel=2,
-                    )
-                    print(local_intersected_intervals)
-
-                # Maximum distances across multiple intersected intervals
-                distance_keys.append(gold_breakpt)
-                max_distances.append(max(local_max_distances))
-                breakpoints_keys.append(";".join(local_intersected_intervals))
-            else:
-                # Measure the distance of closest breakpoint if not matched
-                # even with window extensions on both ends
-                max_distances_paired_breakpoints = np.array(
-                    [
-                        max(
-                            [
-                                abs(predicted_left_breakpt.data[1] - int(left[1])),
-                                abs(predicted_right_breakpt.data[1] - int(right[1])),
-                            ]
-                        )
-                        for predicted_left_breakpt in left_breakpt_tree[left[0]]
-                        for predicted_right_breakpt in right_breakpt_tree[right[0]]
-                        if predicted_left_breakpt.data[0]
-                        == predicted_right_breakpt.data[0]
-                    ]
-                )
-                paired_breakpoints = np.array(
-                    [
-                        f"{left[0]}:{predicted_left_breakpt.data[1]}--{right[0]}:{predicted_right_breakpt.data[1]}"
-                        for predicted_left_breakpt in left_breakpt_tree[left[0]]
-                        for predicted_right_breakpt in right_breakpt_tree[right[0]]
-                        if predicted_left_breakpt.data[0]
-                        == predicted_right_breakpt.data[0]
-                    ]
-                )
-                # NOTE: no break pairs between two chromsome
-                if len(paired_breakpoints) == 0:
-                    warnings.warn(
-                        f"No chromosome pairs in the \
-                        prediction: {left[0]}, {right[0]}!",
-                        Warning,
-                    )
-                else:
-                    max_index = np.argmax(max_distances_paired_breakpoints)
-                    max_distances.append(max_distances_paired_breakpoints[max_index])
-                    distance_keys.append(gold_breakpt)
-                    breakpoints_keys.append(paired_breakpoints[max_index])
+            warnings.warn(
+                f"No chromosome pairs in the \
+                prediction: {left_chrom}, {right_chrom}!",
+                Warning,
+            )
+        paired_breakpoints = fusion_breakpoints.format_breakpoints(
+            not_found_prediction_pair[paired_pred_idx], chrom_codes
+        )
+        for gold_idx, max_distance, paired_breakpoint in zip(
+            unmatched_gold_idx[paired_gold_idx],
+            max_distances_paired_breakpoints,
+            paired_breakpoints,
+        ):
+            gold_idx_to_distance[gold_idx] = (max_distance, paired_breakpoint)
+
+        distance_gold_idx = np.array(
+            sorted(gold_idx_to_distance.keys()), dtype=np.int64
+        )
+        distance_keys = list(
+            fusion_breakpoints.format_breakpoints(
+                not_found_pair[distance_gold_idx], chrom_codes
+            )
+        )
+        max_distances = [gold_idx_to_distance[i][0] for i in distance_gold_idx]
+        breakpoints_keys = [gold_idx_to_distance[i][1] for i in distance_gold_idx]
 
         assert len(distance_keys) == len(breakpoints_keys)
         return distance_keys, breakpoints_keys, max_distances
 
-    def get_genes_to_breakpts(
-        self, breakpoint_pairs=None
-    ) -> tuple[dict[Any, Any], dict[Any, Any]]:
-        if breakpoint_pairs is None:
-            breakpoint_pairs = self.result.BreakpointLexSort.values
-        left_trees_dict: dict[Any, Any] = {}
-        right_trees_dict: dict[Any, Any] = {}
-        for index, breakpt in enumerate(breakpoint_pairs):
-            left, right = breakpt.split("--")
-            left = left.split(":")
-            right = right.split(":")
-            if left[0] not in left_trees_dict:
-                left_trees_dict[left[0]] = intervaltree.IntervalTree()
-                left_trees_dict[left[0]].add(
-                    Interval(
-                        int(left[1]) - self.max_breakpoints_distance // 2,
-                        int(left[1]) + self.max_breakpoints_distance // 2,
-                        (index, int(left[1])),
-                    )
-                )
-            else:
-                left_trees_dict[left[0]].add(
-                    Interval(
-                        int(left[1]) - self.max_breakpoints_distance // 2,
-                        int(left[1]) + self.max_breakpoints_distance // 2,
-                        (index, int(left[1])),
-                    )
-                )
-            if right[0] not in right_trees_dict:
-                right_trees_dict[right[0]] = intervaltree.IntervalTree()
-                right_trees_dict[right[0]].add(
-                    Interval(
-                        int(right[1]) - self.max_breakpoints_distance // 2,
-                        int(right[1]) + self.max_breakpoints_distance // 2,
-                        (index, int(right[1])),
-                    )
-                )
-            else:
-                right_trees_dict[right[0]].add(
-                    Interval(
-                        int(right[1]) - self.max_breakpoints_distance // 2,
-                        int(right[1]) + self.max_breakpoints_distance // 2,
-                        (index, int(right[1])),
-                    )
-                )
-        return left_trees_dict, right_trees_dict
+    def match_breakpoints_within_window(self) -> tuple:
+        """Parse the gold standard and predicted breakpoints that are not strictly equal
+        into breakpoint arrays, and find the (gold standard, prediction) pairs
+        within the window at both ends, computed once per evaluation.
+
+        :return: chrom_codes, not_found_pair, not_found_prediction_pair,
+            gold_hit_idx, pred_hit_idx, max_distances
+        """
+        if self.evaluation.breakpt_window_match is None:
+            self.evaluation.breakpt_window_match = (
+                self._match_breakpoints_within_window()
+            )
+        return self.evaluation.breakpt_window_match
+
+    def _match_breakpoints_within_window(self) -> tuple:
+        chrom_codes = fusion_breakpoints.ChromCodes()
+        gold_standard_breakpts = fusion_breakpoints.parse_breakpoints(
+            np.unique(self.gold_standard_breakpts), chrom_codes
+        )
+        predicted_breakpoints = fusion_breakpoints.parse_breakpoints(
+            np.unique(self.predicted_breakpoints), chrom_codes
+        )
+        not_found_pair = fusion_breakpoints.setdiff_breakpoints(
+            gold_standard_breakpts, predicted_breakpoints, chrom_codes
+        )
+        not_found_prediction_pair = fusion_breakpoints.setdiff_breakpoints(
+            predicted_breakpoints, gold_standard_breakpts, chrom_codes
+        )
+
+        # NOTE: skip alternative contigs from liftover
+        # If no chromosome matched, use infinity for maximum distances
+        # then no fp_distance_list exists
+        chroms_found = self.gold_chroms_in_prediction(
+            not_found_pair, not_found_prediction_pair
+        )
+        for left_chrom, right_chrom in zip(
+            chrom_codes.decode(not_found_pair["left_chrom"][~chroms_found]),
+            chrom_codes.decode(not_found_pair["right_chrom"][~chroms_found]),
+        ):
+            warnings.warn(
+                f"Missing one or both chromosome pairs\
+                in the prediction: {left_chrom}, {right_chrom}!",
+                Warning,
+            )
+
+        # predictions cover [coord - window // 2, coord + window // 2) at both ends
+        (
+            gold_hit_idx,
+            pred_hit_idx,
+            left_distances,
+            right_distances,
+        ) = fusion_breakpoints.find_breakpoint_pairs_within_distance(
+            not_found_pair,
+            not_found_prediction_pair,
+            1 - self.max_breakpoints_distance // 2,
+            self.max_breakpoints_distance // 2,
+        )
+
+        return (
+            chrom_codes,
+            not_found_pair,
+            not_found_prediction_pair,
+            gold_hit_idx,
+            pred_hit_idx,
+            np.maximum(left_distances, right_distances),
+        )
+
+    @staticmethod
+    def gold_chroms_in_prediction(gold_brkpts, predicted_brkpts) -> np.ndarray:
+        """Whether the left and right chromosomes of each gold standard breakpoint
+        are among the predicted left and right chromosomes"""
+        return np.isin(
+            gold_brkpts["left_chrom"], predicted_brkpts["left_chrom"]
+        ) & np.isin(gold_brkpts["right_chrom"], predicted_brkpts["right_chrom"])
 
     def analysis_FN_FP(self):
         gold_standard_template = self.gold_standard.copy()
@@ -775,26 +904,17 @@ class CTAT(BaseFusion):
         return "num_LR"
 
     def clean_results(self):
-        self.result["FusionName"] = self.result["#FusionName"].apply(
-            lambda x: "--".join(map(lambda x: x.upper(), x.split("--")))
-        )
-        self.result["Breakpoint"] = self.result.loc[
-            :, ["LeftBreakpoint", "RightBreakpoint"]
-        ].apply(
-            lambda x: "--".join(map(lambda y: ":".join(y.split(":")[:2]), x)), axis=1
-        )
-        self.result["FusionLexSort"] = self.result["#FusionName"].apply(
-            lambda x: "--".join(sorted(map(lambda x: x.upper(), x.split("--"))))
+        self.result["FusionName"] = self.result["#FusionName"].str.upper()
+        # chr1:123:+ -> chr1:123
+        left_ends, right_ends = (
+            self.result[col].str.split(":").str[:2].str.join(":")
+            for col in ["LeftBreakpoint", "RightBreakpoint"]
         )
-        self.result["BreakpointLexSort"] = self.result.loc[
-            :, ["LeftBreakpoint", "RightBreakpoint"]
-        ].apply(
-            lambda x: "--".join(sorted(map(lambda y: ":".join(y.split(":")[:2]), x))),
-            axis=1,
+        self.result["Breakpoint"] = join_pairs(left_ends, right_ends)
+        self.result["FusionLexSort"] = lex_sort_names(self.result["FusionName"])
+        self.result["BreakpointLexSort"] = join_pairs(
+            left_ends, right_ends, lex_sort=True
         )
-        self.result = self.result.loc[
-            self.result.loc[:, self.reads_field] > self.lower_threshold, :
-        ]
 
 
 @dataclass
@@ -817,22 +937,20 @@ class Pbfusion(BaseFusion):
         )
 
         # Different pbfusion version has different INFO lines
-        # v0.3.0
-        # INFO line number
-        self.commented_rows = 20
-        self.result = pd.read_table(
-            self.output_result_file, skiprows=self.commented_rows
-        )
-        # except pd.errors.ParserError:
-        if "info" not in self.result.columns:  # v0.1
-            self.commented_rows = 18
-            self.result = pd.read_table(
-                self.output_result_file, skiprows=self.commented_rows
-            )
-        if "info" not in self.result.columns:  # v0.2.2
-            self.commented_rows = 14
+        # (ie. 20 for v0.3.0, 18 for v0.1, 14 for v0.2.2), so the table is read
+        # from the #chr1 header line, found in the same pass
+        with open_text(self.output_result_file) as fin:
+            self.commented_rows = 0
+            for line in fin:
+                if line.startswith("#chr1"):
+                    break
+                self.commented_rows += 1
+            else:
+                raise ValueError(
+                    f"Error, no #chr1 header line in {self.output_result_file}"
+                )
             self.result = pd.read_table(
-                self.output_result_file, skiprows=self.commented_rows
+                fin, header=None, names=line.rstrip("\n").split("\t")
             )
         assert "info" in self.result
         return self.result
@@ -848,51 +966,23 @@ class Pbfusion(BaseFusion):
         )
         self.result.loc[:, "num_LR"] = pbfusion_read_count
 
-        if self.commented_rows in [18, 20]:
-            sorted_gene_pairs = list(
-                self.result.loc[:, "info"]
-                .str.extract("(?<=GN=)([^;]+);")
-                .iloc[:, 0]
-                .str.upper()
-                .map(lambda x: "--".join(sorted(x.split(","))))
-            )
-            unsorted_gene_pairs = list(
-                self.result.loc[:, "info"]
-                .str.extract("(?<=GN=)([^;]+);")
-                .iloc[:, 0]
-                .str.upper()
-                .map(lambda x: "--".join(x.split(",")))
-            )
-        else:
-            sorted_gene_pairs = list(
-                self.result.loc[:, "info"]
-                .str.extract("(?<=GENE_NAMES=)([^;]+);")
-                .iloc[:, 0]
-                .str.upper()
-                .map(lambda x: "--".join(sorted(x.split(","))))
-            )
-            unsorted_gene_pairs = list(
-                self.result.loc[:, "info"]
-                .str.extract("(?<=GENE_NAMES=)([^;]+);")
-                .iloc[:, 0]
-                .str.upper()
-                .map(lambda x: "--".join(x.split(",")))
-            )
+        # GN= (v0.1, v0.3.0 and later) or GENE_NAMES= (v0.2.2)
+        gene_names = (
+            self.result.loc[:, "info"]
+            .str.extract("(?:GN|GENE_NAMES)=([^;]+);", expand=False)
+            .str.upper()
+        )
 
-        self.result["FusionName"] = unsorted_gene_pairs
-        self.result["FusionLexSort"] = sorted_gene_pairs
+        self.result["FusionName"] = gene_names.str.replace(",", "--", regex=False)
+        self.result["FusionLexSort"] = lex_sort_names(gene_names, sep=",")
 
-        self.result["Breakpoint"] = self.result.loc[
-            :, ["#chr1", "start1", "chr2", "start2"]
-        ].apply(lambda x: "--".join([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"]), axis=1)
-        self.result["BreakpointLexSort"] = self.result.loc[
-            :, ["#chr1", "start1", "chr2", "start2"]
-        ].apply(
-            lambda x: "--".join(sorted([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"])), axis=1
+        left_ends = join_pairs(self.result["#chr1"], self.result["start1"], sep=":")
+        right_ends = join_pairs(self.result["chr2"], self.result["start2"], sep=":")
+        self.result["Breakpoint"] = join_pairs(left_ends, right_ends)
+        self.result["BreakpointLexSort"] = join_pairs(
+            left_ends, right_ends, lex_sort=True
         )
 
-        self.result = self.result.loc[pbfusion_read_count > self.lower_threshold, :]
-
 
 @dataclass
 class JAFFAL(BaseFusion):
@@ -900,10 +990,13 @@ class JAFFAL(BaseFusion):
         assert self.output_result_file.startswith("gs") or os.path.exists(
             self.output_result_file
         )
-        self.result = pd.read_csv(self.output_result_file)
-        if self.jaffal_sample_id is not None:
-            self.result = self.result.loc[
-                self.result.iloc[:, 0].isin([self.jaffal_sample_id]), :
+        # the csv may hold several samples, so it is parsed and partitioned once per process
+        results, sample_rows = read_jaffal_samples(self.output_result_file)
+        if self.jaffal_sample_id is None:
+            self.result = results.copy()
+        else:
+            self.result = results.iloc[
+                sample_rows.get(self.jaffal_sample_id, np.array([], dtype=np.int64))
             ].copy()
         return self.result
 
@@ -912,27 +1005,15 @@ class JAFFAL(BaseFusion):
         return "spanning reads"
 
     def clean_results(self):
-        self.result["FusionName"] = (
-            self.result["fusion genes"]
-            .str.upper()
-            .apply(lambda x: "--".join(x.split(":")))
+        fusion_genes = self.result["fusion genes"].str.upper()
+        self.result["FusionName"] = fusion_genes.str.replace(":", "--", regex=False)
+        left_ends = join_pairs(self.result["chrom1"], self.result["base1"], sep=":")
+        right_ends = join_pairs(self.result["chrom2"], self.result["base2"], sep=":")
+        self.result["Breakpoint"] = join_pairs(left_ends, right_ends)
+        self.result["FusionLexSort"] = lex_sort_names(fusion_genes, sep=":")
+        self.result["BreakpointLexSort"] = join_pairs(
+            left_ends, right_ends, lex_sort=True
         )
-        self.result["Breakpoint"] = self.result.loc[
-            :, ["chrom1", "base1", "chrom2", "base2"]
-        ].apply(lambda x: "--".join([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"]), axis=1)
-        self.result["FusionLexSort"] = (
-            self.result["fusion genes"]
-            .str.upper()
-            .apply(lambda x: "--".join(sorted(x.split(":"))))
-        )
-        self.result["BreakpointLexSort"] = self.result.loc[
-            :, ["chrom1", "base1", "chrom2", "base2"]
-        ].apply(
-            lambda x: "--".join(sorted([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"])), axis=1
-        )
-        self.result = self.result.loc[
-            (self.result.loc[:, "spanning reads"] > self.lower_threshold), :
-        ]
 
 
 @dataclass
@@ -949,23 +1030,20 @@ class FusionSeeker(BaseFusion):
         return self.result
 
     def clean_results(self):
-        self.result["FusionName"] = self.result.loc[:, ["Gene1", "Gene2"]].apply(
-            lambda x: "--".join(x).upper(), axis=1
+        self.result["FusionName"] = join_pairs(
+            self.result["Gene1"], self.result["Gene2"]
+        ).str.upper()
+        self.result["FusionLexSort"] = lex_sort_names(self.result["FusionName"])
+        left_ends = join_pairs(
+            self.result["Chrom1"], self.result["Breakpoint1"], sep=":"
         )
-        self.result["FusionLexSort"] = self.result["FusionName"].apply(
-            lambda x: "--".join(sorted(x.split("--"))).upper()
+        right_ends = join_pairs(
+            self.result["Chrom2"], self.result["Breakpoint2"], sep=":"
         )
-        self.result["Breakpoint"] = self.result.loc[
-            :, ["Chrom1", "Breakpoint1", "Chrom2", "Breakpoint2"]
-        ].apply(lambda x: "--".join([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"]), axis=1)
-        self.result["BreakpointLexSort"] = self.result.loc[
-            :, ["Chrom1", "Breakpoint1", "Chrom2", "Breakpoint2"]
-        ].apply(
-            lambda x: "--".join(sorted([f"{x[0]}:{x[1]}", f"{x[2]}:{x[3]}"])), axis=1
+        self.result["Breakpoint"] = join_pairs(left_ends, right_ends)
+        self.result["BreakpointLexSort"] = join_pairs(
+            left_ends, right_ends, lex_sort=True
         )
-        self.result = self.result.loc[
-            (self.result.loc[:, self.reads_field] > self.lower_threshold), :
-        ]
 
     # def parse_results(self):
     #     pass
@@ -976,6 +1054,9 @@ class FusionSeeker(BaseFusion):
 
 @dataclass
 class LongGF(BaseFusion):
+    # num_LR parsed as int64
+    parser_version = 2
+
     def parse_results(self) -> pd.DataFrame:
         assert self.output_result_file.startswith("gs") or os.path.exists(
             self.output_result_file
@@ -985,14 +1066,33 @@ class LongGF(BaseFusion):
                 os.system(f"gsutil cp -r {self.output_result_file} .")
             self.output_result_file = os.path.basename(self.output_result_file)
 
-        result_table = []
-        with open(self.output_result_file) as fin:
-            for line in fin:
-                if "SumGF" in line:
-                    elements = line.strip().split()
-                    result_table.append(elements)
-        self.result = pd.DataFrame(result_table)
-        self.result.iloc[:, 2] = self.result.iloc[:, 2].astype(int)
+        # SumGF<tab>GENE1:GENE2 num_reads left_breakpoint right_breakpoint
+        # records are picked out of the log by chunk, and parsed together into typed columns
+        sumgf_records = io.BytesIO()
+        opener = gzip.open if self.output_result_file.endswith(".gz") else open
+        with opener(self.output_result_file, "rb") as fin:
+            remainder = b""
+            for chunk in iter(lambda: fin.read(LONGGF_CHUNK_SIZE), b""):
+                # matched from the newline before each record, up to the last complete line
+                lines = b"\n" + remainder + chunk
+                last_newline = lines.rfind(b"\n")
+                sumgf_records.writelines(
+                    SUMGF_PATTERN.findall(lines, 0, last_newline)
+                )
+                remainder = lines[last_newline + 1 :]
+            sumgf_records.writelines(SUMGF_PATTERN.findall(b"\n" + remainder))
+
+        dtypes = {0: object, 1: object, 2: np.int64, 3: object, 4: object}
+        if sumgf_records.tell() == 0:
+            self.result = pd.DataFrame(
+                {col: pd.Series(dtype=dtype) for col, dtype in dtypes.items()}
+            )
+            return self.result
+
+        sumgf_records.seek(0)
+        self.result = pd.read_csv(
+            sumgf_records, sep=r"\s+", header=None, names=range(5), dtype=dtypes
+        )
         return self.result
 
     @property
@@ -1006,29 +1106,19 @@ class LongGF(BaseFusion):
             axis=1,
         )
         self.result["FusionName"] = (
-            self.result["FusionName"]
-            .str.upper()
-            .apply(lambda x: "--".join(x.split(":")))
-        )
-        self.result["FusionLexSort"] = (
-            self.result.iloc[:, 0]
-            .str.upper()
-            .map(lambda x: "--".join(sorted(x.split("--"))))
-            .values
-        )
-        self.result.loc[:, "Breakpoint"] = (
-            self.result.loc[:, ["LeftBreakpoint", "RightBreakpoint"]]
-            .apply(lambda x: "--".join(x), axis=1)
-            .values
+            self.result["FusionName"].str.upper().str.replace(":", "--", regex=False)
         )
-        self.result.loc[:, "BreakpointLexSort"] = (
-            self.result.loc[:, ["LeftBreakpoint", "RightBreakpoint"]]
-            .apply(lambda x: "--".join(sorted(x)), axis=1)
-            .values
-        )
-        self.result = self.result.loc[
-            (self.result.loc[:, self.reads_field] > self.lower_threshold), :
-        ]
+        self.result["FusionLexSort"] = lex_sort_names(
+            self.result.iloc[:, 0].str.upper()
+        ).values
+        self.result.loc[:, "Breakpoint"] = join_pairs(
+            self.result["LeftBreakpoint"], self.result["RightBreakpoint"]
+        ).values
+        self.result.loc[:, "BreakpointLexSort"] = join_pairs(
+            self.result["LeftBreakpoint"],
+            self.result["RightBreakpoint"],
+            lex_sort=True,
+        ).values
 
 
 @dataclass
@@ -1051,67 +1141,122 @@ class FLAIRFUSION(BaseFusion):
             axis=1,
         )
         self.result["FusionName"] = (
-            self.result["FusionName"]
-            .str.upper()
-            .apply(lambda x: "--".join(x.split(":")))
-        )
-        self.result["FusionLexSort"] = (
-            self.result.iloc[:, 0]
-            .str.upper()
-            .map(lambda x: "--".join(sorted(x.split("--"))))
-            .values
+            self.result["FusionName"].str.upper().str.replace(":", "--", regex=False)
         )
+        self.result["FusionLexSort"] = lex_sort_names(
+            self.result.iloc[:, 0].str.upper()
+        ).values
         #3'-PTPRT-chr20-42791192-0.604
-        self.result.loc[:, "Breakpoint"] = (
-            self.result.loc[:, ["LeftBreakpoint", "RightBreakpoint"]]
-            .apply(lambda x: "--".join([":".join(x[0].split("-")[-3:-1]), ":".join(x[1].split("-")[-3:-1])]), axis=1)
-            .values
-        )
+        self.result.loc[:, "Breakpoint"] = join_pairs(
+            *(
+                self.result[col].str.split("-").str[-3:-1].str.join(":")
+                for col in ["LeftBreakpoint", "RightBreakpoint"]
+            )
+        ).values
         print(self.result.head())
-        self.result.loc[:, "BreakpointLexSort"] = (
+        self.result.loc[:, "BreakpointLexSort"] = lex_sort_names(
             self.result.loc[:, "Breakpoint"]
-            .apply(lambda x: "--".join(sorted(x.split("--"))))
-            .values
-        )
+        ).values
         print(self.result.head())
-        self.result = self.result.loc[
-            (self.result.loc[:, self.reads_field] > self.lower_threshold), :
-        ]
+
+
+def open_text(filename):
+    """text handle of a local (optionally gzipped) or gs:// file"""
+    if filename.startswith("gs"):
+        import fsspec  # type: ignore
+
+        return fsspec.open(filename, "rt", compression="infer").open()
+    if filename.endswith(".gz"):
+        return gzip.open(filename, "rt")
+    return open(filename)
+
+
+# (csv path, mtime, size) -> (results, sample -> row positions), for the JAFFAL csvs already read in this process
+_jaffal_samples = dict()
+
+
+def read_jaffal_samples(filename):
+    """
+    JAFFAL results csv, parsed once per process, with the row positions of each sample
+    (first column), so JAFFAL instances for different samples of one csv share the parse
+    """
+    if filename.startswith("gs"):
+        samples_key = (filename,)
+    else:
+        stat = os.stat(filename)
+        samples_key = (os.path.realpath(filename), stat.st_mtime_ns, stat.st_size)
+
+    if samples_key not in _jaffal_samples:
+        results = pd.read_csv(filename)
+        _jaffal_samples[samples_key] = (
+            results,
+            results.groupby(results.iloc[:, 0], sort=False).indices,
+        )
+
+    return _jaffal_samples[samples_key]
+
+
+def join_pairs(left, right, sep="--", lex_sort=False):
+    """'{left}{sep}{right}' for each row of the left and right Series (ie. fusion ends),
+    with each pair in lexical order when lex_sort, as "--".join(sorted([left, right]))
+
+    The rows are paired by position, whatever the index of right; the result has the index of left."""
+    left = pd.Series(left).astype(str)
+    # np.asarray() so that right is taken positionally, and not aligned to left by index labels
+    right = pd.Series(np.asarray(right), index=left.index).astype(str)
+    if lex_sort:
+        swap = left > right
+        left, right = left.where(~swap, right), right.where(~swap, left)
+    return left.str.cat(right, sep=sep)
+
+
+def lex_sort_names(names, sep="--"):
+    """names with their sep-separated parts sorted and joined by '--', ie. B:A -> A--B"""
+    parts = names.str.split(sep, regex=False)
+    lex_sorted = join_pairs(parts.str[0], parts.str[1], lex_sort=True)
+    # NOTE: chains like A--B--C are rare, and sorted one at a time
+    not_pairs = (parts.str.len() != 2) & names.notnull()
+    lex_sorted[not_pairs] = parts[not_pairs].map(lambda x: "--".join(sorted(x)))
+    return lex_sorted.where(names.notnull())
+
+
+def sweep_thresholds(
+    fusion_cls,
+    output_result_file,
+    gold_standard,
+    prog=None,
+    metrics=("FusionName", "Breakpoint"),
+    **kwargs,
+):
+    """Parse a fusion_cls (ie. CTAT, JAFFAL) result once, without the read support filter,
+    and return its metrics at every threshold, as from BaseFusion.threshold_sweep()"""
+    fusion = fusion_cls(
+        output_result_file, gold_standard, lower_threshold=-np.inf, **kwargs
+    )
+    return fusion.threshold_sweep(prog, metrics)
 
 
 def breakpoints_comparison(x, y):
-    left1, right1 = x.split("--")
-    left2, right2 = y.split("--")
-
-    left1 = left1.split(":")
-    left2 = left2.split(":")
-    right1 = right1.split(":")
-    right2 = right2.split(":")
-    assert left1[0] == left2[0]
-    assert right1[0] == right2[0]
-    return np.abs(int(left1[1]) - int(left2[1])) + np.abs(
-        int(right1[1]) - int(right2[1])
+    """Sum of the left and right distances between breakpoints x and y,
+    either single breakpoint strings or arrays of them compared elementwise"""
+    chrom_codes = fusion_breakpoints.ChromCodes()
+    left_distances, right_distances = fusion_breakpoints.breakpoint_distances(
+        fusion_breakpoints.parse_breakpoints(np.atleast_1d(x), chrom_codes),
+        fusion_breakpoints.parse_breakpoints(np.atleast_1d(y), chrom_codes),
     )
+    distances = left_distances + right_distances
+    if np.ndim(x) == 0 and np.ndim(y) == 0:
+        return distances[0]
+    return distances
 
 
-def match_paralogs():
-    """wget -c https://raw.githubusercontent.com/fusiontranscripts/FusionBenchmarking/b08aae832bc36dea4a874dad5bd230baa546fa18/resources/paralog_clusters.2020.I5.dat"""
-    import urllib.request
+def match_paralogs(paralog_file=None):
+    """paralog clusters from resources/paralog_clusters.2020.I5.dat (or paralog_file), via the local cache"""
+    if paralog_file is None:
+        paralog_file = paralog_clusters.paralog_clusters_file("I5")
 
-    paralog_file = urllib.request.urlopen(
-        "https://raw.githubusercontent.com/fusiontranscripts/FusionBenchmarking/b08aae832bc36dea4a874dad5bd230baa546fa18/resources/paralog_clusters.2020.I5.dat"
-    )
-    paralog_pairs_dict = defaultdict(list)
-    paralogs = []
-    n = 0
-    for line in paralog_file:
-        paralog_pair = line.strip().decode("utf-8").split()
-        # NOTE: take uppper case to be consistent with gold standard and prediction
-        paralog_pair = list(map(lambda x: x.upper(), paralog_pair))
-        paralogs.append(paralog_pair)
-        for paralog in paralog_pair:
-            paralog_pairs_dict[paralog].append(n)
-        n += 1
+    paralogs = paralog_clusters.load_paralog_clusters(paralog_file)
+    paralog_pairs_dict = paralog_clusters.paralog_pairs_dict(paralogs)
 
     for paralog in paralog_pairs_dict:
         assert len(paralog_pairs_dict[paralog]) != 0
@@ -1141,12 +1286,14 @@ def parse_breakpt(desc):
     )
 
 
-def load_gold_standard_pbsim3(template_sequences):
+def load_gold_standard_pbsim3(template_sequences, threads=1):
     """
     Args
     --------
     :param template_sequences: `str`, fastq.gz paths
+    :param threads: `int`, threads for decompressing each fastq.gz, see fastx_headers.open_binary()
     """
+    converter = chain_liftover.get_lifter("hg19", "hg38")
     all_benchmark = dict()
 
     for folder in glob.glob(template_sequences):
@@ -1159,10 +1306,10 @@ def load_gold_standard_pbsim3(template_sequences):
         print(folder, fastq, mixmap)
 
         read_names = []
-        with gzip.open(fastq, "rt") as handle:
-            for record in SeqIO.parse(handle, "fastq-sanger"):
-                desc = record.description
-                read_names.append(desc.replace("/ccs", ""))
+        for descs in fastx_headers.iter_description_batches(
+            fastq, "fastq", threads=threads
+        ):
+            read_names.extend(desc.replace("/ccs", "") for desc in descs)
         print(read_names[:5])
         gold = pd.read_table(mixmap, header=None, index_col=0, sep="\t")
         gold = gold.reset_index()
@@ -1181,13 +1328,17 @@ def load_gold_standard_pbsim3(template_sequences):
         gold_breakpoints_hg19 = pd.DataFrame(gold_breakpoints_hg19)
         gold_breakpoints_hg38 = pd.concat(
             [
-                gold_breakpoints_hg19.apply(
-                    lambda x: ":".join(list(map(str, converter[x[0]][x[1]][0]))[:2]),
-                    axis=1,
+                pd.Series(
+                    converter.lift_breakpoint_ends(
+                        gold_breakpoints_hg19[0], gold_breakpoints_hg19[1]
+                    ),
+                    index=gold_breakpoints_hg19.index,
                 ),
-                gold_breakpoints_hg19.apply(
-                    lambda x: ":".join(list(map(str, converter[x[2]][x[3]][0]))[:2]),
-                    axis=1,
+                pd.Series(
+                    converter.lift_breakpoint_ends(
+                        gold_breakpoints_hg19[2], gold_breakpoints_hg19[3]
+                    ),
+                    index=gold_breakpoints_hg19.index,
                 ),
                 gold_breakpoints_hg19.iloc[:, -1],
             ],
@@ -1234,7 +1385,7 @@ def load_gold_standard_pbsim3(template_sequences):
     return all_benchmark
 
 
-def load_gold_standard(template_sequences):
+def load_gold_standard(template_sequences, threads=1):
     """
     Load all the template fasta
     and return the gold standard break points
@@ -1242,38 +1393,41 @@ def load_gold_standard(template_sequences):
     Args
     --------
     :param template_sequences: `str`, fasta paths
+    :param threads: `int`, threads for decompressing each fasta.gz, see fastx_headers.open_binary()
     """
+    converter = chain_liftover.get_lifter("hg19", "hg38")
     gold_standard_breakpoints_hg19 = []
     for fasta in glob.glob(template_sequences):
         os.path.basename(fasta).replace(".fasta.gz", "")
-        with gzip.open(fasta, "rt") as handle:
-            for record in SeqIO.parse(handle, "fasta"):
-                desc = record.description.split()
-                # example: LCORL|ENSG00000178177.10--CT47B1|ENSG00000236446.2
-                one_gene_pair = re.search(r"(\S+)\|.*--(\S+)\|.*", desc[0])
-                if one_gene_pair:
-                    one_gene_pair = list(one_gene_pair.groups())
-                else:
-                    raise Exception
-                # example: chr4:18022357-18022154,17963655-17963526[-]
-                one_end = desc[2].split(":")
-                # example: chrX:120007874-120007719,120006594-120006457[-]
-                another_end = desc[3].split(":")
-
-                one_end_coord = re.search(r"(?<=-)(\S+)\[", one_end[1].split(",")[-1])
-                if one_end_coord:
-                    one_end_coord = one_end_coord.groups()
-                else:
-                    raise Exception
-                gold_standard_breakpoints_hg19.append(
-                    [
-                        one_end[0],
-                        int(one_end_coord[0]),
-                        another_end[0],
-                        int(another_end[1].split(",")[0].split("-")[0]),
-                        "--".join(one_gene_pair),
-                    ]
-                )
+        for description in fastx_headers.iter_descriptions(
+            fasta, "fasta", threads=threads
+        ):
+            desc = description.split()
+            # example: LCORL|ENSG00000178177.10--CT47B1|ENSG00000236446.2
+            one_gene_pair = re.search(r"(\S+)\|.*--(\S+)\|.*", desc[0])
+            if one_gene_pair:
+                one_gene_pair = list(one_gene_pair.groups())
+            else:
+                raise Exception
+            # example: chr4:18022357-18022154,17963655-17963526[-]
+            one_end = desc[2].split(":")
+            # example: chrX:120007874-120007719,120006594-120006457[-]
+            another_end = desc[3].split(":")
+
+            one_end_coord = re.search(r"(?<=-)(\S+)\[", one_end[1].split(",")[-1])
+            if one_end_coord:
+                one_end_coord = one_end_coord.groups()
+            else:
+                raise Exception
+            gold_standard_breakpoints_hg19.append(
+                [
+                    one_end[0],
+                    int(one_end_coord[0]),
+                    another_end[0],
+                    int(another_end[1].split(",")[0].split("-")[0]),
+                    "--".join(one_gene_pair),
+                ]
+            )
 
     # did not consider strand
     # do we consider strand ?
@@ -1281,11 +1435,17 @@ def load_gold_standard(template_sequences):
     print(gold_standard_breakpoints_hg19.head())
     gold_standard_breakpoints_hg38 = pd.concat(
         [
-            gold_standard_breakpoints_hg19.apply(
-                lambda x: ":".join(list(map(str, converter[x[0]][x[1]][0]))[:2]), axis=1
+            pd.Series(
+                converter.lift_breakpoint_ends(
+                    gold_standard_breakpoints_hg19[0], gold_standard_breakpoints_hg19[1]
+                ),
+                index=gold_standard_breakpoints_hg19.index,
             ),
-            gold_standard_breakpoints_hg19.apply(
-                lambda x: ":".join(list(map(str, converter[x[2]][x[3]][0]))[:2]), axis=1
+            pd.Series(
+                converter.lift_breakpoint_ends(
+                    gold_standard_breakpoints_hg19[2], gold_standard_breakpoints_hg19[3]
+                ),
+                index=gold_standard_breakpoints_hg19.index,
             ),
             gold_standard_breakpoints_hg19.iloc[:, -1],
         ],
@@ -1322,47 +1482,57 @@ def load_gold_standard(template_sequences):
     return gold_standard_breakpoints_hg38
 
 
-def load_reads(fastqs, gold_standard_breakpoints_hg38):
+def load_reads(fastqs, gold_standard_breakpoints_hg38, jobs=1, threads=1):
     """For each gene fusion pairs,
     return the gold standard read count by parsing the fastq.gz
 
+    The fastq files are scanned in parallel across jobs processes,
+    each decompressing its fastq.gz with threads threads (see fastx_headers.open_binary()).
     """
     all_benchmark = dict()
     all_benchmark_reads = dict()
 
     all_benchmark_with_breakpt = dict()
-    for fastq in glob.glob(fastqs):
+
+    fastq_files = glob.glob(fastqs)
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            fastq_fusion_reads = list(
+                executor.map(
+                    fusion_reads_from_fastq,
+                    fastq_files,
+                    [threads] * len(fastq_files),
+                )
+            )
+    else:
+        fastq_fusion_reads = [
+            fusion_reads_from_fastq(fastq, threads) for fastq in fastq_files
+        ]
+
+    for fastq, fusion_reads in zip(fastq_files, fastq_fusion_reads):
         sim_data_name = os.path.basename(fastq).replace(".fastq.gz", "")
+
+        all_benchmark[sim_data_name] = defaultdict(
+            int, [(fusion, len(reads)) for fusion, reads in fusion_reads.items()]
+        )
+        all_benchmark_reads[sim_data_name] = defaultdict(list, fusion_reads)
+
+        read_counts = pd.Series(all_benchmark[sim_data_name], dtype=np.int64)
+        missing_fusions = read_counts.index.difference(
+            gold_standard_breakpoints_hg38.index
+        )
+        if len(missing_fusions) > 0:
+            raise KeyError(
+                f"fusion reads in {fastq} lack gold standard breakpoints: "
+                + ", ".join(missing_fusions[:5])
+            )
+
         all_benchmark_with_breakpt[sim_data_name] = gold_standard_breakpoints_hg38.copy(
             deep=True
         )
-        all_benchmark_with_breakpt[sim_data_name].loc[:, "num_LR"] = 0
-
-        all_benchmark[sim_data_name] = defaultdict(int)
-        all_benchmark_reads[sim_data_name] = defaultdict(list)
-        with gzip.open(fastq, "rt") as handle:
-            for record in SeqIO.parse(handle, "fastq-sanger"):
-                desc = record.description.split()
-                one_gene_pair = re.search(r"(\S+)\|.*--(\S+)\|.*", desc[1])
-                if one_gene_pair:
-                    all_benchmark[sim_data_name][
-                        "--".join(
-                            sorted(map(lambda x: x.upper(), one_gene_pair.groups()))
-                        )
-                    ] += 1
-                    all_benchmark_reads[sim_data_name][
-                        "--".join(
-                            sorted(map(lambda x: x.upper(), one_gene_pair.groups()))
-                        )
-                    ].append(desc[0])
-                    all_benchmark_with_breakpt[sim_data_name].loc[
-                        "--".join(
-                            sorted(map(lambda x: x.upper(), one_gene_pair.groups()))
-                        ),
-                        "num_LR",
-                    ] += 1
-                else:
-                    raise Exception
+        all_benchmark_with_breakpt[sim_data_name].loc[:, "num_LR"] = read_counts.reindex(
+            gold_standard_breakpoints_hg38.index, fill_value=0
+        ).values
 
     # write tables of truth set fusion read counts
     if not os.path.exists("data"):
@@ -1381,10 +1551,13 @@ def load_reads(fastqs, gold_standard_breakpoints_hg38):
     # write tables of truth set fusion read counts
     for sim_data_name in all_benchmark_with_breakpt.keys():
         df = all_benchmark_with_breakpt[sim_data_name]
-        df.loc[:, "read_names"] = "NA"
         reads = all_benchmark_reads[sim_data_name]
-        for fusion_name in reads.keys():
-            df.loc[fusion_name, "read_names"] = ";".join(reads[fusion_name])
+        read_names = pd.Series(
+            [";".join(fusion_reads) for fusion_reads in reads.values()],
+            index=list(reads.keys()),
+            dtype=object,
+        )
+        df.loc[:, "read_names"] = read_names.reindex(df.index, fill_value="NA").values
         df["sim_data_name"] = sim_data_name
         df.to_csv(
             "data/" + sim_data_name + ".truthset_counts_with_breakpts.tsv",
@@ -1392,3 +1565,36 @@ def load_reads(fastqs, gold_standard_breakpoints_hg38):
             index=False,
         )
     return all_benchmark, all_benchmark_reads, all_benchmark_with_breakpt
+
+
+def fusion_reads_from_fastq(fastq, threads=1):
+    """
+    returns dict: upper-cased, lex-sorted fusion name -> list of its read names,
+    in the order the fusions and reads are first seen in the fastq
+    """
+    descs = pd.Series(
+        [
+            desc
+            for descs in fastx_headers.iter_description_batches(
+                fastq, "fastq", threads=threads
+            )
+            for desc in descs
+        ],
+        dtype=object,
+    )
+
+    desc = descs.str.split()
+    gene_pairs = desc.str[1].str.extract(r"(\S+)\|.*--(\S+)\|.*")
+    if gene_pairs[0].isnull().any():
+        raise Exception
+
+    left_genes = gene_pairs[0].str.upper()
+    right_genes = gene_pairs[1].str.upper()
+    fusions = (left_genes + "--" + right_genes).where(
+        left_genes <= right_genes, right_genes + "--" + left_genes
+    )
+
+    return {
+        fusion: fusion_read_names.tolist()
+        for fusion, fusion_read_names in desc.str[0].groupby(fusions, sort=False)
+    }
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+
+import sys, os
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+sys.path.insert(
+    0, os.path.sep.join([os.path.dirname(os.path.realpath(__file__)), ".."])
+)
+import extract_fusion_predictions as efp
+
+# Checks of the BaseFusion evaluation against paralog clusters, and of the nearest
+# predicted breakpoint search against all the (gold standard, prediction) distances.
+#
+# usage: python test_extract_fusion_predictions.py, or via pytest
+
+
+@dataclass
+class ListedFusion(efp.BaseFusion):
+    """predictions listed in output_result_file as '--'-separated fusion names"""
+
+    def parse_results(self):
+        self.result = pd.DataFrame(
+            {"FusionName": self.output_result_file.split(","), "num_LR": 1}
+        )
+
+    def clean_results(self):
+        self.result["FusionLexSort"] = efp.lex_sort_names(self.result["FusionName"])
+
+
+def gold_standard(fusion_names):
+    names = pd.Series(fusion_names)
+    return pd.DataFrame(
+        {"FusionName": names, "FusionLexSort": efp.lex_sort_names(names)}
+    )
+
+
+def listed_fusion(predictions, gold_fusion_names, paralogs=None, **kwargs):
+    if paralogs is not None:
+        kwargs["paralog_pairs"] = paralogs
+        kwargs["paralog_pairs_dict"] = efp.paralog_clusters.paralog_pairs_dict(paralogs)
+
+    return ListedFusion(
+        ",".join(predictions),
+        gold_standard(gold_fusion_names),
+        use_cache=False,
+        **kwargs,
+    )
+
+
+def test_paralog_pairs_swap_rebuilds_index():
+    fusion = listed_fusion(["C--X"], ["A--X"], paralogs=[["A", "C"]])
+    assert list(fusion.overlap_fusionnames()) == ["A--X"]
+
+    fusion.paralog_pairs = [["A", "D"]]
+    fusion.paralog_pairs_dict = efp.paralog_clusters.paralog_pairs_dict(
+        fusion.paralog_pairs
+    )
+    assert list(fusion.overlap_fusionnames()) == []
+
+    fusion.paralog_pairs = [["X", "D"], ["A", "C"]]
+    fusion.paralog_pairs_dict = efp.paralog_clusters.paralog_pairs_dict(
+        fusion.paralog_pairs
+    )
+    assert list(fusion.overlap_fusionnames()) == ["A--X"]
+
+
+def test_given_paralog_index_is_kept():
+    paralogs = [["A", "C"]]
+    paralog_index = efp.paralog_clusters.ParalogIndex(paralogs)
+    fusion = listed_fusion(
+        ["C--X"], ["A--X"], paralogs=paralogs, paralog_index=paralog_index
+    )
+    assert list(fusion.overlap_fusionnames()) == ["A--X"]
+
+    fusion.paralog_pairs = list(paralogs)
+    assert fusion.paralog_index is paralog_index
+
+
+def test_empty_paralog_pairs_dict_disables_paralog_matching():
+    fusion = listed_fusion(["C--X"], ["A--X"], paralogs=[["A", "C"]])
+    assert list(fusion.overlap_fusionnames()) == ["A--X"]
+
+    # the index is built by now
+    fusion.paralog_pairs_dict = {}
+    assert list(fusion.overlap_fusionnames()) == []
+
+    # a given index alone does not enable paralog matching
+    fusion = listed_fusion(
+        ["C--X"],
+        ["A--X"],
+        paralog_index=efp.paralog_clusters.ParalogIndex([["A", "C"]]),
+    )
+    assert list(fusion.overlap_fusionnames()) == []
+    assert fusion.threshold_sweep(metrics=("FusionName",))["TP"].tolist() == [0]
+
+
+def random_brkpts(rng, num_brkpts, num_chroms, max_coord):
+    brkpts = np.empty(num_brkpts, dtype=efp.fusion_breakpoints.BREAKPOINT_DTYPE)
+    brkpts["left_chrom"] = rng.integers(0, num_chroms, size=num_brkpts)
+    brkpts["left_coord"] = rng.integers(0, max_coord, size=num_brkpts)
+    brkpts["right_chrom"] = rng.integers(0, num_chroms, size=num_brkpts)
+    brkpts["right_coord"] = rng.integers(0, max_coord, size=num_brkpts)
+    return brkpts
+
+
+def all_pairs_nearest(query_brkpts, target_brkpts):
+    """nearest targets by comparing each query to every target, as find_nearest_breakpoint_pairs()"""
+    target_order = efp.fusion_breakpoints.group_by_chrom_pair(target_brkpts)
+    nearest = dict()
+    for (left_chrom, right_chrom), (_, _, target_idx) in target_order.items():
+        for i, query in enumerate(query_brkpts):
+            if (query["left_chrom"], query["right_chrom"]) != (left_chrom, right_chrom):
+                continue
+            targets = target_brkpts[target_idx]
+            dists = np.maximum(
+                np.abs(targets["left_coord"] - query["left_coord"]),
+                np.abs(targets["right_coord"] - query["right_coord"]),
+            )
+            # np.argmin takes the first in group_by_chrom_pair() order on ties
+            nearest[i] = (target_idx[np.argmin(dists)], dists.min())
+
+    query_idx = np.array(sorted(nearest), dtype=np.int64)
+    return (
+        query_idx,
+        np.array([nearest[i][0] for i in query_idx], dtype=np.int64),
+        np.array([nearest[i][1] for i in query_idx], dtype=np.int64),
+    )
+
+
+def test_nearest_breakpoint_pairs_equal_all_pairs():
+    for seed in range(100):
+        rng = np.random.default_rng(seed)
+        # few coordinates for ties
+        max_coord = 20 if seed % 2 else 100000
+        query_brkpts = random_brkpts(rng, rng.integers(0, 50), 3, max_coord)
+        target_brkpts = random_brkpts(rng, rng.integers(1, 200), 3, max_coord)
+
+        expected = all_pairs_nearest(query_brkpts, target_brkpts)
+        for max_candidates in (1, 7, 10000000):
+            found = efp.fusion_breakpoints.find_nearest_breakpoint_pairs(
+                query_brkpts, target_brkpts, max_candidates=max_candidates
+            )
+            for found_values, expected_values in zip(found, expected):
+                np.testing.assert_array_equal(
+                    found_values, expected_values, err_msg="seed {}".format(seed)
+                )
+
+
+if __name__ == "__main__":
+    import warnings
+
+    warnings.simplefilter("ignore")
+
+    test_paralog_pairs_swap_rebuilds_index()
+    test_given_paralog_index_is_kept()
+    test_empty_paralog_pairs_dict_disables_paralog_matching()
+    test_nearest_breakpoint_pairs_equal_all_pairs()
+    print("ok")